@@ -0,0 +1,407 @@
+"""Offline end-to-end benchmark: the whole graph, with a scripted LLM and deterministic embeddings.
+
+Run from the repository root (no API calls are made; nothing under ./database is read or written unless
+`--db` asks for a copy of it):
+
+    python -m benchmarks.e2e
+    python -m benchmarks.e2e --scenario demo --repeat 10 --output e2e.json
+    python -m benchmarks.e2e --llm-ms 300 --mode async --baseline e2e.json
+
+`chatbot.tools.llm.LLM` is replaced by `ScriptedChatModel` and the FAQ store is built with hash-seeded
+embeddings (benchmarks/scripted_llm.py) before the graph is built (`fixtures.offline_graph`). The graph
+then runs unchanged (intent routing, context trimming, tool encoding, the parallel tool node, the SQLite
+checkpointer) in a scratch directory holding a synthetic travel database (benchmarks/fixtures.py) or a
+copy of `--db`, after the timestamp shift and schema tuning of `DataPreparer.prepare_all` (`meta.database`
+reports the shift and any service query that still scans a table). Each scenario is a conversation; its
+sensitive-tool interrupts are answered like the CLI does, approving or denying with a reason. `--warmup`
+runs of every scenario come first and are not reported.
+
+Reported per scenario, over the measured runs (milliseconds):
+    turn_ms        one user message, including the approvals it needed
+    nodes          wall time per graph node; `llm_ms` is the scripted model's share (its `--llm-ms` delay)
+    db             time connections were checked out of the pool, and the checkouts
+    sql, tools, retriever
+                   per service method, tool and FAQ cache outcome, from the chatbot/metrics.py histograms
+                   (their percentiles are interpolated inside the histogram buckets)
+    checkpoint     checkpoint and pending-write bytes added per run
+    tool_calls     tool calls of the first measured run by name, to check the scenarios still play out
+plus the process peak RSS (and the tracemalloc peak with `--tracemalloc`). The report is JSON (stdout,
+and `--output`); `--baseline` adds the relative change of the headline numbers against an earlier report.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage, ToolMessage
+
+from benchmarks.fixtures import build_travel_db, offline_graph, write_faq
+from chatbot.agents.agents_utilities import deny_tool_calls
+from chatbot.demo import PASSENGER_ID, QUESTIONS
+from chatbot.metrics import registry, retriever_seconds, sql_seconds, tool_seconds
+from chatbot.tools.Data import DataPreparer
+
+DENY = "n"  # an approval answer starting with this denies the action, the rest is the reason
+
+# name -> (questions, answers to the interrupts in order, the last one repeating)
+SCENARIOS = {
+    "demo": (QUESTIONS, ["y"]),
+    "denials": ([
+        "I need a hotel for my stay, what are my options?",
+        "Book the first one please.",
+        "Now for a car, what are my options?",
+        "Go ahead and book the cheapest one.",
+    ], [f"{DENY}: too expensive, keep looking"]),
+    "policy": ([
+        "Hi there, what time is my flight?",
+        "Am I allowed to change my flight to tomorrow?",
+        "What is the policy on baggage?",
+        "What is the policy on baggage?",
+        "Am I allowed to pay with a voucher?",
+    ], ["y"]),
+    "routed": ([
+        "Find me a hotel in Zurich for two nights",
+        "Book it.",
+        "I'd like to rent a car at the airport",
+        "Reserve the first one.",
+        "Can you recommend some excursions or tours?",
+    ], ["y"]),
+}
+
+
+class NodeTimer(BaseCallbackHandler):
+    """Wall time of every graph node and chat model call, from the run callbacks."""
+
+    run_inline = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._roots, self._starts = set(), {}
+        self.nodes, self.llm = {}, []
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        with self._lock:
+            if parent_run_id is None:
+                self._roots.add(run_id)
+            elif parent_run_id in self._roots and not kwargs.get("name", "").startswith("__"):
+                self._starts[run_id] = (kwargs.get("name"), time.perf_counter())
+
+    def _end_chain(self, run_id) -> None:
+        with self._lock:
+            self._roots.discard(run_id)
+            started = self._starts.pop(run_id, None)
+            if started is not None:
+                name, at = started
+                self.nodes.setdefault(name, []).append((time.perf_counter() - at) * 1000)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end_chain(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        # GraphInterrupt ends the root run with an error; the nodes that ran still count
+        self._end_chain(run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        with self._lock:
+            self._starts[run_id] = ("llm", time.perf_counter())
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            started = self._starts.pop(run_id, None)
+            if started is not None:
+                self.llm.append((time.perf_counter() - started[1]) * 1000)
+
+
+def percentiles(samples: list[float]) -> dict:
+    if not samples:
+        return {"count": 0}
+    cuts = statistics.quantiles(samples, n=100, method="inclusive") if len(samples) > 1 else samples * 99
+    return {"count": len(samples), "mean": round(statistics.fmean(samples), 3), "p50": round(cuts[49], 3),
+            "p90": round(cuts[89], 3), "p99": round(cuts[98], 3), "max": round(max(samples), 3)}
+
+
+def histogram_summary(histogram, runs: int) -> dict:
+    """Calls per run and mean / p50 / p90 in ms, per series of a metrics histogram."""
+    summary = {}
+    for series in histogram.to_dict():
+        key = "/".join(value for value in series["labels"].values())
+        summary[key] = {"calls_per_run": series["count"] / runs,
+                        **{name: round(series[source] * 1000, 3) for name, source in
+                           (("mean_ms", "mean"), ("p50_ms", "p50"), ("p90_ms", "p90"))}}
+    return summary
+
+
+def _resume_input(event: dict, answer: str):
+    # the last event of a run that stopped at an interrupt is the state holding the pending calls
+    if answer.startswith(DENY):
+        return deny_tool_calls(event["messages"][-1], answer[len(DENY):].lstrip(": "))
+    return None
+
+
+def run_conversation(graph, questions: list, answers: list, config: dict, pause: float = 0.0) -> tuple[list, int]:
+    """Play one conversation through `graph.stream`; returns the turn times (ms) and the interrupts.
+
+    `pause` seconds pass between the turns (the user reading and typing), outside the turn times.
+    """
+    turns, interrupts = [], 0
+    for question in questions:
+        if turns and pause:
+            time.sleep(pause)
+        started = time.perf_counter()
+        event = None
+        for event in graph.stream({"messages": ("user", question)}, config, stream_mode="values"):
+            pass
+        while graph.get_state(config).next:
+            answer = answers[min(interrupts, len(answers) - 1)]
+            interrupts += 1
+            for event in graph.stream(_resume_input(event, answer), config, stream_mode="values"):
+                pass
+        turns.append((time.perf_counter() - started) * 1000)
+    return turns, interrupts
+
+
+async def arun_conversation(graph, questions: list, answers: list, config: dict,
+                            pause: float = 0.0) -> tuple[list, int]:
+    """Same as `run_conversation`, through `graph.astream`."""
+    turns, interrupts = [], 0
+    for question in questions:
+        if turns and pause:
+            await asyncio.sleep(pause)
+        started = time.perf_counter()
+        event = None
+        async for event in graph.astream({"messages": ("user", question)}, config, stream_mode="values"):
+            pass
+        while (await graph.aget_state(config)).next:
+            answer = answers[min(interrupts, len(answers) - 1)]
+            interrupts += 1
+            async for event in graph.astream(_resume_input(event, answer), config, stream_mode="values"):
+                pass
+        turns.append((time.perf_counter() - started) * 1000)
+    return turns, interrupts
+
+
+def tool_calls(graph, config: dict) -> dict:
+    """Tool calls made in the conversation, by name (errors as "<name>:error")."""
+    messages = graph.get_state(config).values["messages"]
+    names = {call["id"]: call["name"] for m in messages if isinstance(m, AIMessage) for call in m.tool_calls}
+    counts = {}
+    for message in messages:
+        if isinstance(message, ToolMessage):
+            name = names.get(message.tool_call_id, "unknown")
+            if message.status == "error" or str(message.content).startswith("Error:"):
+                name += ":error"
+            counts[name] = counts.get(name, 0) + 1
+    return dict(sorted(counts.items()))
+
+
+def run_scenario(name: str, runs: int, warmup: int, mode: str, env: dict) -> dict:
+    graph, memory, pool, llm = env["graph"], env["memory"], env["pool"], env["llm"]
+    questions, answers = SCENARIOS[name]
+    timer = NodeTimer()
+    turns, interrupts, calls = [], 0, None
+    db_before = checkpoint_before = llm_before = None
+    for run in range(warmup + runs):
+        if run == warmup:
+            timer = NodeTimer()
+            registry.reset()
+            db_before, checkpoint_before, llm_before = pool.get_stats(), memory.get_stats(), llm.calls
+        config = {"configurable": {"passenger_id": PASSENGER_ID, "thread_id": f"{name}-{uuid.uuid4()}"},
+                  "callbacks": [timer]}
+        if mode == "async":
+            run_turns, run_interrupts = asyncio.run(arun_conversation(graph, questions, answers, config))
+        else:
+            run_turns, run_interrupts = run_conversation(graph, questions, answers, config)
+        if run >= warmup:
+            turns += run_turns
+            interrupts += run_interrupts
+            if calls is None:
+                calls = tool_calls(graph, config)
+    db_after, checkpoint_after = pool.get_stats(), memory.get_stats()
+    checkpoint_bytes = sum(checkpoint_after[key] - checkpoint_before[key] for key in ("checkpoint_bytes", "write_bytes"))
+    return {
+        "runs": runs,
+        "turns_per_run": len(questions),
+        "interrupts_per_run": interrupts / runs,
+        "llm_calls_per_run": (llm.calls - llm_before) / runs,
+        "turn_ms": percentiles(turns),
+        "nodes": {node: percentiles(samples) for node, samples in sorted(timer.nodes.items())},
+        "llm_ms": percentiles(timer.llm),
+        "db": {
+            "held_ms_per_run": round((db_after["held_seconds"] - db_before["held_seconds"]) * 1000 / runs, 3),
+            "checkouts_per_run": (db_after["checkouts"] - db_before["checkouts"]) / runs,
+        },
+        "sql": histogram_summary(sql_seconds, runs),
+        "tools": histogram_summary(tool_seconds, runs),
+        "retriever": histogram_summary(retriever_seconds, runs),
+        "checkpoint": {
+            "bytes_per_run": checkpoint_bytes // runs,
+            "checkpoints_per_run": (checkpoint_after["checkpoints"] - checkpoint_before["checkpoints"]) / runs,
+            "file_bytes": checkpoint_after["file_bytes"],
+        },
+        "tool_calls": calls,
+    }
+
+
+def compare(report: dict, baseline: dict) -> dict:
+    """Relative change (after / before - 1) of the headline numbers, per scenario in both reports."""
+    def change(before, after):
+        return {"before": before, "after": after,
+                "change": round(after / before - 1, 3) if before and after is not None else None}
+
+    result = {}
+    for name, scenario in report["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if not old:
+            continue
+        entry = {
+            "turn_ms.p50": change(old["turn_ms"].get("p50"), scenario["turn_ms"].get("p50")),
+            "turn_ms.p90": change(old["turn_ms"].get("p90"), scenario["turn_ms"].get("p90")),
+            "db.held_ms_per_run": change(old["db"]["held_ms_per_run"], scenario["db"]["held_ms_per_run"]),
+            "checkpoint.bytes_per_run": change(old["checkpoint"]["bytes_per_run"],
+                                               scenario["checkpoint"]["bytes_per_run"]),
+        }
+        for node, stats in scenario["nodes"].items():
+            if node in old["nodes"]:
+                entry[f"nodes.{node}.p50"] = change(old["nodes"][node].get("p50"), stats.get("p50"))
+        if old.get("tool_calls") != scenario["tool_calls"]:
+            entry["tool_calls_differ"] = True
+        result[name] = entry
+    return result
+
+
+def git_commit(path: str):
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=path, capture_output=True, text=True,
+                              timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def prepare_scratch(scratch: str, repo: str, db: str, passengers: int) -> dict:
+    """Lay out ./database in `scratch` the way prepare_all leaves it: the travel database (synthetic, or a
+    copy of `db`) after the same timestamp shift and schema tuning, and the policy FAQ.
+
+    Returns the layout that was measured: where the database came from, the total timestamp shift and
+    the service queries whose plan still scans a whole table.
+    """
+    os.makedirs(os.path.join(scratch, "database"))
+    db_path = os.path.join(scratch, "database", "travel2.sqlite")
+    if db:
+        shutil.copyfile(db, db_path)
+        source = os.path.abspath(db)
+    else:
+        build_travel_db(db_path, passengers=passengers)
+        source = f"synthetic, {passengers} passengers"
+    preparer = DataPreparer(db_path=db_path)
+    preparer.update_timestamps()
+    plans = preparer.tune_schema()
+    conn = sqlite3.connect(db_path)
+    try:
+        row = conn.execute("SELECT value FROM prepare_metadata WHERE key = 'timestamp_offset_seconds'").fetchone()
+    except sqlite3.OperationalError:
+        row = None  # never shifted: the timestamps were already current
+    finally:
+        conn.close()
+    faq = os.path.join(repo, "database", "swiss_faq.md")
+    if os.path.exists(faq):
+        shutil.copyfile(faq, os.path.join(scratch, "database", "swiss_faq.md"))
+    else:
+        write_faq(os.path.join(scratch, "database", "swiss_faq.md"))
+    return {
+        "source": source,
+        "timestamp_offset_seconds": round(float(row[0]), 1) if row else 0.0,
+        "full_scans": [entry["query"] for entry in plans if entry["regression"]],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="scenario to run (repeatable; default: all)")
+    parser.add_argument("--repeat", type=int, default=5, help="measured runs per scenario")
+    parser.add_argument("--warmup", type=int, default=1, help="unreported runs per scenario first")
+    parser.add_argument("--mode", choices=["sync", "async"], default="sync")
+    parser.add_argument("--llm-ms", type=float, default=0.0, help="simulated model latency per call")
+    parser.add_argument("--db", help="copy of this travel database instead of the synthetic one")
+    parser.add_argument("--passengers", type=int, default=1_000, help="passengers in the synthetic database")
+    parser.add_argument("--tracemalloc", action="store_true", help="also trace Python allocations (slower)")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    args = parser.parse_args()
+
+    repo = os.getcwd()
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        source = prepare_scratch(scratch, repo, args.db and os.path.abspath(args.db), args.passengers)
+        os.chdir(scratch)  # every service, the checkpointer and the FAQ store use ./database
+        if args.tracemalloc:
+            tracemalloc.start()
+
+        started = time.perf_counter()
+        env = offline_graph(args.llm_ms)
+        from chatbot.tools.Database import close_all_pools
+        from chatbot.tools.PolicyRetriever import policy_retriever
+        faq_store_seconds = policy_retriever.get_stats()["startup_seconds"]
+        import_seconds = time.perf_counter() - started - faq_store_seconds
+        memory = env["memory"]
+        scenarios = {name: run_scenario(name, args.repeat, args.warmup, args.mode, env)
+                     for name in args.scenario or SCENARIOS}
+
+        report = {
+            "meta": {
+                "git_commit": git_commit(repo),
+                "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "database": source,
+                "mode": args.mode,
+                "llm_ms": args.llm_ms,
+                "repeat": args.repeat,
+                "warmup": args.warmup,
+            },
+            "startup": {
+                "import_seconds": round(import_seconds, 3),
+                "faq_store_seconds": round(faq_store_seconds, 3),
+            },
+            "scenarios": scenarios,
+            "memory": {
+                # ru_maxrss is in KiB on Linux, bytes on macOS
+                "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                                    / (2**20 if sys.platform == "darwin" else 2**10), 1),
+                "tracemalloc_peak_mb": round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+                if args.tracemalloc else None,
+            },
+        }
+        if baseline is not None:
+            report["comparison"] = compare(report, baseline)
+        memory.close()
+        close_all_pools()
+        os.chdir(repo)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Compare the Chroma and NumPy FAQ stores: cold start, memory use, query latency and result parity.
+
+Run from the repository root:
+
+    python -m benchmarks.faq_store_benchmark                      # synthetic corpus, offline embeddings
+    python -m benchmarks.faq_store_benchmark --faq-file swiss_faq.md --openai
+
+Cold start and peak memory are measured in a fresh interpreter per backend (imports + load + first
+query); latency is measured in-process on warm stores with precomputed query vectors, so embedding
+time is excluded. Results are printed as JSON.
+"""
+import argparse
+import json
+import os
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+COLLECTION_NAME = "faq_vectors"
+
+
+class UnitFakeEmbedding(DeterministicFakeEmbedding):
+    """Deterministic offline embeddings, normalized like OpenAI's so L2 and cosine rankings agree."""
+
+    def _get_embedding(self, seed: int) -> list[float]:
+        vector = np.asarray(super()._get_embedding(seed))
+        return list(vector / np.linalg.norm(vector))
+
+
+def load_documents(args) -> list[Document]:
+    if args.faq_file:
+        with open(args.faq_file, encoding="utf-8") as f:
+            text = f.read()
+        return [Document(page_content=txt.strip()) for txt in re.split(r"(?=\n##)", text)]
+    if args.synthetic:
+        return [Document(page_content=f"## Policy question {i}\nSynthetic answer {i} about fares, "
+                                      f"changes, refunds and baggage.") for i in range(args.synthetic)]
+    from chatbot.tools.Data import DataPreparer
+    return DataPreparer().create_faq_documents()
+
+
+def build_stores(directory: str, documents: list[Document], embedding, dtype: str) -> None:
+    from langchain_chroma import Chroma
+    from chatbot.tools.NumpyVectorStore import NumpyVectorStore
+
+    Chroma.from_documents(documents=documents, embedding=embedding, collection_name=COLLECTION_NAME,
+                          persist_directory=os.path.join(directory, "chroma"))
+    NumpyVectorStore.from_texts([doc.page_content for doc in documents], embedding) \
+        .save(os.path.join(directory, "numpy"), dtype=dtype)
+
+
+def open_store(backend: str, directory: str, embedding):
+    if backend == "chroma":
+        from langchain_chroma import Chroma
+        return Chroma(collection_name=COLLECTION_NAME, embedding_function=embedding,
+                      persist_directory=os.path.join(directory, "chroma"))
+    from chatbot.tools.NumpyVectorStore import NumpyVectorStore
+    return NumpyVectorStore.load(os.path.join(directory, "numpy"), embedding)
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss survives exec on Linux and would report the parent's peak, so prefer VmHWM
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(backend: str, directory: str, k: int) -> None:
+    """Runs in a fresh interpreter: time imports, load and the first query; report peak RSS."""
+    started = time.perf_counter()
+    store = open_store(backend, directory, embedding=None)
+    loaded = time.perf_counter()
+    query = np.load(os.path.join(directory, "queries.npy"))[0]
+    store.similarity_search_by_vector(query.tolist(), k=k)
+    finished = time.perf_counter()
+    print(json.dumps({
+        "load_seconds": loaded - started,
+        "first_query_seconds": finished - loaded,
+        "cold_start_seconds": finished - started,
+        "peak_rss_mb": peak_rss_mb(),
+    }))
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--faq-file", help="local copy of swiss_faq.md (default: download it)")
+    parser.add_argument("--synthetic", type=int, default=40, help="synthetic chunks when no FAQ file is given (0 = download)")
+    parser.add_argument("--openai", action="store_true", help="use OpenAIEmbeddings instead of offline fake embeddings")
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float16"])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=2)
+    parser.add_argument("--child", nargs=2, metavar=("BACKEND", "DIR"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], args.child[1], args.k)
+        return
+
+    if args.openai:
+        from chatbot.tools.Data import DataPreparer
+        embedding = DataPreparer().embedding_model()
+    else:
+        embedding = UnitFakeEmbedding(size=1536)
+
+    documents = load_documents(args)
+    questions = [f"question {i} about changing or cancelling a ticket" for i in range(args.queries)]
+    query_vectors = embedding.embed_documents(questions)
+
+    with tempfile.TemporaryDirectory() as directory:
+        build_stores(directory, documents, embedding, args.dtype)
+        np.save(os.path.join(directory, "queries.npy"), np.asarray(query_vectors, dtype=np.float32))
+
+        report = {"documents": len(documents), "dtype": args.dtype, "k": args.k, "backends": {}}
+        results = {}
+        for backend in ("chroma", "numpy"):
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.faq_store_benchmark", "--child", backend, directory, "-k", str(args.k)],
+                check=True, capture_output=True, text=True, env={**os.environ, "ANONYMIZED_TELEMETRY": "False"},
+            ).stdout
+            cold = json.loads(output.strip().splitlines()[-1])
+
+            store = open_store(backend, directory, embedding)
+            timings, results[backend] = [], []
+            for vector in query_vectors:
+                started = time.perf_counter()
+                docs = store.similarity_search_by_vector(vector, k=args.k)
+                timings.append(time.perf_counter() - started)
+                results[backend].append([doc.page_content for doc in docs])
+
+            report["backends"][backend] = {
+                **cold,
+                "query_p50_ms": statistics.median(timings) * 1000,
+                "query_p95_ms": percentile(timings, 95) * 1000,
+                "query_mean_ms": statistics.fmean(timings) * 1000,
+            }
+            report["backends"][backend]["disk_bytes"] = sum(
+                os.path.getsize(os.path.join(root, name))
+                for root, _, names in os.walk(os.path.join(directory, backend)) for name in names
+            )
+
+        same = sum(a == b for a, b in zip(results["chroma"], results["numpy"]))
+        report["same_results_ratio"] = same / len(query_vectors)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""Synthetic databases for the benchmarks.
+
+The shipped database only holds a handful of hotels, car rentals and excursions, which is too small for
+a table scan to show up in a profile. `build_inventory_db` writes the same three tables (same columns,
+same kind of values) with as many rows as asked, then creates their service and full-text indexes.
+
+`build_travel_db` adds the flight tables (flights, bookings, tickets, ticket_flights, boarding_passes)
+around a smaller inventory, with timestamps around the current time, so the whole graph can run without
+downloading travel2.sqlite. `write_faq` writes a small policy FAQ in the layout of swiss_faq.md.
+
+`offline_graph` points the assistant at the scripted stand-ins of `benchmarks/scripted_llm.py`, for the
+benchmarks that run the whole graph without API calls.
+"""
+import os
+import random
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+from chatbot.demo import PASSENGER_ID as DEMO_PASSENGER
+from chatbot.tools import Schema
+
+CITIES = ["Zurich", "Basel", "Geneva", "Lucerne", "Bern", "Lausanne", "Lugano", "Zermatt", "St. Moritz",
+          "Interlaken", "Montreux", "Davos", "Grindelwald", "Locarno", "Sion", "Winterthur", "St. Gallen"]
+AREAS = ["", " Airport", " Old Town", " Lakeside", " Central Station", " Downtown"]
+HOTEL_CHAINS = ["Hilton", "Marriott", "Hyatt", "Radisson", "Best Western", "InterContinental", "Sheraton",
+                "Holiday Inn", "Four Seasons", "Novotel", "Ibis", "Mövenpick", "Baur au Lac", "Park Hyatt"]
+CAR_COMPANIES = ["Europcar", "Avis", "Hertz", "Sixt", "Budget", "Enterprise", "Thrifty", "Alamo"]
+TOUR_NAMES = ["Lake tour", "Old Town walk", "Chocolate factory", "Art museum", "Glacier hike", "Wine tasting",
+              "Castle visit", "Cheese dairy", "Boat cruise", "Alpine train", "History museum", "Jazz night"]
+KEYWORDS = ["art", "history", "museum", "boat", "scenic", "food", "walking", "nature", "hiking", "wine",
+            "music", "architecture", "shopping", "family", "chocolate", "lake", "mountains", "culture"]
+INVENTORY_TABLES = ["hotels", "car_rentals", "trip_recommendations"]
+PRICE_TIERS = ["Budget", "Midscale", "Upper Midscale", "Upscale", "Upper Upscale", "Luxury", "Economy"]
+
+
+def _location(rng: random.Random) -> str:
+    return rng.choice(CITIES) + rng.choice(AREAS)
+
+
+AIRPORTS = ["BSL", "CDG", "ZRH", "GVA", "FRA", "LHR", "AMS", "MUC", "VIE", "FCO", "BCN", "LIS"]
+ROUTES = [("CDG", "BSL"), ("BSL", "CDG")] + [(a, b) for a in AIRPORTS for b in AIRPORTS if a < b][:40]
+FARE_CONDITIONS = ["Economy", "Comfort", "Business"]
+
+FAQ = """## Booking and Cancellation
+
+1. How can I change my booking?
+   * The ticket number must start with 724 (SWISS ticket no./plate).
+   * The ticket was not paid for by barter or voucher.
+   * The ticket has not been used for the first flight segment.
+   * Flights can be changed up to 3 hours before departure, within the fare conditions of the ticket.
+
+2. Can I rebook to an earlier or later flight on the same day?
+   * Same-day changes depend on the fare; the fare difference and a rebooking fee may apply.
+
+## Baggage
+
+1. How much baggage can I take?
+   * Economy: one piece of 23 kg; Business: two pieces of 32 kg each.
+
+## Hotels, Car Rentals and Excursions
+
+1. Can I book a hotel or a rental car together with my flight?
+   * Yes, hotels, rental cars and excursions can be added to any booking and cancelled free of charge.
+
+## Invoice and Payment
+
+1. Can I pay with a voucher?
+   * Vouchers can be used for new bookings, not for changes to an existing ticket.
+"""
+
+
+def _timestamp(value: datetime) -> str:
+    # the format update_timestamps writes (and update_ticket_to_new_flight parses)
+    return value.isoformat(sep=" ", timespec="microseconds")
+
+
+def _create_inventory(conn: sqlite3.Connection, rng: random.Random, rows: int) -> None:
+    conn.executescript("""
+        CREATE TABLE hotels(id INTEGER, name TEXT, location TEXT, price_tier TEXT, checkin_date TEXT,
+                            checkout_date TEXT, booked INTEGER);
+        CREATE TABLE car_rentals(id INTEGER, name TEXT, location TEXT, price_tier TEXT, start_date TEXT,
+                                 end_date TEXT, booked INTEGER);
+        CREATE TABLE trip_recommendations(id INTEGER, name TEXT, location TEXT, keywords TEXT, details TEXT,
+                                          booked INTEGER);
+    """)
+    with conn:
+        conn.executemany("INSERT INTO hotels VALUES (?, ?, ?, ?, '2024-04-02', '2024-04-09', 0)", [
+            (i, f"{rng.choice(HOTEL_CHAINS)} {rng.choice(CITIES)}", _location(rng), rng.choice(PRICE_TIERS))
+            for i in range(1, rows + 1)
+        ])
+        conn.executemany("INSERT INTO car_rentals VALUES (?, ?, ?, ?, '2024-04-02', '2024-04-09', 0)", [
+            (i, rng.choice(CAR_COMPANIES), _location(rng), rng.choice(PRICE_TIERS)) for i in range(1, rows + 1)
+        ])
+        conn.executemany("INSERT INTO trip_recommendations VALUES (?, ?, ?, ?, ?, 0)", [
+            (i, rng.choice(TOUR_NAMES), _location(rng), ", ".join(rng.sample(KEYWORDS, 3)), "details")
+            for i in range(1, rows + 1)
+        ])
+
+
+def _create_indexes(conn: sqlite3.Connection, tables: list, fts: bool) -> None:
+    for name, (table, columns) in Schema.INDEXES.items():
+        if table in tables:
+            conn.execute(f"CREATE INDEX {name} ON {table} ({', '.join(columns)})")
+    if fts:
+        Schema.create_fts(conn)
+
+
+def build_inventory_db(path: str, rows: int = 50_000, seed: int = 7, fts: bool = True) -> str:
+    """Write `rows` hotels, car rentals and excursions each to a fresh database at `path`."""
+    if os.path.exists(path):
+        os.remove(path)
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    _create_inventory(conn, rng, rows)
+    _create_indexes(conn, INVENTORY_TABLES, fts)
+    conn.close()
+    return path
+
+
+def build_travel_db(path: str, passengers: int = 1_000, inventory_rows: int = 2_000, days: int = 30,
+                    seed: int = 7) -> str:
+    """Write a complete travel database to `path`: one flight per route and day from `days` days ago to
+    `days` days ahead, `passengers` passengers (the first one `DEMO_PASSENGER`, whose flight leaves in a
+    few hours) with one or two flights each, and `inventory_rows` hotels, car rentals and excursions."""
+    if os.path.exists(path):
+        os.remove(path)
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE flights(flight_id INTEGER, flight_no TEXT, scheduled_departure TIMESTAMP,
+                             scheduled_arrival TIMESTAMP, departure_airport TEXT, arrival_airport TEXT,
+                             status TEXT, aircraft_code TEXT, actual_departure TIMESTAMP, actual_arrival TIMESTAMP);
+        CREATE TABLE bookings(book_ref TEXT, book_date TIMESTAMP, total_amount INTEGER);
+        CREATE TABLE tickets(ticket_no TEXT, book_ref TEXT, passenger_id TEXT);
+        CREATE TABLE ticket_flights(ticket_no TEXT, flight_id INTEGER, fare_conditions TEXT, amount INTEGER);
+        CREATE TABLE boarding_passes(ticket_no TEXT, flight_id INTEGER, boarding_no INTEGER, seat_no TEXT);
+    """)
+    flights, by_day = [], {}
+    for route_no, (departure, arrival) in enumerate(ROUTES):
+        hour = rng.randint(6, 21)
+        for day in range(-days, days + 1):
+            scheduled = now + timedelta(days=day, hours=hour - now.hour, minutes=rng.choice([0, 15, 30, 45]))
+            flight_id = len(flights) + 1
+            flights.append((flight_id, f"LX{1000 + route_no:04d}", _timestamp(scheduled),
+                            _timestamp(scheduled + timedelta(minutes=rng.randint(60, 180))), departure, arrival,
+                            "Scheduled" if day >= 0 else "Arrived", "319"))
+            by_day.setdefault(day, []).append(flight_id)
+    # the scenario passenger's flight leaves in 5 hours, so moving it to "later today" is refused
+    demo_departure = now + timedelta(hours=5)
+    flights.append((len(flights) + 1, "LX0112", _timestamp(demo_departure),
+                    _timestamp(demo_departure + timedelta(minutes=75)), "CDG", "BSL", "Scheduled", "319"))
+    demo_flight = len(flights)
+
+    bookings, tickets, ticket_flights, boarding_passes = [], [], [], []
+    passenger_ids = [DEMO_PASSENGER] + [f"{rng.randint(1000, 9999)} {rng.randint(100000, 999999)}"
+                                        for _ in range(passengers - 1)]
+    for i, passenger_id in enumerate(passenger_ids):
+        book_ref, ticket_no = f"{i:06X}", f"7240005{i:06d}"
+        segments = [demo_flight] if i == 0 else rng.sample(by_day[rng.randint(1, days)], rng.randint(1, 2))
+        amounts = [rng.randint(100, 1500) for _ in segments]
+        bookings.append((book_ref, _timestamp(now - timedelta(days=rng.randint(1, 60))), sum(amounts)))
+        tickets.append((ticket_no, book_ref, passenger_id))
+        for boarding_no, (flight_id, amount) in enumerate(zip(segments, amounts), 1):
+            ticket_flights.append((ticket_no, flight_id, rng.choice(FARE_CONDITIONS), amount))
+            boarding_passes.append((ticket_no, flight_id, boarding_no, f"{rng.randint(1, 30)}{rng.choice('ABCDEF')}"))
+    with conn:
+        conn.executemany("INSERT INTO flights VALUES (?, ?, ?, ?, ?, ?, ?, ?, NULL, NULL)", flights)
+        conn.executemany("INSERT INTO bookings VALUES (?, ?, ?)", bookings)
+        conn.executemany("INSERT INTO tickets VALUES (?, ?, ?)", tickets)
+        conn.executemany("INSERT INTO ticket_flights VALUES (?, ?, ?, ?)", ticket_flights)
+        conn.executemany("INSERT INTO boarding_passes VALUES (?, ?, ?, ?)", boarding_passes)
+    _create_inventory(conn, rng, inventory_rows)
+    _create_indexes(conn, [table for table, _ in Schema.INDEXES.values()], fts=True)
+    conn.close()
+    return path
+
+
+def write_faq(path: str) -> str:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(FAQ)
+    return path
+
+
+def use_offline_keys(environ=os.environ) -> None:
+    """Placeholder API keys: the OpenAI and Tavily clients, created when the graph is built, refuse to
+    start without one. Nothing is sent with them."""
+    environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+    environ.setdefault("TAVILY_API_KEY", "offline-benchmark")
+
+
+def offline_graph(llm_ms: float = 0.0) -> dict:
+    """The graph on the scripted chat model (`llm_ms` per call) and a numpy FAQ store with hash-seeded
+    embeddings, run from a directory holding ./database. Returns the graph, its checkpointer, the travel
+    database's connection pool and the model."""
+    from benchmarks.scripted_llm import ScriptedChatModel, scripted_embeddings
+
+    use_offline_keys()
+    import chatbot.tools.llm
+    llm = chatbot.tools.llm.LLM = ScriptedChatModel(latency=llm_ms / 1000)
+    from chatbot.graph import graph, memory
+    from chatbot.tools.Data import DataPreparer
+    from chatbot.tools.Database import get_pool
+    from chatbot.tools.PolicyRetriever import policy_retriever
+    policy_retriever.preparer = DataPreparer(vector_backend="numpy", embeddings=scripted_embeddings())
+    policy_retriever.get()
+    return {"graph": graph, "memory": memory, "pool": get_pool("./database/travel2.sqlite"), "llm": llm}
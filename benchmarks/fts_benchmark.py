@@ -0,0 +1,116 @@
+"""Inventory search latency: FTS5 index vs the LIKE scan, on a scaled-up synthetic dataset.
+
+Run from the repository root (no API calls are made; the database is written to a temp directory):
+
+    python -m benchmarks.fts_benchmark
+    python -m benchmarks.fts_benchmark --rows 200000 --repeat 20
+
+Each query runs as the services do (one page of results, see `chatbot.tools.Pagination`) through both
+`FullText.fts_page` and `FullText.like_page`. Reported per query, in milliseconds: the median page latency
+of both paths and the speedup. `recall` is the share of the LIKE matches the index also finds. It is
+below 1.0 only for infix matches, which `search_text` still serves after the index matches
+(`FullText.infix_page`). `fts_matches` can exceed `matches` (token and diacritic matching, e.g. "Movenpick" finds
+"Mövenpick"). Results are printed as JSON.
+
+LIKE pages stop as soon as a page is full, so on common terms it is as fast as the index. The index wins
+on selective searches, where LIKE reads the whole table before it can answer. Ranked searches score every
+match, so they cost more than unranked ones on common terms.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from benchmarks.fixtures import build_inventory_db
+from chatbot.tools import FullText
+from chatbot.tools.Database import close_all_pools
+
+# (table, terms, ranked as the service would search); the last ones are selective, where LIKE reads the
+# whole table before it can answer
+QUERIES = [
+    ("hotels", {"location": ["Zurich"]}, False),
+    ("hotels", {"location": ["Zurich"], "name": ["Hilton"]}, False),
+    ("hotels", {"location": ["zur"], "name": ["hyatt"]}, False),
+    ("car_rentals", {"location": ["Basel"], "name": ["Europcar"]}, False),
+    ("trip_recommendations", {"location": ["Basel"], "keywords": ["art", "history"]}, True),
+    ("trip_recommendations", {"location": ["Lucerne"], "keywords": ["boat", "scenic", "lake"]}, True),
+    ("trip_recommendations", {"keywords": ["chocolate"]}, False),
+    ("hotels", {"location": ["Zermatt Lakeside"], "name": ["Baur au Lac"]}, False),
+    ("hotels", {"name": ["Movenpick"]}, False),
+    ("car_rentals", {"location": ["Davos Central Station"], "name": ["Thrifty"]}, False),
+    ("trip_recommendations", {"location": ["Sion Old Town"], "name": ["Jazz night"], "keywords": ["music"]}, False),
+    ("hotels", {"location": ["Geneva"], "name": ["Ritz-Carlton"]}, False),
+]
+
+
+def median_ms(func, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def matching_ids(db_path: str, table: str, terms: dict, expression: str) -> tuple[set, set]:
+    """Every id matched by the LIKE filter and by the full-text index, without paging."""
+    conn = sqlite3.connect(db_path)
+    where, params = [], []
+    for column, alternatives in terms.items():
+        where.append("(" + " OR ".join(f"{column} LIKE ?" for _ in alternatives) + ")")
+        params.extend(f"%{alternative}%" for alternative in alternatives)
+    like = {row[0] for row in conn.execute(f"SELECT id FROM {table} WHERE {' AND '.join(where)}", params)}
+    index = FullText._INDEX[table]
+    fts = {row[0] for row in conn.execute(f"SELECT rowid FROM {index} WHERE {index} MATCH ?", (expression,))}
+    conn.close()
+    return like, fts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50_000, help="rows per inventory table")
+    parser.add_argument("--repeat", type=int, default=15, help="timed runs per query and path")
+    parser.add_argument("--limit", type=int, default=10, help="page size")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "inventory.sqlite")
+        started = time.perf_counter()
+        build_inventory_db(db_path, rows=args.rows)
+        build_seconds = time.perf_counter() - started
+
+        results = []
+        for table, terms, ranked in QUERIES:
+            expression = FullText.match_expression(terms)
+            fts_ms = median_ms(lambda: FullText.fts_page(db_path, table, expression, limit=args.limit,
+                                                         ranked=ranked), args.repeat)
+            like_ms = median_ms(lambda: FullText.like_page(db_path, table, terms, limit=args.limit), args.repeat)
+            like_ids, fts_ids = matching_ids(db_path, table, terms, expression)
+            results.append({
+                "table": table,
+                "terms": terms,
+                "ranked": ranked,
+                "matches": len(like_ids),
+                "fts_matches": len(fts_ids),
+                "fts_ms": round(fts_ms, 3),
+                "like_ms": round(like_ms, 3),
+                "speedup": round(like_ms / fts_ms, 1) if fts_ms else None,
+                "recall": round(len(like_ids & fts_ids) / len(like_ids), 3) if like_ids else None,
+            })
+        close_all_pools()
+
+        report = {
+            "rows_per_table": args.rows,
+            "build_seconds": round(build_seconds, 2),
+            "database_mb": round(os.path.getsize(db_path) / 2**20, 1),
+            "queries": results,
+            "median_speedup": statistics.median(r["speedup"] for r in results if r["speedup"]),
+        }
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Cold-start time of the processes that load the assistant: the CLI, a server worker, the graph itself.
+
+Run from the repository root (no API calls are made, nothing is written under ./database):
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --repeat 10 --output import_time.json
+    python -m benchmarks.import_time --baseline import_time.json
+
+Every stage runs `--repeat` times, each in a fresh interpreter (`python -X importtime`), from an empty
+scratch directory:
+
+    python               the bare interpreter, the floor of every other stage
+    graph_import         `import chatbot.graph` (must not build anything)
+    graph_build          `chatbot.graph.get_graph()`, i.e. what the first request of a worker pays
+    server_import        `import chatbot.server` (a uvicorn worker before its startup hook)
+    cli_help             `python chatbot.py --help` (the CLI's imports and argument parsing)
+
+Reported per stage (milliseconds): the process wall time and the time measured inside the process
+(median and min), the heavy optional modules the stage loaded (pandas, Chroma, the OpenAI SDK,
+langchain_community), and the slowest imports of its first run (cumulative import time, top-level
+imports and the ones they make directly).
+The report is JSON (stdout, and `--output`); `--baseline` adds the relative change of the medians.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.e2e import git_commit
+from benchmarks.fixtures import use_offline_keys
+
+HEAVY_MODULES = ("pandas", "langchain_chroma", "chromadb", "openai", "langchain_openai", "langchain_community")
+
+# the code a stage runs; timed inside the process, which then prints the result as its last line
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+{code}
+print(json.dumps({{"seconds": time.perf_counter() - started,
+                  "heavy": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+STAGES = {
+    "python": "pass",
+    "graph_import": "import chatbot.graph",
+    "graph_build": "import chatbot.graph\nchatbot.graph.get_graph()",
+    "server_import": "import chatbot.server",
+}
+
+
+def parse_importtime(stderr: str, top: int) -> list[dict]:
+    """Slowest imports of the first two nesting levels in `-X importtime` output, whose lines read
+    "import time: self | cumulative | name" (the name indented by two spaces per level)."""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit() or name.startswith("     "):
+            continue  # header line, or nested deeper
+        imports.append({"module": name.strip(), "ms": round(int(cumulative) / 1000, 1)})
+    return sorted(imports, key=lambda entry: entry["ms"], reverse=True)[:top]
+
+
+def run_stage(command: list, cwd: str, env: dict, repeat: int, top: int) -> dict:
+    walls, inner, heavy, imports = [], [], None, None
+    for run in range(repeat):
+        started = time.perf_counter()
+        result = subprocess.run(command, cwd=cwd, env=env, capture_output=True, text=True, timeout=300)
+        walls.append((time.perf_counter() - started) * 1000)
+        if result.returncode != 0:
+            raise RuntimeError(f"{' '.join(command)} failed:\n{result.stderr[-2000:]}")
+        lines = result.stdout.strip().splitlines()
+        probe = json.loads(lines[-1]) if lines and lines[-1].startswith("{") else None
+        if probe is not None:
+            inner.append(probe["seconds"] * 1000)
+        if run == 0:
+            heavy = probe["heavy"] if probe is not None else None
+            imports = parse_importtime(result.stderr, top)
+    return {
+        "wall_ms": {"median": round(statistics.median(walls), 1), "min": round(min(walls), 1)},
+        "in_process_ms": {"median": round(statistics.median(inner), 1), "min": round(min(inner), 1)}
+        if inner else None,
+        "heavy_modules": heavy,
+        "slowest_imports": imports,
+    }
+
+
+def compare(report: dict, baseline: dict) -> dict:
+    """Relative change (after / before - 1) of the median wall and in-process times, per stage."""
+    result = {}
+    for name, stage in report["stages"].items():
+        old = baseline.get("stages", {}).get(name)
+        if not old:
+            continue
+        entry = {}
+        for key in ("wall_ms", "in_process_ms"):
+            before, after = (old.get(key) or {}).get("median"), (stage.get(key) or {}).get("median")
+            entry[key] = {"before": before, "after": after,
+                          "change": round(after / before - 1, 3) if before and after is not None else None}
+        result[name] = entry
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="fresh processes per stage")
+    parser.add_argument("--top", type=int, default=8, help="slowest imports to list per stage")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    args = parser.parse_args()
+
+    repo = os.getcwd()
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [repo, os.environ.get("PYTHONPATH")])))
+    use_offline_keys(env)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        commands = {name: [sys.executable, "-X", "importtime", "-c", PROBE.format(code=code, heavy=HEAVY_MODULES)]
+                    for name, code in STAGES.items()}
+        commands["cli_help"] = [sys.executable, "-X", "importtime", os.path.join(repo, "chatbot.py"), "--help"]
+        stages = {name: run_stage(command, scratch, env, args.repeat, args.top) for name, command in commands.items()}
+
+    report = {
+        "meta": {"git_commit": git_commit(repo), "python": sys.version.split()[0], "repeat": args.repeat},
+        "stages": stages,
+    }
+    if baseline is not None:
+        report["comparison"] = compare(report, baseline)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
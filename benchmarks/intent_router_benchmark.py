@@ -0,0 +1,178 @@
+"""Offline accuracy and latency of the keyword intent router.
+
+Run from the repository root:
+
+    python -m benchmarks.intent_router_benchmark
+    python -m benchmarks.intent_router_benchmark --min-score 2 --min-confidence 0.7
+
+Every labelled message goes through `route()`; the label is the delegation tool the primary assistant
+should call, or None when the LLM has to answer (questions, mixed requests, small talk). A message
+with a label may still fall back to the LLM, e.g. when it does not name the dates the tool requires.
+
+There are two sets. `LABELLED` is the set the rules were written against, so its precision is
+optimistic by construction. `HELD_OUT` was written afterwards, as users phrase things, including
+messages built to trip the rules ("change my booking" of a hotel, "cancel my car rental booking");
+the rules are not tuned on it, and its numbers are the ones to watch. Reported per set:
+    precision   correct routes / routed messages (a wrong route costs a hand-off back, so keep it ~1.0)
+    coverage    correct routes / messages that do have a delegation label (LLM calls saved)
+    misroutes   the messages routed to the wrong place
+    incomplete  messages whose intent was clear but whose required arguments were not all in the text
+Latency is per `route()` call, in microseconds. Results are printed as JSON.
+"""
+import argparse
+import json
+import statistics
+import time
+
+from chatbot.agents.intent_router import CAR, EXCURSION, FLIGHT, HOTEL, INTENT_RULES, IntentRouter
+
+LABELLED = [
+    # the demo conversation in chatbot.py
+    ("Hi there, what time is my flight?", None),
+    ("Am I allowed to update my flight to something sooner? I want to leave later today.", FLIGHT),
+    ("Update my flight to sometime next week then", FLIGHT),
+    ("The next available option is great", None),
+    ("what about lodging and transportation?", None),
+    ("Yeah i think i'd like an affordable hotel for my week-long stay (7 days). And I'll want to rent a car.", None),
+    ("OK could you place a reservation for your recommended hotel? It sounds nice.", HOTEL),
+    ("yes go ahead and book anything that's moderate expense and has availability.", None),
+    ("Now for a car, what are my options?", CAR),
+    ("Awesome let's just get the cheapest option. Go ahead and book for 7 days", None),
+    ("Cool so now what recommendations do you have on excursions?", EXCURSION),
+    ("Are they available while I'm there?", None),
+    ("interesting - i like the museums, what options are there? ", EXCURSION),
+    ("OK great pick one and book it for my second day there.", None),
+    # flights
+    ("I need to change my flight to tomorrow morning", FLIGHT),
+    ("Can you cancel my ticket please?", FLIGHT),
+    ("Please rebook my flight to an earlier one", FLIGHT),
+    ("I'd like a later flight if possible", FLIGHT),
+    ("Move my booking to next Friday", None),  # the booking could be a hotel or a car
+    ("When does my flight board?", None),
+    ("Which gate does my flight leave from?", None),
+    ("Are there any flights from Zurich to Basel tomorrow?", None),
+    # hotels
+    ("I want to book a hotel in Zurich from May 1 to May 5", HOTEL),
+    ("Find me a room in Basel for three nights", HOTEL),
+    ("Looking for accommodation in Lucerne next week", HOTEL),
+    ("Are there any cheap hotels near the airport?", HOTEL),
+    ("Please cancel my hotel reservation", None),
+    # cars
+    ("I'd like to rent a car in Basel", CAR),
+    ("Book a rental car for the whole week", CAR),
+    ("I need a vehicle from the 3rd to the 10th", CAR),
+    ("Is car hire expensive in Zurich?", CAR),
+    # excursions
+    ("Can you recommend some tours in Lucerne?", EXCURSION),
+    ("Suggest activities for a rainy day in Zurich", EXCURSION),
+    ("Book a sightseeing trip for Saturday", EXCURSION),
+    ("Any museums worth visiting in Basel?", EXCURSION),
+    # policy questions and small talk stay with the LLM
+    ("What is the baggage allowance for economy?", None),
+    ("Can I get a refund if I cancel?", None),
+    ("Thanks, that's all for today", None),
+    ("hello", None),
+    ("What's the weather like in Geneva?", None),
+    ("Do I need a visa for Switzerland?", None),
+    ("Book me a hotel and a rental car in Zurich", None),
+]
+
+HELD_OUT = [
+    # "booking" without saying what was booked
+    ("I want to change my booking", None),
+    ("Can I switch my booking to a cheaper option?", None),
+    ("cancel my car rental booking", CAR),
+    ("cancel my excursion booking", EXCURSION),
+    ("Please update the booking for my hotel in Bern", HOTEL),
+    # fully specified requests
+    ("Book me a hotel in Zurich from May 2 to May 5", HOTEL),
+    ("Reserve a room in Geneva, 2027-03-10 to 2027-03-14", HOTEL),
+    ("I need a rental car at Basel Airport from June 3rd to June 9th", CAR),
+    ("rent a car in Lucerne 12 July to 19 July please", CAR),
+    ("Recommend a guided tour in Bern", EXCURSION),
+    ("any excursions around Interlaken?", EXCURSION),
+    ("I missed my connection, can I rebook my flight?", FLIGHT),
+    ("Switch my ticket to the evening flight", FLIGHT),
+    # intent clear, arguments missing
+    ("I need a hotel", HOTEL),
+    ("get me a car for the weekend", CAR),
+    ("find me a room for tonight", HOTEL),
+    # questions, other topics and mixed requests
+    ("Is my flight delayed?", None),
+    ("What's the cancellation fee for a hotel?", None),
+    ("Can I bring my bike on the flight?", None),
+    ("How far is the hotel from the station?", None),
+    ("Is the car rental desk open at night?", None),
+    ("Do tours in Zurich run on Sundays?", None),
+    ("I'd like a hotel in Zurich from May 2 to May 5 and a car as well", None),
+    ("my flight got cancelled, what are my options?", None),
+    ("Book the same hotel as last time", HOTEL),
+]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def evaluate(router: IntentRouter, labelled: list) -> dict:
+    routed, correct, misroutes, missed, incomplete = 0, 0, [], [], []
+    for text, label in labelled:
+        intent, confidence = router.classify(text)
+        message = router.route(text)
+        if message is not None:
+            routed += 1
+            if message.tool_calls[0]["name"] == label:
+                correct += 1
+            else:
+                misroutes.append({"message": text, "label": label, "routed_to": intent,
+                                  "confidence": round(confidence, 3)})
+        elif intent is not None:
+            incomplete.append({"message": text, "label": label, "intent": intent})
+        elif label is not None:
+            missed.append({"message": text, "label": label, "confidence": round(confidence, 3)})
+    delegations = sum(1 for _, label in labelled if label is not None)
+    return {
+        "messages": len(labelled),
+        "delegation_labels": delegations,
+        "routed": routed,
+        "precision": correct / routed if routed else None,
+        "coverage": correct / delegations if delegations else None,
+        "misroutes": misroutes,
+        "incomplete": incomplete,
+        "fell_back_to_llm": missed,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--min-score", type=float, default=3.0)
+    parser.add_argument("--min-confidence", type=float, default=0.8)
+    parser.add_argument("--repeat", type=int, default=200, help="latency samples per message")
+    args = parser.parse_args()
+
+    router = IntentRouter(INTENT_RULES, min_score=args.min_score, min_confidence=args.min_confidence)
+
+    latencies = []
+    for text, _ in LABELLED + HELD_OUT:
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            router.route(text)
+            latencies.append((time.perf_counter() - started) * 1e6)
+
+    report = {
+        "tuning_set": evaluate(router, LABELLED),
+        "held_out": evaluate(router, HELD_OUT),
+        "latency_us": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "max": max(latencies),
+            "mean": statistics.fmean(latencies),
+        },
+        "settings": {"min_score": args.min_score, "min_confidence": args.min_confidence},
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""Concurrent-session load generator: many simulated passengers talking to one graph at the same time.
+
+Run from the repository root (no API calls are made):
+
+    python -m benchmarks.load_generator
+    python -m benchmarks.load_generator --concurrency 1 --concurrency 8 --concurrency 32 --llm-ms 300
+    python -m benchmarks.load_generator --mode sync --sessions 64 --db database/travel2.sqlite
+
+The setup is the one of `benchmarks/e2e.py`: the scripted chat model (`--llm-ms` per call), hash-seeded
+FAQ embeddings and a scratch copy of the travel database, synthetic (`--passengers`) or `--db`. Every
+session is one passenger, sampled from the `tickets` table, playing one of the e2e conversations
+(`--scenario`, default: all, picked at random) on its own thread id, approving or denying the
+sensitive tools like the CLI does. `--think-ms` pauses between the turns of a session.
+
+For each `--concurrency` level, `--sessions` sessions (default: twice the level) run with at most that
+many in flight, on the event loop (`--mode async`) or on a thread each (`--mode sync`). The bookings
+are reset before every level. Reported per level:
+    throughput     sessions and turns per second of wall time
+    turn_ms, session_ms
+                   latency percentiles of one user message (approvals included) and of a whole session
+    db             waits for a free connection pool slot (all `pool_size` slots checked out) and their
+                   time, checkout timeouts, the time connections were held, and tool results reporting
+                   "database is locked". SQLite's own lock waits (one writer at a time, up to the busy
+                   timeout) happen inside the statements: they are part of held_ms, not measured apart
+    bookings       successful hotel, car and excursion bookings, and the conflicts: bookings of a row
+                   another session of the level had already booked (the services do not check `booked`)
+    checkpoint     checkpointer flushes, their time, and the growth of its file
+    memory         resident set size after the level, and its growth over the level
+    errors         sessions that raised, by exception type
+The report is JSON (stdout, and `--output`).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from langchain_core.messages import AIMessage, ToolMessage
+
+from benchmarks.e2e import SCENARIOS, arun_conversation, git_commit, percentiles, prepare_scratch, run_conversation
+from benchmarks.fixtures import offline_graph
+
+# booking tool -> its id argument; the tables whose `booked` flags are reset before every level
+BOOKING_TOOLS = {"book_hotel": "hotel_id", "book_car_rental": "rental_id", "book_excursion": "recommendation_id"}
+INVENTORY_TABLES = ("hotels", "car_rentals", "trip_recommendations")
+
+
+def rss_mb() -> float:
+    """Current resident set size; the peak (ru_maxrss) where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20, 1)
+    except (OSError, ValueError):
+        # ru_maxrss is in KiB on Linux, bytes on macOS
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                     / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+def sample_passengers(db_path: str, count: int, rng: random.Random) -> list[str]:
+    """`count` passenger ids from the tickets table, without repeats while there are enough of them."""
+    conn = sqlite3.connect(db_path)
+    try:
+        passengers = [row[0] for row in conn.execute("SELECT DISTINCT passenger_id FROM tickets ORDER BY 1")]
+    finally:
+        conn.close()
+    if not passengers:
+        raise ValueError(f"No passengers in the tickets table of {db_path}")
+    if count <= len(passengers):
+        return rng.sample(passengers, count)
+    return [rng.choice(passengers) for _ in range(count)]
+
+
+def reset_bookings(db_path: str) -> None:
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        with conn:
+            for table in INVENTORY_TABLES:
+                conn.execute(f"UPDATE {table} SET booked = 0 WHERE booked != 0")
+    finally:
+        conn.close()
+
+
+def session_outcome(messages: list) -> dict:
+    """Successful bookings ((tool, id) pairs) and "database is locked" tool results of one session."""
+    calls = {call["id"]: call for m in messages if isinstance(m, AIMessage) for call in m.tool_calls}
+    booked, locked = [], 0
+    for message in messages:
+        if not isinstance(message, ToolMessage):
+            continue
+        call = calls.get(message.tool_call_id) or {}
+        content = str(message.content)
+        if "database is locked" in content:
+            locked += 1
+        if call.get("name") in BOOKING_TOOLS and "successfully booked" in content:
+            booked.append((call["name"], call["args"].get(BOOKING_TOOLS[call["name"]])))
+    return {"booked": booked, "locked": locked}
+
+
+class Session:
+    """One simulated passenger: a scenario on a fresh thread id."""
+
+    def __init__(self, passenger_id: str, scenario: str, think_seconds: float):
+        self.passenger_id = passenger_id
+        self.scenario = scenario
+        self.think_seconds = think_seconds
+        self.config = {"configurable": {"passenger_id": passenger_id, "thread_id": f"load-{uuid.uuid4()}"}}
+        self.turns, self.interrupts, self.seconds = [], 0, 0.0
+        self.outcome = {"booked": [], "locked": 0}
+        self.error = None
+
+    def run(self, graph) -> "Session":
+        questions, answers = SCENARIOS[self.scenario]
+        started = time.perf_counter()
+        try:
+            self.turns, self.interrupts = run_conversation(graph, questions, answers, self.config, self.think_seconds)
+            self.outcome = session_outcome(graph.get_state(self.config).values["messages"])
+        except Exception as e:
+            self.error = type(e).__name__
+        self.seconds = time.perf_counter() - started
+        return self
+
+    async def arun(self, graph) -> "Session":
+        questions, answers = SCENARIOS[self.scenario]
+        started = time.perf_counter()
+        try:
+            self.turns, self.interrupts = await arun_conversation(graph, questions, answers, self.config,
+                                                                  self.think_seconds)
+            self.outcome = session_outcome((await graph.aget_state(self.config)).values["messages"])
+        except Exception as e:
+            self.error = type(e).__name__
+        self.seconds = time.perf_counter() - started
+        return self
+
+
+def run_sessions(graph, sessions: list[Session], concurrency: int, mode: str) -> None:
+    if mode == "sync":
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="passenger") as pool:
+            list(pool.map(lambda session: session.run(graph), sessions))
+        return
+
+    async def main():
+        slots = asyncio.Semaphore(concurrency)
+
+        async def one(session: Session):
+            async with slots:
+                await session.arun(graph)
+
+        await asyncio.gather(*(one(session) for session in sessions))
+
+    asyncio.run(main())
+
+
+def conflicts(sessions: list[Session]) -> dict:
+    """Successful bookings per tool, and those of a row another session had booked too (all but the first)."""
+    by_row, counts = {}, {}
+    for session in sessions:
+        for tool, row_id in session.outcome["booked"]:
+            by_row.setdefault((tool, row_id), set()).add(session.config["configurable"]["thread_id"])
+            counts.setdefault(tool, {"booked": 0, "conflicts": 0})["booked"] += 1
+    for (tool, _), threads in by_row.items():
+        counts[tool]["conflicts"] += len(threads) - 1
+    return {"booked": sum(tool["booked"] for tool in counts.values()),
+            "conflicts": sum(tool["conflicts"] for tool in counts.values()),
+            "by_tool": dict(sorted(counts.items()))}
+
+
+def run_level(concurrency: int, count: int, args, env: dict, rng: random.Random) -> dict:
+    graph, memory, pool, llm, db_path = env["graph"], env["memory"], env["pool"], env["llm"], env["db_path"]
+    reset_bookings(db_path)
+    scenarios = args.scenario or sorted(SCENARIOS)
+    sessions = [Session(passenger, rng.choice(scenarios), args.think_ms / 1000)
+                for passenger in sample_passengers(db_path, count, rng)]
+
+    db_before, checkpoint_before, llm_before, rss_before = pool.get_stats(), memory.get_stats(), llm.calls, rss_mb()
+    started = time.perf_counter()
+    run_sessions(graph, sessions, concurrency, args.mode)
+    wall = time.perf_counter() - started
+    db_after, checkpoint_after, rss_after = pool.get_stats(), memory.get_stats(), rss_mb()
+
+    def db_delta(key: str):
+        return db_after[key] - db_before[key]
+
+    turns = [turn for session in sessions for turn in session.turns]
+    errors = {}
+    for session in sessions:
+        if session.error:
+            errors[session.error] = errors.get(session.error, 0) + 1
+    completed = len(sessions) - sum(errors.values())
+    return {
+        "concurrency": concurrency,
+        "sessions": len(sessions),
+        "scenarios": {name: sum(s.scenario == name for s in sessions) for name in scenarios},
+        "wall_seconds": round(wall, 3),
+        "throughput": {"sessions_per_second": round(completed / wall, 3),
+                       "turns_per_second": round(len(turns) / wall, 3)},
+        "llm_calls": llm.calls - llm_before,
+        "turn_ms": percentiles(turns),
+        "session_ms": percentiles([s.seconds * 1000 for s in sessions if not s.error]),
+        "db": {
+            "checkouts": db_delta("checkouts"),
+            "pool_slot_waits": db_delta("waits"),
+            "pool_slot_wait_ms": round(db_delta("wait_seconds") * 1000, 3),
+            "pool_checkout_timeouts": db_delta("timeouts"),
+            "held_ms": round(db_delta("held_seconds") * 1000, 3),
+            "locked_results": sum(s.outcome["locked"] for s in sessions),
+        },
+        "bookings": conflicts(sessions),
+        "checkpoint": {
+            "flushes": checkpoint_after["flushes"] - checkpoint_before["flushes"],
+            "flush_ms": round((checkpoint_after["flush_seconds_total"] - checkpoint_before["flush_seconds_total"])
+                              * 1000, 3),
+            "file_bytes": checkpoint_after["file_bytes"],
+            "file_growth_bytes": checkpoint_after["file_bytes"] - checkpoint_before["file_bytes"],
+        },
+        "memory": {"rss_mb": rss_after, "rss_growth_mb": round(rss_after - rss_before, 1)},
+        "errors": errors,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", action="append", type=int,
+                        help="sessions in flight at once (repeatable; default: 1, 4, 16)")
+    parser.add_argument("--sessions", type=int, help="sessions per level (default: twice the concurrency)")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="conversation to pick from (repeatable; default: all)")
+    parser.add_argument("--mode", choices=["sync", "async"], default="async")
+    parser.add_argument("--llm-ms", type=float, default=200.0, help="simulated model latency per call")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="pause between the turns of a session")
+    parser.add_argument("--db", help="copy of this travel database instead of the synthetic one")
+    parser.add_argument("--passengers", type=int, default=1_000, help="passengers in the synthetic database")
+    parser.add_argument("--seed", type=int, default=7, help="passenger and scenario sampling")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    repo = os.getcwd()
+    output = os.path.abspath(args.output) if args.output else None
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        source = prepare_scratch(scratch, repo, args.db and os.path.abspath(args.db), args.passengers)
+        os.chdir(scratch)  # every service, the checkpointer and the FAQ store use ./database
+
+        env = offline_graph(args.llm_ms)
+        env["db_path"] = env["pool"].db_path
+        from chatbot.tools.Database import close_all_pools
+        memory = env["memory"]
+        rss_start = rss_mb()
+        levels = [run_level(concurrency, args.sessions or 2 * concurrency, args, env, rng)
+                  for concurrency in args.concurrency or (1, 4, 16)]
+
+        report = {
+            "meta": {
+                "git_commit": git_commit(repo),
+                "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "database": source,
+                "mode": args.mode,
+                "llm_ms": args.llm_ms,
+                "think_ms": args.think_ms,
+                "pool_size": env["pool"].pool_size,
+                "threads": threading.active_count(),
+            },
+            "rss_start_mb": rss_start,
+            "levels": levels,
+        }
+        memory.close()
+        close_all_pools()
+        os.chdir(repo)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
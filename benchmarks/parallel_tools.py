@@ -0,0 +1,117 @@
+"""Batch latency of parallel tool calls: one call after another vs ToolNode vs ParallelToolNode.
+
+Run from the repository root (no API calls are made):
+
+    python -m benchmarks.parallel_tools
+    python -m benchmarks.parallel_tools --io-ms 150 --batches 20
+
+Every batch is one AI message with several tool calls, like a model asking for hotels, car rentals and
+excursions at once. The calls hit a synthetic inventory (benchmarks/fixtures.py). `--io-ms` adds a
+sleep to every call, standing in for a remote tool such as the web search. One call in each batch
+raises, to check that only that call fails.
+
+Reported per mode: the median and max batch wall time in milliseconds, and the error messages per
+batch (1 expected). For ParallelToolNode the report also includes `tool_executor.get_stats()`:
+summed call time ("serial") against batch wall time, and per-tool calls and errors. Results are
+printed as JSON.
+"""
+import argparse
+import functools
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from langchain_core.messages import AIMessage
+from langgraph.prebuilt import ToolNode
+
+from benchmarks.fixtures import build_inventory_db
+from chatbot.agents.tool_executor import ParallelToolNode, ToolExecutor
+from chatbot.tools.CarService import CarService
+from chatbot.tools.Database import close_all_pools
+from chatbot.tools.Encoding import encode_tools
+from chatbot.tools.ExcursionService import ExcursionService
+from chatbot.tools.HotelService import HotelService
+from chatbot.tools.ResultCache import result_cache
+
+BATCH = [
+    ("search_hotels", {"location": "Zurich"}),
+    ("search_hotels", {"location": "Basel", "name": "Hilton"}),
+    ("search_car_rentals", {"location": "Zurich"}),
+    ("search_car_rentals", {"location": "Basel Airport", "name": "Europcar"}),
+    ("search_trip_recommendations", {"location": "Zurich", "keywords": "museum, history"}),
+    ("search_trip_recommendations", {"location": "Lucerne"}),
+    ("search_hotels", {"location": "Geneva", "cursor": "not-a-cursor"}),  # raises ValueError
+]
+
+
+def with_latency(func, seconds: float):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        time.sleep(seconds)
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def build_tools(db_path: str, io_seconds: float) -> list:
+    tools = []
+    for service in (HotelService(), CarService(), ExcursionService()):
+        service.DB = db_path
+        tools += [with_latency(tool, io_seconds) if io_seconds else tool for tool in service.get_safe_tools()]
+    return encode_tools(tools)
+
+
+def message(batch: int) -> AIMessage:
+    return AIMessage(content="", tool_calls=[
+        {"name": name, "args": args, "id": f"call_{batch}_{i}"} for i, (name, args) in enumerate(BATCH)
+    ])
+
+
+def serial(node: ToolNode, state: dict) -> dict:
+    calls, _ = node._parse_input(state)
+    return {"messages": [node._run_one(call, {}) for call in calls]}
+
+
+def measure(run, batches: int) -> dict:
+    walls, errors = [], []
+    for i in range(batches):
+        result_cache.clear()  # every batch reads the database
+        state = {"messages": [message(i)]}
+        started = time.perf_counter()
+        output = run(state)
+        walls.append((time.perf_counter() - started) * 1000)
+        assert [m.tool_call_id for m in output["messages"]] == [c["id"] for c in state["messages"][-1].tool_calls]
+        errors.append(sum(m.content.startswith("Error:") for m in output["messages"]))
+    return {"median_ms": round(statistics.median(walls), 2), "max_ms": round(max(walls), 2),
+            "errors_per_batch": statistics.mode(errors)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50_000, help="rows per inventory table")
+    parser.add_argument("--batches", type=int, default=30)
+    parser.add_argument("--io-ms", type=float, default=0.0, help="simulated remote latency per call")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = build_inventory_db(os.path.join(tmp, "inventory.sqlite"), rows=args.rows)
+        tools = build_tools(db_path, args.io_ms / 1000)
+        executor = ToolExecutor(max_workers=args.workers)
+        stock, parallel = ToolNode(tools), ParallelToolNode(tools, executor=executor)
+
+        report = {
+            "calls_per_batch": len(BATCH),
+            "io_ms": args.io_ms,
+            "serial": measure(functools.partial(serial, stock), args.batches),
+            "tool_node": measure(stock.invoke, args.batches),
+            "parallel_tool_node": measure(parallel.invoke, args.batches),
+        }
+        report["parallel_tool_node"]["executor"] = executor.get_stats()
+        close_all_pools()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Check that every assistant's request starts with a byte-identical, session-independent prefix.
+
+Run from the repository root (no API calls are made):
+
+    python -m benchmarks.prompt_prefix
+
+For each assistant runnable, the OpenAI request payload (tool schemas, then messages) is rendered for
+two different sessions: other passenger, other conversation, later clock. The static part, meaning
+the tool schemas plus the first system message, must be the common prefix of both. The check also
+verifies that the current time is rendered per call. It prints a JSON report and exits with status 1
+if any assistant breaks the prefix.
+"""
+import json
+import os
+import sys
+import time
+
+from benchmarks.fixtures import use_offline_keys
+
+use_offline_keys()  # before the runnables, whose clients check for a key
+
+from chatbot.agents.primary_assistant import primary_assistant_runnable  # noqa: E402
+from chatbot.agents.specialized_assistants import (  # noqa: E402
+    flight_booking_runnable,
+    hotel_booking_runnable,
+    car_rental_runnable,
+    excursion_runnable,
+)
+
+RUNNABLES = {
+    "primary_assistant": primary_assistant_runnable,
+    "update_flight": flight_booking_runnable,
+    "book_hotel": hotel_booking_runnable,
+    "book_car_rental": car_rental_runnable,
+    "book_excursion": excursion_runnable,
+}
+
+SESSIONS = [
+    {"messages": [("user", "Hi there, what time is my flight?")],
+     "user_info": "[{'ticket_no': '7240005432906569', 'flight_no': 'LX0112', 'departure_airport': 'CDG'}]"},
+    {"messages": [("user", "I need a hotel in Basel"), ("ai", "Sure, for which dates?"), ("user", "May 1 to May 4")],
+     "user_info": "[{'ticket_no': '7240005432906570', 'flight_no': 'LX0113', 'departure_airport': 'BSL'}]"},
+]
+
+
+def request_payload(runnable, state: dict) -> dict:
+    prompt, model = runnable.first, runnable.last  # prompt | LLM.bind_tools(...)
+    return model.bound._get_request_payload(prompt.invoke(state), **model.kwargs)
+
+
+def serialize(payload: dict) -> str:
+    # the order providers build (and cache) the request in: tool schemas, then messages
+    return json.dumps({"tools": payload.get("tools", []), "messages": payload["messages"]})
+
+
+def main() -> None:
+    report, ok = {}, True
+    for name, runnable in RUNNABLES.items():
+        rendered = []
+        for state in SESSIONS:
+            rendered.append(request_payload(runnable, state))
+            time.sleep(0.01)  # so the two renders see different clocks
+        first, second = (serialize(payload) for payload in rendered)
+        static = serialize({"tools": rendered[0].get("tools", []), "messages": rendered[0]["messages"][:1]})[:-2]
+        common = os.path.commonprefix([first, second])
+        times = [payload["messages"][-1]["content"] for payload in rendered]
+        result = {
+            "request_bytes": len(first.encode()),
+            "static_prefix_bytes": len(static.encode()),
+            "common_prefix_bytes": len(common.encode()),
+            "prefix_preserved": common.startswith(static),
+            "time_rendered_per_call": times[0] != times[1],
+        }
+        ok &= result["prefix_preserved"] and result["time_rendered_per_call"]
+        report[name] = result
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
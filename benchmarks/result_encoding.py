@@ -0,0 +1,76 @@
+"""Size of the service tool results in the message history: ToolNode's JSON vs the compact encoding.
+
+Run from the repository root (no API calls are made):
+
+    python -m benchmarks.result_encoding
+    python -m benchmarks.result_encoding --db ./database/travel2.sqlite --limit 50
+
+Each sample call runs through `Encoding.result_encoder`, the same wrapper the graph's tool nodes use.
+The report is `result_encoder.get_stats()`: per tool, the bytes and estimated tokens of the JSON that
+ToolNode would have stored ("before") and of the encoded text ("after"), summed over the calls. It
+uses the travel database when it exists. Otherwise it uses a synthetic inventory
+(benchmarks/fixtures.py), which has no flight tables, so the flight calls are skipped. Results are
+printed as JSON.
+"""
+import argparse
+import json
+import os
+import tempfile
+
+from benchmarks.fixtures import build_inventory_db
+from chatbot.tools.CarService import CarService
+from chatbot.tools.Database import close_all_pools
+from chatbot.tools.Encoding import result_encoder
+from chatbot.tools.ExcursionService import ExcursionService
+from chatbot.tools.FlightService import FlightService
+from chatbot.tools.HotelService import HotelService
+
+
+def sample_calls(limit: int) -> list[tuple]:
+    """(service, method name, kwargs, needs the flight tables)"""
+    return [
+        (FlightService, "search_flights", {"departure_airport": "CDG", "limit": limit}, True),
+        (FlightService, "search_flights", {"arrival_airport": "BSL", "limit": limit}, True),
+        (HotelService, "search_hotels", {"location": "Zurich", "limit": limit}, False),
+        (HotelService, "search_hotels", {"location": "Basel", "name": "Hilton", "limit": limit}, False),
+        (CarService, "search_car_rentals", {"location": "Basel", "limit": limit}, False),
+        (CarService, "search_car_rentals", {"name": "Europcar", "limit": limit}, False),
+        (ExcursionService, "search_trip_recommendations", {"location": "Zurich", "limit": limit}, False),
+        (ExcursionService, "search_trip_recommendations", {"keywords": "art, history", "limit": limit}, False),
+    ]
+
+
+def run(db_path: str, limit: int, with_flights: bool) -> None:
+    for service_class, method, kwargs, needs_flights in sample_calls(limit):
+        if needs_flights and not with_flights:
+            continue
+        service = service_class()
+        service.DB = db_path
+        result_encoder.wrap(getattr(service, method))(**kwargs)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="./database/travel2.sqlite")
+    parser.add_argument("--limit", type=int, default=10, help="page size of the sample searches")
+    parser.add_argument("--rows", type=int, default=5_000, help="inventory rows when the synthetic fixture is used")
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        source = args.db
+        run(args.db, args.limit, with_flights=True)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            source = f"synthetic inventory, {args.rows} rows per table"
+            run(build_inventory_db(os.path.join(tmp, "inventory.sqlite"), rows=args.rows), args.limit,
+                with_flights=False)
+            close_all_pools()
+
+    stats = result_encoder.get_stats()
+    totals = {key: sum(tool[key] for tool in stats["by_tool"].values())
+              for key in ("bytes_before", "bytes_after", "tokens_before", "tokens_after")}
+    print(json.dumps({"database": source, "by_tool": stats["by_tool"], "total": totals}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
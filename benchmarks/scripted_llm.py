@@ -0,0 +1,223 @@
+"""Deterministic stand-ins for the OpenAI chat model and embeddings, for the offline benchmarks.
+
+`ScriptedChatModel` plays every assistant of the graph without a network call. The tools it was bound
+to tell it which assistant is calling (the primary assistant holds the `To*` delegation tools, a
+specialized one its service tools and `CompleteOrEscalate`); the conversation tells it what to do next.
+Its rules follow the prompts closely enough for the scenarios in `benchmarks/e2e.py`:
+
+    primary       policy questions -> lookup_policy, "what time / when" -> answer from the user info,
+                  a hotel / car / excursion / flight request -> delegate to the first one mentioned
+    specialized   another domain only, or a policy question -> CompleteOrEscalate; a booking request with search results in the
+                  history -> the booking tool on the first available row; otherwise the search tool
+    after a tool  a short answer built from the tool result
+
+Because it decides from the state, not from a fixed list of replies, the scripts keep working when the
+graph skips or adds an LLM call (intent routing, retries, escalation). `latency` adds a fixed delay to
+every call (`time.sleep` / `asyncio.sleep`), standing in for the model's response time.
+"""
+import asyncio
+import json
+import re
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from benchmarks.fixtures import CITIES
+
+# domain -> (delegation tool, search tool, booking tool, id argument of the booking tool, id column)
+SKILLS = {
+    "flight": ("ToFlightBookingAssistant", "search_flights", "update_ticket_to_new_flight", "new_flight_id",
+               "flight_id"),
+    "hotel": ("ToHotelBookingAssistant", "search_hotels", "book_hotel", "hotel_id", "id"),
+    "car": ("ToBookCarRental", "search_car_rentals", "book_car_rental", "rental_id", "id"),
+    "excursion": ("ToBookExcursion", "search_trip_recommendations", "book_excursion", "recommendation_id", "id"),
+}
+DOMAIN_PATTERNS = {
+    "flight": re.compile(r"\bflights?\b", re.IGNORECASE),
+    "hotel": re.compile(r"\b(hotel|lodging|room|accommodation)s?\b", re.IGNORECASE),
+    "car": re.compile(r"\b(car|transportation|rental)s?\b", re.IGNORECASE),
+    "excursion": re.compile(r"\b(excursion|museum|recommendation|tour|activit(y|ies))s?\b", re.IGNORECASE),
+}
+BOOK = re.compile(r"\b(book|reserve|reservation|go ahead|pick one|option is great)\b", re.IGNORECASE)
+POLICY = re.compile(r"\b(allowed|policy|policies|permitted|rules)\b", re.IGNORECASE)
+INFO = re.compile(r"\b(what time|when)\b", re.IGNORECASE)
+CITY = re.compile(r"\b(" + "|".join(re.escape(city) for city in CITIES) + r")\b")
+AIRPORT_CITIES = {"BSL": "Basel", "ZRH": "Zurich", "GVA": "Geneva"}
+DEFAULT_CITY = "Basel"
+
+
+def parse_rows(content: str) -> list[dict]:
+    """Rows of a tool result, in the compact table encoding (Encoding.py) or as JSON."""
+    lines = str(content).splitlines()
+    if len(lines) >= 2 and re.fullmatch(r"\d+ rows", lines[0]):
+        columns = lines[1].split("|")
+        return [dict(zip(columns, line.split("|"))) for line in lines[2:] if not line.startswith("more_results:")]
+    try:
+        rows = json.loads(content)
+    except (TypeError, ValueError):
+        return []
+    return [row for row in rows if isinstance(row, dict) and not row.get("more_results")] \
+        if isinstance(rows, list) else []
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Rule-based chat model for the offline benchmarks (see the module docstring)."""
+
+    latency: float = 0.0
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools: list, **kwargs: Any):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    # conversation helpers ------------------------------------------------------------------------
+
+    @staticmethod
+    def _turn(messages: list[BaseMessage]) -> tuple[str, list[BaseMessage]]:
+        """Text of the last user message and the messages after it (system messages left out)."""
+        messages = [m for m in messages if not isinstance(m, SystemMessage)]
+        for i in range(len(messages) - 1, -1, -1):
+            if isinstance(messages[i], HumanMessage):
+                return str(messages[i].content), messages[i + 1:]
+        return "", messages
+
+    @staticmethod
+    def _user_info(messages: list[BaseMessage]) -> dict:
+        """First row of the user's flight information rendered into the prompt (FLIGHTS_CONTEXT)."""
+        for message in messages:
+            match = re.search(r"<Flights>\n(.*?)\n</Flights>", str(message.content), re.DOTALL)
+            if isinstance(message, SystemMessage) and match:
+                rows = parse_rows(match.group(1))
+                return rows[0] if rows else {}
+        return {}
+
+    @staticmethod
+    def _results(messages: list[BaseMessage], tool_name: str) -> list[dict]:
+        """Rows of the latest call of `tool_name` in the history."""
+        names = {call["id"]: call["name"] for m in messages if isinstance(m, AIMessage) for call in m.tool_calls}
+        for message in reversed(messages):
+            if isinstance(message, ToolMessage) and names.get(message.tool_call_id) == tool_name:
+                return parse_rows(message.content)
+        return []
+
+    @staticmethod
+    def _mentioned(text: str) -> list[str]:
+        """Domains mentioned in `text`, in the order they appear."""
+        found = [(match.start(), domain) for domain, pattern in DOMAIN_PATTERNS.items()
+                 if (match := pattern.search(text))]
+        return [domain for _, domain in sorted(found)]
+
+    @staticmethod
+    def _call(name: str, args: dict) -> AIMessage:
+        return AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": f"call_{uuid.uuid4().hex[:12]}"}])
+
+    def _city(self, messages: list[BaseMessage]) -> str:
+        """The last city the user named, else the destination of their flight."""
+        for message in reversed(messages):
+            if isinstance(message, HumanMessage) and (match := CITY.search(str(message.content))):
+                return match.group(0)
+        return AIRPORT_CITIES.get(self._user_info(messages).get("arrival_airport"), DEFAULT_CITY)
+
+    # assistants ----------------------------------------------------------------------------------
+
+    def _primary(self, messages: list[BaseMessage], tools: dict) -> AIMessage:
+        text, turn = self._turn(messages)
+        last = turn[-1] if turn else None
+        if isinstance(last, ToolMessage) and not last.content.startswith("Resuming dialog"):
+            return AIMessage(content=f"Here is what I found: {str(last.content)[:200]}")
+        escalations = sum(isinstance(m, ToolMessage) and m.content.startswith("Resuming dialog") for m in turn)
+        if POLICY.search(text):
+            return self._call("lookup_policy", {"query": text})
+        if INFO.search(text):
+            info = self._user_info(messages)
+            return AIMessage(content=f"Your flight {info.get('flight_no', '')} leaves "
+                                     f"{info.get('departure_airport', '')} at {info.get('scheduled_departure', '')}.")
+        domains = self._mentioned(text)
+        if domains and escalations < 2:
+            delegate, today = SKILLS[domains[0]][0], datetime.now().date()
+            args = {"location": self._city(messages), "request": text,
+                    "checkin_date": str(today), "checkout_date": str(today + timedelta(days=7)),
+                    "start_date": str(today), "end_date": str(today + timedelta(days=7))}
+            return self._call(delegate, {key: value for key, value in args.items() if key in tools.get(delegate, args)})
+        return AIMessage(content="Is there anything else I can help you with for your trip?")
+
+    def _specialized(self, domain: str, messages: list[BaseMessage]) -> AIMessage:
+        _, search, book, id_argument, id_column = SKILLS[domain]
+        text, turn = self._turn(messages)
+        last = turn[-1] if turn else None
+        if isinstance(last, ToolMessage) and not last.content.startswith("The assistant is now"):
+            if last.content.startswith("API call denied"):
+                return AIMessage(content="Understood, I have not made that change.")
+            rows = parse_rows(last.content)
+            if not rows or not BOOK.search(text) or last.status == "error":
+                return AIMessage(content=f"I found {len(rows)} options. {str(last.content)[:200]}" if rows
+                                 else f"Done: {str(last.content)[:200]}")
+
+        mentioned = self._mentioned(text)
+        if mentioned and domain not in mentioned:
+            return self._call("CompleteOrEscalate", {"cancel": True, "reason": f"The user asked about {mentioned[0]}."})
+        if POLICY.search(text):
+            # only the primary assistant can look up the policies
+            return self._call("CompleteOrEscalate", {"cancel": False, "reason": "The user asked about the policy."})
+        rows = self._results(messages, search)
+        if BOOK.search(text) and rows:
+            available = [row for row in rows if str(row.get("booked", "0")) in ("0", "False")] or rows
+            info = self._user_info(messages)
+            if domain == "flight":
+                available = [row for row in available if row.get("flight_id") != info.get("flight_id")] or available
+                return self._call(book, {"ticket_no": info.get("ticket_no", ""),
+                                         id_argument: int(available[0][id_column])})
+            return self._call(book, {id_argument: int(available[0][id_column])})
+        if domain == "flight":
+            info = self._user_info(messages)
+            start = datetime.now() + timedelta(days=7 if "week" in text.lower() else 0)
+            return self._call(search, {"departure_airport": info.get("departure_airport"),
+                                       "arrival_airport": info.get("arrival_airport"),
+                                       "start_time": str(start.date()), "limit": 5})
+        args = {"location": self._city(messages)}
+        if domain == "excursion" and "museum" in text.lower():
+            args["keywords"] = "museum"
+        return self._call(search, args)
+
+    def respond(self, messages: list[BaseMessage], tools: Optional[list] = None) -> AIMessage:
+        # tool name -> its argument names
+        tools = {tool["function"]["name"]: tool["function"]["parameters"].get("properties", {}) for tool in tools or []}
+        for domain, (_, search, *_rest) in SKILLS.items():
+            if search in tools and "CompleteOrEscalate" in tools:
+                return self._specialized(domain, messages)
+        return self._primary(messages, tools)
+
+    # BaseChatModel -------------------------------------------------------------------------------
+
+    def _generate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None, run_manager=None,
+                  tools: Optional[list] = None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        self.calls += 1
+        message = self.respond(messages, tools)
+        message.response_metadata = {"model_name": self._llm_type}
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None, run_manager=None,
+                         tools: Optional[list] = None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.calls += 1
+        message = self.respond(messages, tools)
+        message.response_metadata = {"model_name": self._llm_type}
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def scripted_embeddings(size: int = 256) -> DeterministicFakeEmbedding:
+    """Hash-seeded random vectors: the same text always gets the same vector, no API call is made."""
+    return DeterministicFakeEmbedding(size=size)
@@ -0,0 +1,93 @@
+"""Check that paging through an inventory text search shows every match exactly once.
+
+Run from the repository root (no API calls are made; the database is written to a temp directory):
+
+    python -m benchmarks.search_paging
+
+Each search below matches rows through the full-text index and, further down the same result list, rows
+only the LIKE scan finds (infix matches such as "la" in "Interlaken"). The search is paged with
+`FullText.search_text`, following `next_cursor` from page to page and, separately, `next_offset`,
+for several page sizes so that the switch from index matches to infix matches falls inside a page and
+on a page boundary. Every chain must return the union of both match sets, with no row twice, index
+matches first (in id order, or bm25 order when ranked) and infix matches after them in id order. The
+check prints a JSON report and exits with status 1 if any chain does not.
+"""
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+
+from benchmarks.fixtures import build_inventory_db
+from chatbot.tools import FullText
+from chatbot.tools.Database import close_all_pools
+
+# (table, terms, ranked); each has both index and infix-only matches in the synthetic inventory
+SEARCHES = [
+    ("hotels", {"location": ["la"]}, False),
+    ("hotels", {"location": ["la"]}, True),
+    ("car_rentals", {"location": ["la"], "name": ["Europcar", "ertz"]}, False),
+    ("trip_recommendations", {"location": ["la"], "keywords": ["art", "mu"]}, True),
+]
+PAGE_SIZES = [1, 3, 7, 10]
+
+
+def expected_ids(db_path: str, table: str, terms: dict, ranked: bool) -> tuple[list[int], list[int]]:
+    """Index matches in the order `FullText.fts_page` serves them, and the infix-only matches by id."""
+    expression = FullText.match_expression(terms)
+    index = FullText._INDEX[table]
+    conn = sqlite3.connect(db_path)
+    order = f"bm25({index}), rowid" if ranked else "rowid"
+    fts = [row[0] for row in conn.execute(f"SELECT rowid FROM {index} WHERE {index} MATCH ? ORDER BY {order}",
+                                          (expression,))]
+    where, params = [], []
+    for column, alternatives in terms.items():
+        where.append("(" + " OR ".join(f"{column} LIKE ?" for _ in alternatives) + ")")
+        params.extend(f"%{alternative}%" for alternative in alternatives)
+    like = [row[0] for row in conn.execute(f"SELECT id FROM {table} WHERE {' AND '.join(where)} ORDER BY id",
+                                           params)]
+    conn.close()
+    found = set(fts)
+    return fts, [id_ for id_ in like if id_ not in found]
+
+
+def page_through(db_path: str, table: str, terms: dict, ranked: bool, limit: int, by: str) -> list[int]:
+    ids, cursor, offset = [], None, 0
+    for _ in range(10_000):
+        rows = FullText.search_text(db_path, table, terms, limit=limit, offset=offset, cursor=cursor, ranked=ranked)
+        marker = rows[-1] if rows and rows[-1].get("more_results") else None
+        ids += [row["id"] for row in rows if not row.get("more_results")]
+        if marker is None:
+            return ids
+        if by == "cursor":
+            cursor = marker["next_cursor"]
+        else:
+            offset = marker["next_offset"]
+    raise RuntimeError("cursor chain does not end")
+
+
+def main() -> None:
+    results, ok = [], True
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = build_inventory_db(os.path.join(tmp, "inventory.sqlite"), rows=400)
+        for table, terms, ranked in SEARCHES:
+            fts, infix = expected_ids(db_path, table, terms, ranked)
+            expected = fts + infix
+            for limit in PAGE_SIZES:
+                for by in ("cursor", "offset"):
+                    ids = page_through(db_path, table, terms, ranked, limit, by)
+                    passed = ids == expected
+                    ok &= passed
+                    results.append({
+                        "table": table, "terms": terms, "ranked": ranked, "limit": limit, "follow": by,
+                        "index_matches": len(fts), "infix_matches": len(infix), "returned": len(ids),
+                        "duplicates": len(ids) - len(set(ids)), "missing": len(set(expected) - set(ids)),
+                        "passed": passed,
+                    })
+        close_all_pools()
+    print(json.dumps({"passed": ok, "chains": results}, indent=2))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
+import argparse
+import asyncio
 import uuid
-from chatbot.graph import graph
-from langchain_core.messages import ToolMessage
+from chatbot.agents.agents_utilities import deny_tool_calls
+from chatbot.graph import get_graph
+from chatbot.demo import PASSENGER_ID, QUESTIONS
+from chatbot.metrics import registry
 from pathlib import Path
 from chatbot.tools.Data import DataPreparer
 
@@ -21,35 +25,72 @@ def _print_event(event: dict, _printed: set, max_length=1500):
             _printed.add(message.id)
 
 
+async def arun_session(questions: list, config: dict, approve=None, verbose: bool = True) -> None:
+    """Async version of the loop below: one conversation driven through `graph.astream`.
+
+    LLM calls are awaited and the (blocking) SQLite tools run in worker threads, so any number of these
+    can share one event loop. `approve(state)` answers the sensitive-tool interrupts with "y" or a denial
+    reason, given the thread's state (its last message holds the pending calls); by default every action
+    is approved.
+    """
+    graph = get_graph()
+    _printed = set()
+    for question in questions:
+        this_event = None
+        async for event in graph.astream({"messages": ("user", question)}, config, stream_mode="values"):
+            this_event = event
+            if verbose:
+                _print_event(this_event, _printed)
+        snapshot = await graph.aget_state(config)
+
+        while snapshot.next:
+            # the state, not the last streamed event: after a resume it holds the call now pending
+            answer = approve(snapshot.values) if approve else "y"
+            if answer.strip() == "y":
+                await graph.ainvoke(None, config)
+            else:
+                await graph.ainvoke(deny_tool_calls(snapshot.values["messages"][-1], answer), config)
+            snapshot = await graph.aget_state(config)
+
+
+async def arun_sessions(questions: list, passenger_ids: list) -> None:
+    """Run one conversation per passenger concurrently in the current event loop."""
+    await asyncio.gather(*(
+        arun_session(
+            questions,
+            {"configurable": {"passenger_id": passenger_id, "thread_id": str(uuid.uuid4())}},
+            verbose=len(passenger_ids) == 1,
+        )
+        for passenger_id in passenger_ids
+    ))
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--async-sessions", type=int, default=0,
+                        help="run N auto-approved conversations concurrently with graph.astream")
+    parser.add_argument("--metrics-out", help="write the latency histograms (chatbot/metrics.py) to this JSON file")
+    args = parser.parse_args()
 
     # set up the data if not already downloaded (prepare_all will check if files exist already)
     Path("./database").mkdir(parents=True, exist_ok=True)
     _d = DataPreparer()
     _d.prepare_all()
+    graph = get_graph()
+
+    # the default questions (see chatbot/demo.py)
+    user_input = list(QUESTIONS)
 
-    # set up some default questions (change as you like!)
-    user_input = [
-        "Hi there, what time is my flight?",
-        "Am I allowed to update my flight to something sooner? I want to leave later today.",
-        "Update my flight to sometime next week then",
-        "The next available option is great",
-        "what about lodging and transportation?",
-        "Yeah i think i'd like an affordable hotel for my week-long stay (7 days). And I'll want to rent a car.",
-        "OK could you place a reservation for your recommended hotel? It sounds nice.",
-        "yes go ahead and book anything that's moderate expense and has availability.",
-        "Now for a car, what are my options?",
-        "Awesome let's just get the cheapest option. Go ahead and book for 7 days",
-        "Cool so now what recommendations do you have on excursions?",
-        "Are they available while I'm there?",
-        "interesting - i like the museums, what options are there? ",
-        "OK great pick one and book it for my second day there.",
-    ]
+    if args.async_sessions:
+        asyncio.run(arun_sessions(user_input, [PASSENGER_ID] * args.async_sessions))
+        if args.metrics_out:
+            registry.dump(args.metrics_out)
+        raise SystemExit(0)
 
     # create unique chat id (passenger_id to help retrieve client info)
     config = {
         "configurable": {
-            "passenger_id": "3442 587242",
+            "passenger_id": PASSENGER_ID,
             "thread_id": str(uuid.uuid4()),
         }
     }
@@ -76,15 +117,8 @@ if __name__ == "__main__":
                 result = graph.invoke(None, config)
             else:
                 # Satisfy the tool invocation by providing instructions on the requested changes / change of mind
-                result = graph.invoke(
-                    {
-                        "messages": [
-                            ToolMessage(
-                                tool_call_id=this_event["messages"][-1].tool_calls[0]["id"],
-                                content=f"API call denied by user. Reasoning: '{user_input}'. Continue assisting, accounting for the user's input.",
-                            )
-                        ]
-                    },
-                    config,
-                )
+                result = graph.invoke(deny_tool_calls(snapshot.values["messages"][-1], user_input), config)
             snapshot = graph.get_state(config)
+
+    if args.metrics_out:
+        registry.dump(args.metrics_out)
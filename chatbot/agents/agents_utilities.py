@@ -47,3 +47,17 @@ def create_entry_node(assistant_name: str, new_dialog_state: str) -> Callable:
         }
 
     return entry_node
+
+
+# The answer to a denied sensitive-tools interrupt: one ToolMessage per pending call (a message can carry several,
+# see tool_executor.py), otherwise the next LLM call is rejected for the unanswered ones.
+def deny_tool_calls(message, reason: str) -> dict:
+    return {
+        "messages": [
+            ToolMessage(
+                tool_call_id=tool_call["id"],
+                content=f"API call denied by user. Reasoning: '{reason}'. Continue assisting, accounting for the user's input.",
+            )
+            for tool_call in message.tool_calls
+        ]
+    }
@@ -1,34 +1,173 @@
-from langchain_core.runnables import Runnable, RunnableConfig
+import asyncio
+import random
+import threading
+import time
+from typing import Callable, Optional, Union
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
 from chatbot.state import State
-from chatbot.tools.llm import LLM
+from chatbot.tools.llm import get_llm
 from chatbot.agents.agents_utilities import CompleteOrEscalate
+from chatbot.agents.context_manager import ContextManager, context_manager as default_context_manager
+
+
+class EmptyResponseError(RuntimeError):
+    """The LLM kept answering with neither content nor tool calls."""
+
+
+class RetryPolicy:
+    """How an assistant node retries empty LLM responses.
+
+    At most `max_attempts` LLM calls are made, and no retry is started once `max_time` seconds have
+    passed since the first one. Retries wait `initial_backoff * backoff_factor ** n` seconds (capped at
+    `max_backoff`, with +/- `jitter` relative noise). When attempts run out, `on_exhausted` decides:
+        "fallback"  answer with `fallback_message` (the default),
+        "raise"     raise `EmptyResponseError`,
+        "return"    return the last (empty) response,
+        callable    `on_exhausted(state, result)` returns the message to use.
+    Calls, retries and exhaustions are counted per node and model (`get_stats()`).
+    """
+
+    def __init__(self,
+                 max_attempts: int = 3,
+                 max_time: float = 30.0,
+                 initial_backoff: float = 0.5,
+                 backoff_factor: float = 2.0,
+                 max_backoff: float = 8.0,
+                 jitter: float = 0.1,
+                 on_exhausted: Union[str, Callable] = "fallback",
+                 fallback_message: str = "Sorry, I could not produce an answer just now. Could you rephrase or try again?",
+                 ):
+        if not callable(on_exhausted) and on_exhausted not in ("fallback", "raise", "return"):
+            raise ValueError(f"Unknown on_exhausted: {on_exhausted!r}")
+        self.max_attempts = max_attempts
+        self.max_time = max_time
+        self.initial_backoff = initial_backoff
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.on_exhausted = on_exhausted
+        self.fallback_message = fallback_message
+        self._lock = threading.Lock()
+        self.stats: dict[str, dict] = {}
+
+    def next_delay(self, attempt: int, started: float) -> Optional[float]:
+        """Seconds to wait before attempt `attempt + 1`, or None when the policy is exhausted."""
+        if attempt >= self.max_attempts:
+            return None
+        delay = min(self.max_backoff, self.initial_backoff * self.backoff_factor ** (attempt - 1))
+        delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        if time.monotonic() - started + delay > self.max_time:
+            return None
+        return delay
+
+    def exhausted(self, state: State, result):
+        if callable(self.on_exhausted):
+            return self.on_exhausted(state, result)
+        if self.on_exhausted == "raise":
+            raise EmptyResponseError(f"No usable LLM response after {self.max_attempts} attempts")
+        if self.on_exhausted == "fallback":
+            return AIMessage(content=self.fallback_message)
+        return result
+
+    def record(self, node: str, result, attempts: int, exhausted: bool) -> None:
+        model = result.response_metadata.get("model_name", "unknown") if result is not None else "unknown"
+        with self._lock:
+            stats = self.stats.setdefault(f"{node}/{model}", {"calls": 0, "retries": 0, "exhausted": 0})
+            stats["calls"] += 1
+            stats["retries"] += attempts - 1
+            stats["exhausted"] += int(exhausted)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {key: dict(stats) for key, stats in self.stats.items()}
+
+
+# shared by every assistant node unless one is given its own
+default_retry_policy = RetryPolicy()
 
 
 # a wrapper class
 class Assistant:
-    def __init__(self, runnable: Runnable):
+    def __init__(self, runnable: Runnable, context_manager: Optional[ContextManager] = None,
+                 retry_policy: Optional[RetryPolicy] = None):
         self.runnable = runnable
+        self.context_manager = context_manager
+        self.retry_policy = retry_policy or default_retry_policy
+
+    @staticmethod
+    def _node(config: RunnableConfig) -> str:
+        return config.get("metadata", {}).get("langgraph_node", "assistant")
+
+    def _bound_context(self, state: State, config: RunnableConfig) -> tuple[State, dict]:
+        # the LLM sees a trimmed history; the state keeps every message
+        if self.context_manager is None:
+            return state, {}
+        messages, update = self.context_manager.apply(state, self._node(config))
+        return {**state, "messages": messages}, update
+
+    @staticmethod
+    def _is_empty(result) -> bool:
+        return not result.tool_calls and (
+            not result.content
+            or isinstance(result.content, list)
+            and not result.content[0].get("text")
+        )
+
+    @staticmethod
+    def _ask_for_real_output(state: State) -> State:
+        messages = state["messages"] + [("user", "Respond with a real output.")]
+        return {**state, "messages": messages}
 
     def __call__(self, state: State, config: RunnableConfig):
+        state, update = self._bound_context(state, config)
+        started, attempt = time.monotonic(), 1
+        while True:
+            result = self.runnable.invoke(state, config)
+
+            if not self._is_empty(result):
+                break
+            delay = self.retry_policy.next_delay(attempt, started)
+            if delay is None:
+                self.retry_policy.record(self._node(config), result, attempt, exhausted=True)
+                return {"messages": self.retry_policy.exhausted(state, result), **update}
+            time.sleep(delay)
+            state = self._ask_for_real_output(state)
+            attempt += 1
+        self.retry_policy.record(self._node(config), result, attempt, exhausted=False)
+        return {"messages": result, **update}
+
+    async def acall(self, state: State, config: RunnableConfig):
+        """Same as `__call__`, but awaits the LLM so the event loop keeps serving other sessions."""
+        state, update = self._bound_context(state, config)
+        started, attempt = time.monotonic(), 1
         while True:
-            result = self.runnable.invoke(state)
-
-            if not result.tool_calls and (
-                not result.content
-                or isinstance(result.content, list)
-                and not result.content[0].get("text")
-            ):
-                messages = state["messages"] + [("user", "Respond with a real output.")]
-                state = {**state, "messages": messages}
-                messages = state["messages"] + [("user", "Respond with a real output.")]
-                state = {**state, "messages": messages}
-            else:
+            result = await self.runnable.ainvoke(state, config)
+
+            if not self._is_empty(result):
                 break
-        return {"messages": result}
+            delay = self.retry_policy.next_delay(attempt, started)
+            if delay is None:
+                self.retry_policy.record(self._node(config), result, attempt, exhausted=True)
+                return {"messages": self.retry_policy.exhausted(state, result), **update}
+            await asyncio.sleep(delay)
+            state = self._ask_for_real_output(state)
+            attempt += 1
+        self.retry_policy.record(self._node(config), result, attempt, exhausted=False)
+        return {"messages": result, **update}
 
 
 # a function for compose a runnable to be passed into the wrapper Assistant
 def create_runnable(safe_tools, sensitive_tools, prompt):
     tools = safe_tools + sensitive_tools
-    runnable = prompt | LLM.bind_tools(tools + [CompleteOrEscalate])
+    runnable = prompt | get_llm().bind_tools(tools + [CompleteOrEscalate])
     return runnable
+
+
+# a graph node for an assistant: `invoke`/`stream` call it synchronously, `ainvoke`/`astream` await `acall`
+def create_assistant_node(runnable: Runnable,
+                          context_manager: Optional[ContextManager] = default_context_manager,
+                          retry_policy: Optional[RetryPolicy] = None) -> RunnableLambda:
+    assistant = Assistant(runnable, context_manager, retry_policy)
+    return RunnableLambda(assistant, afunc=assistant.acall)
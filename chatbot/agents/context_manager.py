@@ -0,0 +1,146 @@
+import json
+import threading
+from typing import Callable
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+
+def approximate_tokens(message: BaseMessage) -> int:
+    """Cheap token estimate (~4 characters per token, plus per-message overhead); no tokenizer download."""
+    size = len(message.content) if isinstance(message.content, str) else len(json.dumps(message.content))
+    if isinstance(message, AIMessage) and message.tool_calls:
+        size += len(json.dumps(message.tool_calls, default=str))
+    return size // 4 + 4
+
+
+def _snippet(text, length: int) -> str:
+    text = " ".join(str(text).split())
+    return text if len(text) <= length else text[:length] + "..."
+
+
+def extractive_summarizer(previous: str, messages: list[BaseMessage], max_chars: int = 2000) -> str:
+    """Default summarizer: one short line per dropped message, appended to the previous summary."""
+    lines = [previous] if previous else []
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            lines.append(f"User: {_snippet(message.content, 200)}")
+        elif isinstance(message, AIMessage):
+            if message.content:
+                lines.append(f"Assistant: {_snippet(message.content, 200)}")
+            for tool_call in message.tool_calls:
+                lines.append(f"Assistant called {tool_call['name']}({_snippet(json.dumps(tool_call['args'], default=str), 120)})")
+        elif isinstance(message, ToolMessage):
+            lines.append(f"Tool {message.name or ''} returned: {_snippet(message.content, 120)}")
+    summary = "\n".join(lines)
+    # rolling: the oldest lines go first once the summary outgrows its budget
+    return summary if len(summary) <= max_chars else summary[-max_chars:].split("\n", 1)[-1]
+
+
+def llm_summarizer(llm) -> Callable[[str, list[BaseMessage]], str]:
+    """Summarizer that asks `llm` to fold the dropped messages into the previous summary."""
+    def summarize(previous: str, messages: list[BaseMessage]) -> str:
+        transcript = extractive_summarizer("", messages, max_chars=8000)
+        prompt = (
+            "Update the running summary of a customer support conversation. Keep booking ids, ticket numbers, "
+            "dates, locations and decisions the user made; drop chit-chat.\n\n"
+            f"Current summary:\n{previous or '(empty)'}\n\nNew messages:\n{transcript}\n\nUpdated summary:"
+        )
+        return llm.invoke(prompt).content
+    return summarize
+
+
+class ContextManager:
+    """Bounds the conversation history an assistant sends to the LLM.
+
+    The full history stays in the graph state; only the prompt is trimmed. Before each assistant call:
+        1. messages older than the last `keep_recent_turns` user turns are "stale": their tool outputs
+           (row dumps, hand-off instructions) are cut to `stale_tool_chars` characters,
+        2. while the messages exceed `max_tokens`, the oldest stale messages are folded into a rolling
+           summary (kept in the state as `context_summary`) and removed from the prompt.
+    Messages are dropped in whole blocks, an AIMessage with tool calls together with its ToolMessages,
+    so every tool call in the prompt still has its answer. Tokens saved are counted per graph node.
+    """
+
+    def __init__(self,
+                 max_tokens: int = 6000,
+                 keep_recent_turns: int = 3,
+                 stale_tool_chars: int = 300,
+                 summarizer: Callable[[str, list[BaseMessage]], str] = extractive_summarizer,
+                 token_counter: Callable[[BaseMessage], int] = approximate_tokens,
+                 ):
+        self.max_tokens = max_tokens
+        self.keep_recent_turns = keep_recent_turns
+        self.stale_tool_chars = stale_tool_chars
+        self.summarizer = summarizer
+        self.token_counter = token_counter
+        self._lock = threading.Lock()
+        self.stats: dict[str, dict] = {}
+
+    def _shorten(self, message: BaseMessage) -> BaseMessage:
+        content = message.content
+        if not isinstance(message, ToolMessage) or not isinstance(content, str) or len(content) <= self.stale_tool_chars:
+            return message
+        cut = len(content) - self.stale_tool_chars
+        return message.copy(update={"content": f"{content[:self.stale_tool_chars]}... [{cut} older characters removed]"})
+
+    @staticmethod
+    def _blocks(messages: list[BaseMessage]) -> list[list[BaseMessage]]:
+        blocks = []
+        for message in messages:
+            if isinstance(message, ToolMessage) and blocks:
+                blocks[-1].append(message)  # stays with the AIMessage that called it
+            else:
+                blocks.append([message])
+        return blocks
+
+    def _count(self, node: str, before: int, after: int) -> None:
+        with self._lock:
+            stats = self.stats.setdefault(node, {"calls": 0, "tokens_in": 0, "tokens_sent": 0, "tokens_saved": 0})
+            stats["calls"] += 1
+            stats["tokens_in"] += before
+            stats["tokens_sent"] += after
+            stats["tokens_saved"] += before - after
+
+    def apply(self, state: dict, node: str = "assistant") -> tuple[list[BaseMessage], dict]:
+        """Return the messages to send and the state update for the rolling summary."""
+        messages = state["messages"]
+        summary = state.get("context_summary") or ""
+        summarized = state.get("context_summarized_count") or 0
+
+        human_positions = [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+        recent_start = human_positions[-self.keep_recent_turns] if len(human_positions) >= self.keep_recent_turns else 0
+        recent_start = max(recent_start, summarized)
+
+        stale = [self._shorten(m) for m in messages[summarized:recent_start]]
+        recent = messages[recent_start:]
+        count = self.token_counter
+
+        budget = self.max_tokens - sum(count(m) for m in recent)
+        blocks = self._blocks(stale)
+        stale_tokens = sum(count(m) for m in stale)
+        dropped = []
+        while blocks and stale_tokens > budget:
+            block = blocks.pop(0)
+            stale_tokens -= sum(count(m) for m in block)
+            dropped.extend(block)
+
+        update = {}
+        if dropped:
+            summary = self.summarizer(summary, dropped)
+            summarized += len(dropped)
+            update = {"context_summary": summary, "context_summarized_count": summarized}
+
+        kept = [m for block in blocks for m in block] + recent
+        if summary:
+            kept = [SystemMessage(content=f"Summary of the earlier conversation:\n{summary}")] + kept
+
+        self._count(node, sum(count(m) for m in messages), sum(count(m) for m in kept))
+        return kept, update
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {node: dict(stats) for node, stats in self.stats.items()}
+
+
+# shared by every assistant node
+context_manager = ContextManager()
@@ -0,0 +1,210 @@
+import re
+import threading
+import time
+import uuid
+from datetime import date
+from typing import Optional
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.pydantic_v1 import ValidationError
+
+from chatbot.agents.primary_assistant import (
+    ToBookCarRental,
+    ToBookExcursion,
+    ToFlightBookingAssistant,
+    ToHotelBookingAssistant,
+)
+
+# the delegation tools the router can answer with, by name
+DELEGATIONS = {model.__name__: model for model in
+               (ToFlightBookingAssistant, ToBookCarRental, ToHotelBookingAssistant, ToBookExcursion)}
+FLIGHT, CAR, HOTEL, EXCURSION = (ToFlightBookingAssistant.__name__, ToBookCarRental.__name__,
+                                 ToHotelBookingAssistant.__name__, ToBookExcursion.__name__)
+
+# (pattern, weight) per delegation tool. A message is routed only when one intent clearly dominates;
+# questions ("what time is my flight?") and mixed requests ("hotel and a car") go to the LLM as before.
+INTENT_RULES = {
+    FLIGHT: [
+        # "booking" alone is no flight signal: hotels, cars and excursions are booked too
+        (r"\b(change|update|reschedule|rebook|move|switch|cancel)\b.{0,40}\b(flight|ticket)\b", 3.0),
+        (r"\b(flight|ticket)\b.{0,40}\b(to|for)\b.{0,20}\b(sooner|earlier|later|next week|tomorrow)\b", 2.0),
+        (r"\b(earlier|later|different|another|new) flight\b", 2.0),
+        (r"\bcancel\b", 1.0),
+    ],
+    HOTEL: [
+        (r"\b(book|reserve|find|need|want|looking for)\b.{0,40}\b(hotel|room|accommodation|lodging)s?\b", 3.0),
+        (r"\b(hotel|accommodation|lodging)s?\b", 1.5),
+        (r"\b(check-?in|check-?out|nights?)\b", 1.0),
+    ],
+    CAR: [
+        (r"\b(rent|hire|book|reserve|need|want)\b.{0,30}\b(car|vehicle)s?\b", 3.0),
+        (r"\b(car rental|rental car|car hire)s?\b", 3.0),
+        (r"\b(car|vehicle)s?\b", 1.5),
+    ],
+    EXCURSION: [
+        (r"\b(book|reserve|recommend\w*|suggest\w*|find)\b.{0,40}\b(excursion|tour|trip|activit(y|ies)|sightseeing)\w*\b", 3.0),
+        (r"\b(excursion|tour|sightseeing|museum|things to do)s?\b", 1.5),
+    ],
+}
+
+# the date fields of the delegation tools that take a stay or a rental period: (start, end)
+DATE_FIELDS = {HOTEL: ("checkin_date", "checkout_date"), CAR: ("start_date", "end_date")}
+
+MONTHS = {name: number for number, names in enumerate((
+    ("jan", "january"), ("feb", "february"), ("mar", "march"), ("apr", "april"), ("may",), ("jun", "june"),
+    ("jul", "july"), ("aug", "august"), ("sep", "sept", "september"), ("oct", "october"), ("nov", "november"),
+    ("dec", "december")), 1) for name in names}
+WEEKDAYS = {"monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"}
+_MONTH = "|".join(sorted(MONTHS, key=len, reverse=True))
+DATE_PATTERNS = [
+    # 2024-05-02
+    re.compile(r"\b(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})\b"),
+    # May 2, May 2nd, May 2, 2024
+    re.compile(rf"\b(?P<month>{_MONTH})\.?\s+(?P<day>\d{{1,2}})(?:st|nd|rd|th)?\b(?:,?\s+(?P<year>\d{{4}}))?",
+               re.IGNORECASE),
+    # 2 May, 2nd of May, 2 May 2024
+    re.compile(rf"\b(?P<day>\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?(?P<month>{_MONTH})\b\.?(?:,?\s+(?P<year>\d{{4}}))?",
+               re.IGNORECASE),
+]
+# a capitalized place name after "in", "at", "near" or "around" (Zurich, Basel Airport)
+LOCATION_PATTERN = re.compile(r"\b(?:in|at|near|around)\s+((?:[A-Z][\w'-]*)(?:\s+[A-Z][\w'-]*)*)")
+
+
+def extract_dates(text: str, today: Optional[date] = None) -> list[date]:
+    """Calendar dates named in `text`, in order. A date without a year is the next one on or after
+    `today`, and a later date without a year never comes before the one before it (Dec 30 to Jan 2)."""
+    today = today or date.today()
+    found = []
+    for pattern in DATE_PATTERNS:
+        for match in pattern.finditer(text):
+            month = match.group("month")
+            month = int(month) if month.isdigit() else MONTHS[month.lower()]
+            found.append((match.start(), match.end(), int(match.group("day")), month, match.group("year")))
+    dates, covered = [], 0
+    for start, end, day, month, year in sorted(found):
+        if start < covered:
+            continue  # the same text read by another pattern ("2 May 3")
+        covered = end
+        try:
+            if year:
+                value = date(int(year), month, day)
+            else:
+                value = date(today.year, month, day)
+                floor = dates[-1] if dates else today
+                if value < floor:
+                    value = value.replace(year=value.year + 1)
+        except ValueError:
+            continue  # February 30th and the like
+        dates.append(value)
+    return dates
+
+
+def extract_location(text: str) -> Optional[str]:
+    """The first capitalized place name after a preposition, without trailing month or weekday names."""
+    for match in LOCATION_PATTERN.finditer(text):
+        words = []
+        for word in match.group(1).split():
+            if word.lower().rstrip(".") in MONTHS or word.lower() in WEEKDAYS:
+                break
+            words.append(word)
+        if words:
+            return " ".join(words)
+    return None
+
+class IntentRouter:
+    """Keyword intent classifier that hands clear booking requests straight to a specialized assistant.
+
+    It answers in the primary assistant's place with the same delegation tool call the LLM would have
+    made (`ToHotelBookingAssistant`, ...), so the `enter_*` nodes and the specialized assistants work
+    unchanged and one LLM round trip is saved. A message is routed when its best intent scores at least
+    `min_score` and holds at least `min_confidence` of all matched weight, and when the message itself
+    names every field the delegation tool requires (a location, two dates): the arguments are validated
+    against the tool's schema. Anything else falls back to the primary assistant.
+    """
+
+    def __init__(self, rules: Optional[dict] = None, min_score: float = 3.0, min_confidence: float = 0.8):
+        self.rules = {
+            intent: [(re.compile(pattern, re.IGNORECASE), weight) for pattern, weight in patterns]
+            for intent, patterns in (rules or INTENT_RULES).items()
+        }
+        self.min_score = min_score
+        self.min_confidence = min_confidence
+        self._lock = threading.Lock()
+        self.stats = {"messages": 0, "routed": 0, "fallbacks": 0, "incomplete": 0, "classify_seconds_total": 0.0,
+                      "by_intent": {}}
+
+    def scores(self, text: str) -> dict[str, float]:
+        return {
+            intent: sum(weight for pattern, weight in patterns if pattern.search(text))
+            for intent, patterns in self.rules.items()
+        }
+
+    def classify(self, text: str) -> tuple[Optional[str], float]:
+        """Return (delegation tool name or None, confidence)."""
+        scores = self.scores(text)
+        total = sum(scores.values())
+        if not total:
+            return None, 0.0
+        intent, best = max(scores.items(), key=lambda item: item[1])
+        confidence = best / total
+        if best < self.min_score or confidence < self.min_confidence:
+            return None, confidence
+        return intent, confidence
+
+    @staticmethod
+    def arguments(intent: str, text: str, today: Optional[date] = None) -> Optional[dict]:
+        """The delegation tool's arguments taken from `text`, or None when a required one is missing."""
+        candidate = {"request": text}
+        location = extract_location(text)
+        if location:
+            candidate["location"] = location
+        if intent in DATE_FIELDS:
+            dates = extract_dates(text, today)
+            if len(dates) >= 2 and dates[0] <= dates[1]:
+                start_field, end_field = DATE_FIELDS[intent]
+                candidate[start_field], candidate[end_field] = dates[0].isoformat(), dates[1].isoformat()
+        model = DELEGATIONS[intent]
+        try:
+            return model(**{key: value for key, value in candidate.items() if key in model.__fields__}).dict()
+        except ValidationError:
+            return None
+
+    def route(self, text: str) -> Optional[AIMessage]:
+        """The delegation tool-call message for `text`, or None when the LLM should decide."""
+        started = time.perf_counter()
+        intent, confidence = self.classify(text)
+        args = self.arguments(intent, text) if intent is not None else None
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.stats["messages"] += 1
+            self.stats["classify_seconds_total"] += elapsed
+            if args is None:
+                self.stats["fallbacks"] += 1
+                self.stats["incomplete"] += intent is not None
+            else:
+                self.stats["routed"] += 1
+                self.stats["by_intent"][intent] = self.stats["by_intent"].get(intent, 0) + 1
+        if args is None:
+            return None
+        return AIMessage(
+            content="",
+            tool_calls=[{"name": intent, "args": args, "id": f"call_router_{uuid.uuid4().hex[:24]}"}],
+            additional_kwargs={"intent_router": {"confidence": round(confidence, 3)}},
+        )
+
+    def __call__(self, state: dict, config) -> dict:
+        enabled = config.get("configurable", {}).get("intent_router", True)
+        last = state["messages"][-1]
+        message = self.route(last.content) if enabled and isinstance(last, HumanMessage) \
+            and isinstance(last.content, str) else None
+        # an empty list still counts as a write, and leaves the messages unchanged
+        return {"messages": [message] if message is not None else []}
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats, by_intent=dict(self.stats["by_intent"]))
+        stats["mean_classify_seconds"] = stats["classify_seconds_total"] / stats["messages"] if stats["messages"] else None
+        return stats
+
+
+intent_router = IntentRouter()
@@ -1,22 +1,18 @@
 from langchain_core.pydantic_v1 import BaseModel, Field
-from langchain_core.prompts import ChatPromptTemplate
-from chatbot.tools.llm import LLM
-from datetime import datetime
-from langchain_community.tools.tavily_search import TavilySearchResults
+from langchain_core.runnables import Runnable
+from chatbot.tools.llm import get_llm
+from chatbot.agents.prompts import FLIGHTS_CONTEXT, build_prompt
 from langchain_core.tools import tool
 
-from chatbot.tools.FlightService import FlightService
-from chatbot.tools.Data import DataPreparer
-
-s = FlightService()
+from chatbot.lazy import once
+from chatbot.tools.services import flight_service
+from chatbot.tools.PolicyRetriever import policy_retriever
 
 @tool
 def lookup_policy(query: str) -> str:
     """Consult the company policies to check whether certain operations are permitted. \
     Use this before making any flight changes performing other 'write' events."""
-    d = DataPreparer()
-    retriever = d.start_retriever()
-    retrieved_docs = retriever.invoke(query)
+    retrieved_docs = policy_retriever.invoke(query)
     return "\n\n".join([doc.page_content for doc in retrieved_docs])
 
 
@@ -90,36 +86,51 @@ class ToBookExcursion(BaseModel):
         }
 
 
-primary_assistant_prompt = ChatPromptTemplate.from_messages(
-    [
-        (
-            "system",
-            "You are a helpful customer support assistant for Swiss Airlines. "
-            "Your primary role is to search for flight information and company policies to answer customer queries. "
-            "If a customer requests to update or cancel a flight, book a car rental, book a hotel, or get trip recommendations, "
-            "delegate the task to the appropriate specialized assistant by invoking the corresponding tool. You are not able to make these types of changes yourself."
-            " Only the specialized assistants are given permission to do this for the user."
-            "The user is not aware of the different specialized assistants, so do not mention them; just quietly delegate through function calls. "
-            "Provide detailed information to the customer, and always double-check the database before concluding that information is unavailable. "
-            " When searching, be persistent. Expand your query bounds if the first search returns no results. "
-            " If a search comes up empty, expand your search before giving up."
-            "\n\nCurrent user flight information:\n<Flights>\n{user_info}\n</Flights>"
-            "\nCurrent time: {time}.",
-        ),
-        ("placeholder", "{messages}"),
-    ]
-).partial(time=datetime.now())
-primary_assistant_tools = [
-    TavilySearchResults(max_results=1),
-    s.search_flights,
-    lookup_policy,
-]
-primary_assistant_runnable = primary_assistant_prompt | LLM.bind_tools(
-    primary_assistant_tools
-    + [
-        ToFlightBookingAssistant,
-        ToBookCarRental,
-        ToHotelBookingAssistant,
-        ToBookExcursion,
-    ]
+primary_assistant_prompt = build_prompt(
+    instructions=(
+        "You are a helpful customer support assistant for Swiss Airlines. "
+        "Your primary role is to search for flight information and company policies to answer customer queries. "
+        "If a customer requests to update or cancel a flight, book a car rental, book a hotel, or get trip recommendations, "
+        "delegate the task to the appropriate specialized assistant by invoking the corresponding tool. You are not able to make these types of changes yourself."
+        " Only the specialized assistants are given permission to do this for the user."
+        "The user is not aware of the different specialized assistants, so do not mention them; just quietly delegate through function calls. "
+        "Provide detailed information to the customer, and always double-check the database before concluding that information is unavailable. "
+        " When searching, be persistent. Expand your query bounds if the first search returns no results. "
+        " If a search comes up empty, expand your search before giving up."
+    ),
+    session_context=FLIGHTS_CONTEXT,
 )
+
+
+# the web search client and the LLM are created on first use: langchain_community and openai are slow imports
+@once
+def get_primary_assistant_tools() -> list:
+    from langchain_community.tools.tavily_search import TavilySearchResults
+
+    return [
+        TavilySearchResults(max_results=1),
+        flight_service.search_flights,
+        lookup_policy,
+    ]
+
+
+@once
+def get_primary_assistant_runnable() -> Runnable:
+    return primary_assistant_prompt | get_llm().bind_tools(
+        get_primary_assistant_tools()
+        + [
+            ToFlightBookingAssistant,
+            ToBookCarRental,
+            ToHotelBookingAssistant,
+            ToBookExcursion,
+        ]
+    )
+
+
+def __getattr__(name):
+    # the former module-level names still work
+    if name == "primary_assistant_tools":
+        return get_primary_assistant_tools()
+    if name == "primary_assistant_runnable":
+        return get_primary_assistant_runnable()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
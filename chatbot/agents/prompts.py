@@ -0,0 +1,32 @@
+from datetime import datetime
+from typing import Optional
+
+from langchain_core.prompts import ChatPromptTemplate
+
+# per-session block for assistants that need the passenger's tickets
+FLIGHTS_CONTEXT = "Current user flight information:\n<Flights>\n{user_info}\n</Flights>"
+
+CURRENT_TIME = "Current time: {time}."
+
+
+def current_time() -> str:
+    # a callable partial is evaluated on every format, so a long-running server never serves a stale time
+    return str(datetime.now())
+
+
+def build_prompt(instructions: str, session_context: Optional[str] = None) -> ChatPromptTemplate:
+    """Assemble an assistant prompt so that whatever changes between calls comes last.
+
+    Provider-side prompt caching reuses the longest byte-identical prefix of a request (tool schemas,
+    then messages), so the layout is:
+        1. `instructions`   static system text, identical for every session
+        2. `session_context` per-session data such as `{user_info}`, stable across one session's turns
+        3. the conversation `{messages}`
+        4. the current time, rendered on every call
+    `instructions` must not contain template variables.
+    """
+    messages = [("system", instructions)]
+    if session_context:
+        messages.append(("system", session_context))
+    messages += [("placeholder", "{messages}"), ("system", CURRENT_TIME)]
+    return ChatPromptTemplate.from_messages(messages).partial(time=current_time)
@@ -1,131 +1,126 @@
-from datetime import datetime
-from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable
+
 from chatbot.agents.assistant_wrapper import create_runnable
+from chatbot.agents.prompts import FLIGHTS_CONTEXT, build_prompt
+from chatbot.lazy import once
+from chatbot.tools.services import flight_service, car_service, hotel_service, excursion_service
 
-from chatbot.tools.FlightService import FlightService
-from chatbot.tools.CarService import CarService
-from chatbot.tools.HotelService import HotelService
-from chatbot.tools.ExcursionService import ExcursionService
+# Flight booking assistant  ######################################################
+flight_booking_prompt = build_prompt(
+    instructions=(
+        "You are a specialized assistant for handling flight updates. "
+        " The primary assistant delegates work to you whenever the user needs help updating their bookings. "
+        "Confirm the updated flight details with the customer and inform them of any additional fees. "
+        " When searching, be persistent. Expand your query bounds if the first search returns no results. "
+        "If you need more information or the customer changes their mind, escalate the task back to the main assistant."
+        " Remember that a booking isn't completed until after the relevant tool has successfully been used."
+        "\n\nIf the user needs help, and none of your tools are appropriate for it, then"
+        ' "CompleteOrEscalate" the dialog to the host assistant. Do not waste the user\'s time. Do not make up invalid tools or functions.'
+    ),
+    session_context=FLIGHTS_CONTEXT,
+)
 
 
-flight_service = FlightService()
-car_service = CarService()
-hotel_service = HotelService()
-excursion_service = ExcursionService()
+# Hotel booking assistant  ######################################################
+book_hotel_prompt = build_prompt(
+    instructions=(
+        "You are a specialized assistant for handling hotel bookings. "
+        "The primary assistant delegates work to you whenever the user needs help booking a hotel. "
+        "Search for available hotels based on the user's preferences and confirm the booking details with the customer. "
+        " When searching, be persistent. Expand your query bounds if the first search returns no results. "
+        "If you need more information or the customer changes their mind, escalate the task back to the main assistant."
+        " Remember that a booking isn't completed until after the relevant tool has successfully been used."
+        '\n\nIf the user needs help, and none of your tools are appropriate for it, then "CompleteOrEscalate" the dialog to the host assistant.'
+        " Do not waste the user's time. Do not make up invalid tools or functions."
+        "\n\nSome examples for which you should CompleteOrEscalate:\n"
+        " - 'what's the weather like this time of year?'\n"
+        " - 'nevermind i think I'll book separately'\n"
+        " - 'i need to figure out transportation while i'm there'\n"
+        " - 'Oh wait i haven't booked my flight yet i'll do that first'\n"
+        " - 'Hotel booking confirmed'"
+    ),
+)
 
-# Flight booking assistant  ######################################################
-flight_booking_prompt = ChatPromptTemplate.from_messages(
-    [
-        (
-            "system",
-            "You are a specialized assistant for handling flight updates. "
-            " The primary assistant delegates work to you whenever the user needs help updating their bookings. "
-            "Confirm the updated flight details with the customer and inform them of any additional fees. "
-            " When searching, be persistent. Expand your query bounds if the first search returns no results. "
-            "If you need more information or the customer changes their mind, escalate the task back to the main assistant."
-            " Remember that a booking isn't completed until after the relevant tool has successfully been used."
-            "\n\nCurrent user flight information:\n\n{user_info}\n"
-            "\nCurrent time: {time}."
-            "\n\nIf the user needs help, and none of your tools are appropriate for it, then"
-            ' "CompleteOrEscalate" the dialog to the host assistant. Do not waste the user\'s time. Do not make up invalid tools or functions.',
-        ),
-        ("placeholder", "{messages}"),
-    ]
-).partial(time=datetime.now())
 
-flight_booking_runnable = create_runnable(
-    safe_tools=flight_service.get_safe_tools(),
-    sensitive_tools=flight_service.get_sensitive_tools(),
-    prompt=flight_booking_prompt,
+# car Rental assistant  ######################################################
+book_car_rental_prompt = build_prompt(
+    instructions=(
+        "You are a specialized assistant for handling car rental bookings. "
+        "The primary assistant delegates work to you whenever the user needs help booking a car rental. "
+        "Search for available car rentals based on the user's preferences and confirm the booking details with the customer. "
+        " When searching, be persistent. Expand your query bounds if the first search returns no results. "
+        "If you need more information or the customer changes their mind, escalate the task back to the main assistant."
+        " Remember that a booking isn't completed until after the relevant tool has successfully been used."
+        "\n\nIf the user needs help, and none of your tools are appropriate for it, then "
+        '"CompleteOrEscalate" the dialog to the host assistant. Do not waste the user\'s time. Do not make up invalid tools or functions.'
+        "\n\nSome examples for which you should CompleteOrEscalate:\n"
+        " - 'what's the weather like this time of year?'\n"
+        " - 'What flights are available?'\n"
+        " - 'nevermind i think I'll book separately'\n"
+        " - 'Oh wait i haven't booked my flight yet i'll do that first'\n"
+        " - 'Car rental booking confirmed'"
+    ),
 )
 
-# Hotel booking assistant  ######################################################
-book_hotel_prompt = ChatPromptTemplate.from_messages(
-    [
-        (
-            "system",
-            "You are a specialized assistant for handling hotel bookings. "
-            "The primary assistant delegates work to you whenever the user needs help booking a hotel. "
-            "Search for available hotels based on the user's preferences and confirm the booking details with the customer. "
-            " When searching, be persistent. Expand your query bounds if the first search returns no results. "
-            "If you need more information or the customer changes their mind, escalate the task back to the main assistant."
-            " Remember that a booking isn't completed until after the relevant tool has successfully been used."
-            "\nCurrent time: {time}."
-            '\n\nIf the user needs help, and none of your tools are appropriate for it, then "CompleteOrEscalate" the dialog to the host assistant.'
-            " Do not waste the user's time. Do not make up invalid tools or functions."
-            "\n\nSome examples for which you should CompleteOrEscalate:\n"
-            " - 'what's the weather like this time of year?'\n"
-            " - 'nevermind i think I'll book separately'\n"
-            " - 'i need to figure out transportation while i'm there'\n"
-            " - 'Oh wait i haven't booked my flight yet i'll do that first'\n"
-            " - 'Hotel booking confirmed'",
-        ),
-        ("placeholder", "{messages}"),
-    ]
-).partial(time=datetime.now())
 
-hotel_booking_runnable = create_runnable(
-    safe_tools=hotel_service.get_safe_tools(),
-    sensitive_tools=hotel_service.get_sensitive_tools(),
-    prompt=book_hotel_prompt,
+# Excursion assistant  ######################################################
+book_excursion_prompt = build_prompt(
+    instructions=(
+        "You are a specialized assistant for handling trip recommendations. "
+        "The primary assistant delegates work to you whenever the user needs help booking a recommended trip. "
+        "Search for available trip recommendations based on the user's preferences and confirm the booking details with the customer. "
+        "If you need more information or the customer changes their mind, escalate the task back to the main assistant."
+        " When searching, be persistent. Expand your query bounds if the first search returns no results. "
+        " Remember that a booking isn't completed until after the relevant tool has successfully been used."
+        '\n\nIf the user needs help, and none of your tools are appropriate for it, then "CompleteOrEscalate" the dialog to the host assistant. Do not waste the user\'s time. Do not make up invalid tools or functions.'
+        "\n\nSome examples for which you should CompleteOrEscalate:\n"
+        " - 'nevermind i think I'll book separately'\n"
+        " - 'i need to figure out transportation while i'm there'\n"
+        " - 'Oh wait i haven't booked my flight yet i'll do that first'\n"
+        " - 'Excursion booking confirmed!'"
+    ),
 )
 
-# car Rental assistant  ######################################################
-book_car_rental_prompt = ChatPromptTemplate.from_messages(
-    [
-        (
-            "system",
-            "You are a specialized assistant for handling car rental bookings. "
-            "The primary assistant delegates work to you whenever the user needs help booking a car rental. "
-            "Search for available car rentals based on the user's preferences and confirm the booking details with the customer. "
-            " When searching, be persistent. Expand your query bounds if the first search returns no results. "
-            "If you need more information or the customer changes their mind, escalate the task back to the main assistant."
-            " Remember that a booking isn't completed until after the relevant tool has successfully been used."
-            "\nCurrent time: {time}."
-            "\n\nIf the user needs help, and none of your tools are appropriate for it, then "
-            '"CompleteOrEscalate" the dialog to the host assistant. Do not waste the user\'s time. Do not make up invalid tools or functions.'
-            "\n\nSome examples for which you should CompleteOrEscalate:\n"
-            " - 'what's the weather like this time of year?'\n"
-            " - 'What flights are available?'\n"
-            " - 'nevermind i think I'll book separately'\n"
-            " - 'Oh wait i haven't booked my flight yet i'll do that first'\n"
-            " - 'Car rental booking confirmed'",
+
+# Runnables  ######################################################
+# binding the tool schemas needs the LLM client, so the runnables are built on first use, not on import
+@once
+def get_specialized_runnables() -> dict[str, Runnable]:
+    """The specialized assistants' runnables (prompt | LLM with their tools bound), by dialog state."""
+    return {
+        "update_flight": create_runnable(
+            safe_tools=flight_service.get_safe_tools(),
+            sensitive_tools=flight_service.get_sensitive_tools(),
+            prompt=flight_booking_prompt,
+        ),
+        "book_hotel": create_runnable(
+            safe_tools=hotel_service.get_safe_tools(),
+            sensitive_tools=hotel_service.get_sensitive_tools(),
+            prompt=book_hotel_prompt,
+        ),
+        "book_car_rental": create_runnable(
+            safe_tools=car_service.get_safe_tools(),
+            sensitive_tools=car_service.get_sensitive_tools(),
+            prompt=book_car_rental_prompt,
+        ),
+        "book_excursion": create_runnable(
+            safe_tools=excursion_service.get_safe_tools(),
+            sensitive_tools=excursion_service.get_sensitive_tools(),
+            prompt=book_excursion_prompt,
         ),
-        ("placeholder", "{messages}"),
-    ]
-).partial(time=datetime.now())
+    }
 
-car_rental_runnable = create_runnable(
-    safe_tools=car_service.get_safe_tools(),
-    sensitive_tools=car_service.get_sensitive_tools(),
-    prompt=book_car_rental_prompt,
-)
 
-# Excursion assistant  ######################################################
-book_excursion_prompt = ChatPromptTemplate.from_messages(
-    [
-        (
-            "system",
-            "You are a specialized assistant for handling trip recommendations. "
-            "The primary assistant delegates work to you whenever the user needs help booking a recommended trip. "
-            "Search for available trip recommendations based on the user's preferences and confirm the booking details with the customer. "
-            "If you need more information or the customer changes their mind, escalate the task back to the main assistant."
-            " When searching, be persistent. Expand your query bounds if the first search returns no results. "
-            " Remember that a booking isn't completed until after the relevant tool has successfully been used."
-            "\nCurrent time: {time}."
-            '\n\nIf the user needs help, and none of your tools are appropriate for it, then "CompleteOrEscalate" the dialog to the host assistant. Do not waste the user\'s time. Do not make up invalid tools or functions.'
-            "\n\nSome examples for which you should CompleteOrEscalate:\n"
-            " - 'nevermind i think I'll book separately'\n"
-            " - 'i need to figure out transportation while i'm there'\n"
-            " - 'Oh wait i haven't booked my flight yet i'll do that first'\n"
-            " - 'Excursion booking confirmed!'",
-        ),
-        ("placeholder", "{messages}"),
-    ]
-).partial(time=datetime.now())
+_RUNNABLE_NAMES = {
+    "flight_booking_runnable": "update_flight",
+    "hotel_booking_runnable": "book_hotel",
+    "car_rental_runnable": "book_car_rental",
+    "excursion_runnable": "book_excursion",
+}
 
-excursion_runnable = create_runnable(
-    safe_tools=excursion_service.get_safe_tools(),
-    sensitive_tools=excursion_service.get_sensitive_tools(),
-    prompt=book_excursion_prompt,
-)
+
+def __getattr__(name):
+    # the module-level names of the runnables still work, e.g. `from ... import flight_booking_runnable`
+    if name in _RUNNABLE_NAMES:
+        return get_specialized_runnables()[_RUNNABLE_NAMES[name]]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
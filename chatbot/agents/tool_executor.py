@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import time
+from typing import Optional
+
+from langchain_core.messages import ToolCall, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import ContextThreadPoolExecutor, get_config_list
+from langgraph.prebuilt import ToolNode
+from langgraph.prebuilt.tool_node import TOOL_CALL_ERROR_TEMPLATE, str_output
+
+# Upper bound on calls running at the same time for one tool, across every session. The web search is
+# rate limited by its provider; the database tools are bounded by the executor (and the connection pool).
+TOOL_LIMITS = {"tavily_search_results_json": 2}
+
+
+class ToolExecutor:
+    """Process-wide, bounded thread pool for tool calls.
+
+    The pool outlives the batches, so its threads (and the SQLite connection each of them keeps in
+    `Database.py`'s pool) are reused; ToolNode's own executor is created, and its threads started,
+    for every batch. The context is copied into the worker, so the services still see the run's config.
+    `tool_limits` caps the calls of one tool running at once; calls beyond it wait in their worker.
+    """
+
+    def __init__(self, max_workers: int = 8, tool_limits: Optional[dict] = None):
+        self.max_workers = max_workers
+        self._pool = ContextThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool-call")
+        self._limits = {name: threading.BoundedSemaphore(limit) for name, limit in (tool_limits or TOOL_LIMITS).items()}
+        self._lock = threading.Lock()
+        self.stats = {
+            "batches": 0, "parallel_batches": 0, "calls": 0, "errors": 0,
+            "wall_seconds_total": 0.0, "serial_seconds_total": 0.0, "limit_waits": 0, "by_tool": {},
+        }
+
+    def run(self, name: str, func, *args):
+        """Run `func(*args)` as one call of tool `name`, inside its concurrency limit; returns (result, seconds)."""
+        limit = self._limits.get(name)
+        if limit is not None and not limit.acquire(blocking=False):
+            with self._lock:
+                self.stats["limit_waits"] += 1
+            limit.acquire()
+        try:
+            started = time.perf_counter()
+            result = func(*args)
+            return result, time.perf_counter() - started
+        finally:
+            if limit is not None:
+                limit.release()
+
+    def submit(self, name: str, func, *args):
+        return self._pool.submit(self.run, name, func, *args)
+
+    def record(self, calls: list[ToolCall], results: list[tuple[ToolMessage, float]], wall: float) -> None:
+        with self._lock:
+            self.stats["batches"] += 1
+            self.stats["parallel_batches"] += len(calls) > 1
+            self.stats["calls"] += len(calls)
+            self.stats["wall_seconds_total"] += wall
+            for call, (message, seconds) in zip(calls, results):
+                failed = message.status == "error"
+                self.stats["errors"] += failed
+                self.stats["serial_seconds_total"] += seconds
+                tool = self.stats["by_tool"].setdefault(call["name"], {"calls": 0, "errors": 0, "seconds_total": 0.0})
+                tool["calls"] += 1
+                tool["errors"] += failed
+                tool["seconds_total"] += seconds
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats, by_tool={name: dict(tool) for name, tool in self.stats["by_tool"].items()})
+        # serial: the sum of the call durations, what running the batches one call at a time would have taken
+        wall = stats["wall_seconds_total"]
+        stats["speedup"] = stats["serial_seconds_total"] / wall if wall else None
+        stats["max_workers"] = self.max_workers
+        return stats
+
+
+tool_executor = ToolExecutor()
+
+
+class ParallelToolNode(ToolNode):
+    """ToolNode that runs the calls of one AI message concurrently on the shared `ToolExecutor`.
+
+    Each call is isolated: an exception becomes that call's own error ToolMessage (status "error"),
+    and the other calls of the batch still return their results. The ToolMessages come back in the
+    order of the tool calls, whatever order the calls finish in. A single call runs in the calling
+    thread (sync) or on the executor (async, to keep the event loop free).
+    """
+
+    def __init__(self, tools: list, *, executor: Optional[ToolExecutor] = None, name: str = "tools"):
+        super().__init__(tools, name=name, handle_tool_errors=True)
+        self.executor = executor or tool_executor
+
+    def _run_one(self, call: ToolCall, config: RunnableConfig) -> ToolMessage:
+        # ToolNode's own version, plus status="error" on the messages that report a failure
+        if invalid_tool_message := self._validate_tool_call(call):
+            invalid_tool_message.status = "error"
+            return invalid_tool_message
+        try:
+            message = self.tools_by_name[call["name"]].invoke({**call, "type": "tool_call"}, config)
+            message.content = str_output(message.content)
+            return message
+        except Exception as e:
+            return ToolMessage(TOOL_CALL_ERROR_TEMPLATE.format(error=repr(e)), name=call["name"],
+                               tool_call_id=call["id"], status="error")
+
+    def _func(self, input, config: RunnableConfig):
+        tool_calls, output_type = self._parse_input(input)
+        config_list = get_config_list(config, len(tool_calls))
+        started = time.perf_counter()
+        if len(tool_calls) == 1:
+            results = [self.executor.run(tool_calls[0]["name"], self._run_one, tool_calls[0], config_list[0])]
+        else:
+            futures = [self.executor.submit(call["name"], self._run_one, call, call_config)
+                       for call, call_config in zip(tool_calls, config_list)]
+            results = [future.result() for future in futures]
+        self.executor.record(tool_calls, results, time.perf_counter() - started)
+        outputs = [message for message, _ in results]
+        return outputs if output_type == "list" else {"messages": outputs}
+
+    async def _afunc(self, input, config: RunnableConfig):
+        tool_calls, output_type = self._parse_input(input)
+        config_list = get_config_list(config, len(tool_calls))
+        started = time.perf_counter()
+        results = await asyncio.gather(*(
+            asyncio.wrap_future(self.executor.submit(call["name"], self._run_one, call, call_config))
+            for call, call_config in zip(tool_calls, config_list)
+        ))
+        self.executor.record(tool_calls, results, time.perf_counter() - started)
+        outputs = [message for message, _ in results]
+        return outputs if output_type == "list" else {"messages": outputs}
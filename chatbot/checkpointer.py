@@ -0,0 +1,452 @@
+import asyncio
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from functools import partial
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    SerializerProtocol,
+    get_checkpoint_id,
+)
+from langgraph.checkpoint.serde.types import TASKS
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS checkpoints (
+        thread_id TEXT NOT NULL,
+        checkpoint_ns TEXT NOT NULL DEFAULT '',
+        checkpoint_id TEXT NOT NULL,
+        parent_checkpoint_id TEXT,
+        type TEXT,
+        checkpoint BLOB,
+        metadata BLOB,
+        PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS writes (
+        thread_id TEXT NOT NULL,
+        checkpoint_ns TEXT NOT NULL DEFAULT '',
+        checkpoint_id TEXT NOT NULL,
+        task_id TEXT NOT NULL,
+        idx INTEGER NOT NULL,
+        channel TEXT NOT NULL,
+        type TEXT,
+        value BLOB,
+        PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+    )""",
+    """CREATE TABLE IF NOT EXISTS threads (
+        thread_id TEXT PRIMARY KEY,
+        last_used REAL NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_threads_last_used ON threads (last_used)",
+]
+
+
+class SqliteCheckpointSaver(BaseCheckpointSaver[int]):
+    """Disk-backed, bounded replacement for `MemorySaver`.
+
+    Checkpoints and pending writes go to a SQLite file, so conversations survive a restart and
+    idle ones stop costing memory. Writes are buffered and committed in one transaction every
+    `flush_interval` seconds, once `batch_size` rows are waiting, or before any read (so a run
+    always sees its own checkpoints); a graph step no longer pays for its own fsync.
+
+    A maintenance pass (every `maintenance_interval` seconds) bounds the file:
+        - threads idle for longer than `thread_ttl` seconds are deleted,
+        - beyond `max_threads`, the least recently used threads are deleted,
+        - each thread keeps only its latest `keep_last` checkpoints (and their writes).
+    `get_stats()` reports row counts, payload bytes and file size.
+    """
+
+    def __init__(self,
+                 db_path: str = "./database/checkpoints.sqlite",
+                 *,
+                 serde: Optional[SerializerProtocol] = None,
+                 batch_size: int = 64,
+                 flush_interval: float = 0.5,
+                 thread_ttl: Optional[float] = 7 * 24 * 3600.0,
+                 max_threads: Optional[int] = 10_000,
+                 keep_last: Optional[int] = 20,
+                 maintenance_interval: float = 300.0,
+                 ):
+        super().__init__(serde=serde)
+        if keep_last is not None and keep_last < 2:
+            # a checkpoint's pending sends are read from its parent's writes
+            raise ValueError("keep_last must be at least 2")
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.thread_ttl = thread_ttl
+        self.max_threads = max_threads
+        self.keep_last = keep_last
+        self.maintenance_interval = maintenance_interval
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._pending_checkpoints: list[tuple] = []
+        self._pending_writes: list[tuple] = []
+        self._touched: dict[str, float] = {}
+        self._last_maintenance = time.monotonic()
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self.stats = {
+            "flushes": 0,
+            "rows_flushed": 0,
+            "flush_seconds_total": 0.0,
+            "threads_expired": 0,
+            "threads_evicted": 0,
+            "checkpoints_compacted": 0,
+        }
+        # once per saver: the connection can be closed and reopened any number of times
+        atexit.register(self.close)
+
+    # connection and background flushing --------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        # opened lazily, so importing the graph does not create files
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")  # only takes effect on a new file
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            for statement in SCHEMA:
+                conn.execute(statement)
+            self._conn = conn
+            self._stop = threading.Event()
+            self._flusher = threading.Thread(target=self._flush_loop, name="checkpoint-flusher", daemon=True)
+            self._flusher.start()
+        return self._conn
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+            if time.monotonic() - self._last_maintenance > self.maintenance_interval:
+                self.maintain()
+
+    def flush(self) -> None:
+        """Commit every buffered checkpoint and write in a single transaction."""
+        with self._lock:
+            if not (self._pending_checkpoints or self._pending_writes or self._touched):
+                return
+            started = time.perf_counter()
+            conn = self._connect()
+            rows = len(self._pending_checkpoints) + len(self._pending_writes)
+            conn.execute("BEGIN")
+            try:
+                conn.executemany("INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                 self._pending_checkpoints)
+                conn.executemany("INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                 self._pending_writes)
+                conn.executemany("INSERT OR REPLACE INTO threads VALUES (?, ?)", self._touched.items())
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self._pending_checkpoints = []
+            self._pending_writes = []
+            self._touched = {}
+            self.stats["flushes"] += 1
+            self.stats["rows_flushed"] += rows
+            self.stats["flush_seconds_total"] += time.perf_counter() - started
+
+    def _maybe_flush(self) -> None:
+        if len(self._pending_checkpoints) + len(self._pending_writes) >= self.batch_size:
+            self.flush()
+
+    def close(self) -> None:
+        self._stop.set()
+        with self._lock:
+            self.flush()  # opens the file only if something is still buffered
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # eviction and compaction -------------------------------------------------------------------
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self.flush()
+            conn = self._connect()
+            conn.execute("BEGIN")
+            self._delete_threads(conn, [thread_id])
+            conn.execute("COMMIT")
+
+    @staticmethod
+    def _delete_threads(conn: sqlite3.Connection, thread_ids: list) -> None:
+        for table in ("writes", "checkpoints", "threads"):
+            conn.executemany(f"DELETE FROM {table} WHERE thread_id = ?", [(t,) for t in thread_ids])
+
+    def maintain(self) -> dict:
+        """Expire idle threads, evict LRU threads over `max_threads` and compact long histories."""
+        removed = {"threads_expired": 0, "threads_evicted": 0, "checkpoints_compacted": 0}
+        with self._lock:
+            self.flush()
+            conn = self._connect()
+            conn.execute("BEGIN")
+            try:
+                if self.thread_ttl is not None:
+                    expired = [row[0] for row in conn.execute(
+                        "SELECT thread_id FROM threads WHERE last_used < ?", (time.time() - self.thread_ttl,))]
+                    self._delete_threads(conn, expired)
+                    removed["threads_expired"] = len(expired)
+
+                if self.max_threads is not None:
+                    evicted = [row[0] for row in conn.execute(
+                        "SELECT thread_id FROM threads ORDER BY last_used DESC LIMIT -1 OFFSET ?",
+                        (self.max_threads,))]
+                    self._delete_threads(conn, evicted)
+                    removed["threads_evicted"] = len(evicted)
+
+                if self.keep_last is not None:
+                    stale = """
+                        SELECT thread_id, checkpoint_ns, checkpoint_id FROM (
+                            SELECT thread_id, checkpoint_ns, checkpoint_id, ROW_NUMBER() OVER (
+                                PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC) AS age
+                            FROM checkpoints)
+                        WHERE age > ?"""
+                    rows = conn.execute(stale, (self.keep_last,)).fetchall()
+                    conn.executemany(
+                        "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?", rows)
+                    conn.executemany(
+                        "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?", rows)
+                    removed["checkpoints_compacted"] = len(rows)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            # executescript steps the pragma to completion (execute() would free a single page)
+            conn.executescript("PRAGMA incremental_vacuum;")
+            for key, value in removed.items():
+                self.stats[key] += value
+            self._last_maintenance = time.monotonic()
+        return removed
+
+    def get_stats(self) -> dict:
+        """Storage report: rows, serialized payload bytes and on-disk size, plus flush/eviction counters."""
+        with self._lock:
+            self.flush()
+            conn = self._connect()
+            threads, = conn.execute("SELECT COUNT(*) FROM threads").fetchone()
+            checkpoints, checkpoint_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(checkpoint) + LENGTH(metadata)), 0) FROM checkpoints"
+            ).fetchone()
+            writes, write_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM writes").fetchone()
+            page_count, = conn.execute("PRAGMA page_count").fetchone()
+            page_size, = conn.execute("PRAGMA page_size").fetchone()
+            free_pages, = conn.execute("PRAGMA freelist_count").fetchone()
+            stats = dict(self.stats)
+        wal_path = self.db_path + "-wal"
+        stats.update({
+            "threads": threads,
+            "checkpoints": checkpoints,
+            "writes": writes,
+            "checkpoint_bytes": checkpoint_bytes,
+            "write_bytes": write_bytes,
+            "file_bytes": page_count * page_size,
+            "free_bytes": free_pages * page_size,
+            "wal_bytes": os.path.getsize(wal_path) if os.path.exists(wal_path) else 0,
+            "mean_checkpoint_bytes": checkpoint_bytes / checkpoints if checkpoints else None,
+        })
+        return stats
+
+    # BaseCheckpointSaver -----------------------------------------------------------------------
+
+    def _writes_for(self, conn, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> list:
+        return conn.execute(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+
+    def _tuple(self, conn, thread_id: str, checkpoint_ns: str, row: tuple) -> CheckpointTuple:
+        checkpoint_id, parent_checkpoint_id, type_, checkpoint, metadata = row
+        writes = self._writes_for(conn, thread_id, checkpoint_ns, checkpoint_id)
+        if parent_checkpoint_id:
+            sends = [(t, v) for _, channel, t, v in self._writes_for(conn, thread_id, checkpoint_ns, parent_checkpoint_id)
+                     if channel == TASKS]
+        else:
+            sends = []
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint={
+                **self.serde.loads_typed((type_, checkpoint)),
+                "pending_sends": [self.serde.loads_typed(s) for s in sends],
+            },
+            metadata=self.serde.loads(metadata),
+            pending_writes=[(task_id, channel, self.serde.loads_typed((t, v))) for task_id, channel, t, v in writes],
+            parent_config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": parent_checkpoint_id,
+                }
+            }
+            if parent_checkpoint_id
+            else None,
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata FROM checkpoints"
+        with self._lock:
+            self.flush()
+            conn = self._connect()
+            if checkpoint_id := get_checkpoint_id(config):
+                row = conn.execute(
+                    f"{columns} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = conn.execute(
+                    f"{columns} WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if row is None:
+                return None
+            self._touched[thread_id] = time.time()
+            return self._tuple(conn, thread_id, checkpoint_ns, row)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = ("SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata "
+                 "FROM checkpoints WHERE 1=1")
+        params = []
+        if config:
+            query += " AND thread_id = ?"
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                query += " AND checkpoint_ns = ?"
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                query += " AND checkpoint_id = ?"
+                params.append(checkpoint_id)
+        if before and (before_checkpoint_id := get_checkpoint_id(before)):
+            query += " AND checkpoint_id < ?"
+            params.append(before_checkpoint_id)
+        query += " ORDER BY thread_id, checkpoint_ns, checkpoint_id DESC"
+
+        with self._lock:
+            self.flush()
+            conn = self._connect()
+            rows = conn.execute(query, params).fetchall()
+            results = []
+            for thread_id, checkpoint_ns, *row in rows:
+                if limit is not None and len(results) >= limit:
+                    break
+                if filter:
+                    metadata = self.serde.loads(row[-1])
+                    if not all(value == metadata.get(key) for key, value in filter.items()):
+                        continue
+                results.append(self._tuple(conn, thread_id, checkpoint_ns, row))
+        yield from results
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        c = checkpoint.copy()
+        c.pop("pending_sends")  # type: ignore[misc]
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        type_, payload = self.serde.dumps_typed(c)
+        with self._lock:
+            self._pending_checkpoints.append((
+                thread_id,
+                checkpoint_ns,
+                checkpoint["id"],
+                config["configurable"].get("checkpoint_id"),  # parent
+                type_,
+                payload,
+                self.serde.dumps(metadata),
+            ))
+            self._touched[thread_id] = time.time()
+            self._maybe_flush()
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = [
+            (thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx), channel,
+             *self.serde.dumps_typed(value))
+            for idx, (channel, value) in enumerate(writes)
+        ]
+        with self._lock:
+            self._pending_writes.extend(rows)
+            self._maybe_flush()
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.get_running_loop().run_in_executor(None, self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(
+            None, lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in results:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.put, config, checkpoint, metadata, new_versions
+        )
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+    ) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, partial(self.put_writes, config, writes, task_id))
@@ -1,22 +1,16 @@
+import threading
+import time
 from typing import Literal
 
-from langchain_core.runnables import Runnable
-from langchain_core.messages import ToolMessage
-from langgraph.checkpoint.memory import MemorySaver
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_core.messages import AIMessage, ToolMessage
 from langgraph.graph import StateGraph, START, END
 from langgraph.prebuilt import tools_condition
-from langgraph.prebuilt import ToolNode
 from langchain_core.runnables import RunnableLambda
 
-from chatbot.tools.FlightService import FlightService
-from chatbot.tools.CarService import CarService
-from chatbot.tools.HotelService import HotelService
-from chatbot.tools.ExcursionService import ExcursionService
-
-flight_service = FlightService()
-car_service = CarService()
-hotel_service = HotelService()
-excursion_service = ExcursionService()
+from chatbot.tools.services import flight_service, car_service, hotel_service, excursion_service
+from chatbot.tools.Encoding import encode_tools, result_encoder
+from chatbot.agents.tool_executor import ParallelToolNode
 
 
 def handle_tool_error(state) -> dict:
@@ -34,44 +28,83 @@ def handle_tool_error(state) -> dict:
 
 
 def create_tool_node_with_fallback(tools: list) -> dict:
-    return ToolNode(tools).with_fallbacks([RunnableLambda(handle_tool_error)], exception_key="error")
+    # service results go into the history as compact tables, see Encoding.py. The calls of one message run
+    # concurrently and fail one by one (tool_executor.py); the fallback only answers for a node-level error.
+    return ParallelToolNode(encode_tools(tools)).with_fallbacks([RunnableLambda(handle_tool_error)],
+                                                                 exception_key="error")
 
 
 from chatbot.state import State
+from chatbot.checkpointer import SqliteCheckpointSaver
+from chatbot.lazy import once
+from chatbot.metrics import instrument
 from chatbot.agents.agents_utilities import (
     create_entry_node,
     CompleteOrEscalate,
 )
-from chatbot.agents.assistant_wrapper import Assistant
-from chatbot.agents.specialized_assistants import (
-    flight_booking_runnable,
-    excursion_runnable,
-    car_rental_runnable,
-    hotel_booking_runnable,
-)
+from chatbot.agents.assistant_wrapper import create_assistant_node
+from chatbot.agents.intent_router import intent_router
+from chatbot.agents.specialized_assistants import get_specialized_runnables
 from chatbot.agents.primary_assistant import (
-    primary_assistant_runnable,
-    primary_assistant_tools,
+    get_primary_assistant_runnable,
+    get_primary_assistant_tools,
     ToHotelBookingAssistant,
     ToBookCarRental,
     ToBookExcursion,
     ToFlightBookingAssistant,
 )
 
-# Let's compose the graph
-builder = StateGraph(State)
-
 
 # Fetching the User info
+# user_info is kept in the checkpointed state and only re-fetched (a 4-table join) when it is missing,
+# belongs to another passenger, is older than `configurable.user_info_ttl` seconds (default 300),
+# or when a flight tool that changes the passenger's tickets has run without error since the last fetch
+# (judged from the ToolMessage's name and status, never its text; a refused change only costs a refetch).
+USER_INFO_TTL = 300.0
+user_info_write_tools = {tool.__name__ for tool in flight_service.get_sensitive_tools()}
+user_info_stats = {"fetches": 0, "joins_avoided": 0}
+_user_info_stats_lock = threading.Lock()
+
+
+def user_info_is_stale(state: State, configurable: dict) -> bool:
+    # channels that were never written are passed in as None
+    if state.get("user_info") is None or state.get("user_info_fetched_at") is None:
+        return True
+    if state.get("user_info_passenger_id") != configurable.get("passenger_id"):
+        return True
+    if time.time() - state["user_info_fetched_at"] > configurable.get("user_info_ttl", USER_INFO_TTL):
+        return True
+    for message in state["messages"][state.get("user_info_message_count") or 0:]:
+        if isinstance(message, ToolMessage) and message.name in user_info_write_tools \
+                and message.status != "error":
+            return True
+    return False
+
+
 # function for fetching user info: tool's action function
-def user_info(state: State):
-    fi = FlightService()
-    u_info = fi.fetch_user_flight_information()
-    return {"user_info": u_info}
+def user_info(state: State, config: RunnableConfig):
+    configurable = config.get("configurable", {})
+    if not user_info_is_stale(state, configurable):
+        with _user_info_stats_lock:
+            user_info_stats["joins_avoided"] += 1
+        # a node has to write something; re-writing the cached value leaves the state unchanged
+        return {"user_info": state["user_info"]}
+
+    # rendered into every assistant prompt, so it is stored in the same compact form as the tool results
+    u_info = result_encoder.encode("fetch_user_flight_information", flight_service.fetch_user_flight_information())
+    with _user_info_stats_lock:
+        user_info_stats["fetches"] += 1
+    return {
+        "user_info": u_info,
+        "user_info_fetched_at": time.time(),
+        "user_info_passenger_id": configurable.get("passenger_id"),
+        "user_info_message_count": len(state["messages"]),
+    }
 
 
-builder.add_node("fetch_user_info", RunnableLambda(user_info))
-builder.add_edge(START, "fetch_user_info")
+def get_user_info_stats() -> dict:
+    with _user_info_stats_lock:
+        return dict(user_info_stats)
 
 
 # specialized workflow factory functions: graph_add_specialized_workflows & route_update_workflow
@@ -89,7 +122,7 @@ def graph_add_specialized_workflows(
         action=create_entry_node(assistant_name=assistant_name, new_dialog_state=dialog_state),
     )
     # assistant node
-    graph_builder.add_node(node=dialog_state, action=Assistant(assistant_runnable))
+    graph_builder.add_node(node=dialog_state, action=create_assistant_node(assistant_runnable))
 
     # add edge: entry_node --> assistant_node
     graph_builder.add_edge(start_key=f"enter_{dialog_state}", end_key=dialog_state)
@@ -129,54 +162,13 @@ def graph_add_specialized_workflows(
 
         return f"{dialog_state}_sensitive_tools"
 
-    builder.add_conditional_edges(
+    graph_builder.add_conditional_edges(
         dialog_state,
         route_update_workflow,
     )
     return graph_builder
 
 
-# flight assistant
-builder = graph_add_specialized_workflows(
-    graph_builder=builder,
-    dialog_state="update_flight",
-    assistant_name="Flight Updates & Booking Assistant",
-    assistant_runnable=flight_booking_runnable,
-    safe_tools=flight_service.get_safe_tools(),
-    sensitive_tools=flight_service.get_sensitive_tools(),
-)
-
-# car rental assistant
-builder = graph_add_specialized_workflows(
-    graph_builder=builder,
-    dialog_state="book_car_rental",
-    assistant_name="Car Rental Assistant",
-    assistant_runnable=car_rental_runnable,
-    safe_tools=car_service.get_safe_tools(),
-    sensitive_tools=car_service.get_sensitive_tools(),
-)
-
-# hotel booking assistant
-builder = graph_add_specialized_workflows(
-    graph_builder=builder,
-    dialog_state="book_hotel",
-    assistant_name="Hotel Booking Assistant",
-    assistant_runnable=hotel_booking_runnable,
-    safe_tools=hotel_service.get_safe_tools(),
-    sensitive_tools=hotel_service.get_sensitive_tools(),
-)
-
-# excursions assistant
-builder = graph_add_specialized_workflows(
-    graph_builder=builder,
-    dialog_state="book_excursion",
-    assistant_name="Trip Recommendation Assistant",
-    assistant_runnable=excursion_runnable,
-    safe_tools=excursion_service.get_safe_tools(),
-    sensitive_tools=excursion_service.get_sensitive_tools(),
-)
-
-
 # This node will be shared for exiting all specialized assistants
 def pop_dialog_state(state: State) -> dict:
     """Pop the dialog stack and return to the main assistant.
@@ -199,16 +191,6 @@ def pop_dialog_state(state: State) -> dict:
     }
 
 
-builder.add_node("leave_skill", pop_dialog_state)
-builder.add_edge("leave_skill", "primary_assistant")
-
-# 3. Add Primary Assistant
-builder.add_node("primary_assistant", Assistant(primary_assistant_runnable))
-builder.add_node(
-    "primary_assistant_tools", create_tool_node_with_fallback(primary_assistant_tools)
-)
-
-
 def route_primary_assistant(
         state: State,
 ) -> Literal[
@@ -235,21 +217,19 @@ def route_primary_assistant(
     raise ValueError("Invalid route")
 
 
-# The assistant can route to one of the delegated assistants,
-# directly use a tool, or directly respond to the user
-builder.add_conditional_edges(
+def route_intent_router(
+        state: State,
+) -> Literal[
     "primary_assistant",
-    route_primary_assistant,
-    {
-        "enter_update_flight": "enter_update_flight",
-        "enter_book_car_rental": "enter_book_car_rental",
-        "enter_book_hotel": "enter_book_hotel",
-        "enter_book_excursion": "enter_book_excursion",
-        "primary_assistant_tools": "primary_assistant_tools",
-        END: END,
-    },
-)
-builder.add_edge("primary_assistant_tools", "primary_assistant")
+    "enter_update_flight",
+    "enter_book_hotel",
+    "enter_book_excursion",
+    "enter_book_car_rental",
+]:
+    last = state["messages"][-1]
+    if isinstance(last, AIMessage) and last.tool_calls:
+        return route_primary_assistant(state)
+    return "primary_assistant"
 
 
 # Each delegated workflow can directly respond to the user
@@ -257,7 +237,7 @@ builder.add_edge("primary_assistant_tools", "primary_assistant")
 def route_to_workflow(
         state: State,
 ) -> Literal[
-    "primary_assistant",
+    "intent_router",
     "update_flight",
     "book_car_rental",
     "book_hotel",
@@ -266,21 +246,98 @@ def route_to_workflow(
     """If we are in a delegated state, route directly to the appropriate assistant."""
     dialog_state = state.get("dialog_state")
     if not dialog_state:
-        return "primary_assistant"
+        return "intent_router"
     return dialog_state[-1]
 
 
-builder.add_conditional_edges("fetch_user_info", route_to_workflow)
+# Let's compose the graph
+def build_graph(checkpointer=None):
+    """Compose and compile the assistant graph (instrumented, see chatbot/metrics.py).
+
+    Building binds the tool schemas to the LLM for every assistant, so it creates the LLM and web search
+    clients; the app calls it once, through `get_graph`.
+    """
+    builder = StateGraph(State)
+
+    # Fetching the User info
+    builder.add_node("fetch_user_info", RunnableLambda(user_info))
+    builder.add_edge(START, "fetch_user_info")
+
+    runnables = get_specialized_runnables()
+    for dialog_state, assistant_name, service in (
+            ("update_flight", "Flight Updates & Booking Assistant", flight_service),
+            ("book_car_rental", "Car Rental Assistant", car_service),
+            ("book_hotel", "Hotel Booking Assistant", hotel_service),
+            ("book_excursion", "Trip Recommendation Assistant", excursion_service),
+    ):
+        builder = graph_add_specialized_workflows(
+            graph_builder=builder,
+            dialog_state=dialog_state,
+            assistant_name=assistant_name,
+            assistant_runnable=runnables[dialog_state],
+            safe_tools=service.get_safe_tools(),
+            sensitive_tools=service.get_sensitive_tools(),
+        )
+
+    builder.add_node("leave_skill", pop_dialog_state)
+    builder.add_edge("leave_skill", "primary_assistant")
 
-# Compile graph
-memory = MemorySaver()
-graph = builder.compile(
-    checkpointer=memory,
-    # Let the user approve or deny the use of sensitive tools
-    interrupt_before=[
-        "update_flight_sensitive_tools",
-        "book_car_rental_sensitive_tools",  # car_service.get_sensitive_tools
-        "book_hotel_sensitive_tools",
-        "book_excursion_sensitive_tools",
-    ],
-)
+    # 3. Add Primary Assistant
+    builder.add_node("primary_assistant", create_assistant_node(get_primary_assistant_runnable()))
+    builder.add_node(
+        "primary_assistant_tools", create_tool_node_with_fallback(get_primary_assistant_tools())
+    )
+
+    # The assistant can route to one of the delegated assistants,
+    # directly use a tool, or directly respond to the user
+    builder.add_conditional_edges(
+        "primary_assistant",
+        route_primary_assistant,
+        {
+            "enter_update_flight": "enter_update_flight",
+            "enter_book_car_rental": "enter_book_car_rental",
+            "enter_book_hotel": "enter_book_hotel",
+            "enter_book_excursion": "enter_book_excursion",
+            "primary_assistant_tools": "primary_assistant_tools",
+            END: END,
+        },
+    )
+    builder.add_edge("primary_assistant_tools", "primary_assistant")
+
+    # Clear booking requests skip the primary assistant's LLM call: the intent router answers with the
+    # delegation tool call itself (disable per run with `configurable.intent_router = False`)
+    builder.add_node("intent_router", RunnableLambda(intent_router))
+    builder.add_conditional_edges("intent_router", route_intent_router)
+
+    builder.add_conditional_edges("fetch_user_info", route_to_workflow)
+
+    # Compile graph
+    # every run feeds the latency histograms in chatbot/metrics.py
+    return instrument(builder.compile(
+        checkpointer=checkpointer,
+        # Let the user approve or deny the use of sensitive tools
+        interrupt_before=[
+            "update_flight_sensitive_tools",
+            "book_car_rental_sensitive_tools",  # car_service.get_sensitive_tools
+            "book_hotel_sensitive_tools",
+            "book_excursion_sensitive_tools",
+        ],
+    ))
+
+
+# conversations are checkpointed to ./database/checkpoints.sqlite (bounded, see SqliteCheckpointSaver);
+# the file is only opened on the first run
+memory = SqliteCheckpointSaver()
+
+
+@once
+def get_graph():
+    """The app's graph, checkpointed to `memory`: built on the first call, shared by every later one."""
+    return build_graph(checkpointer=memory)
+
+
+def __getattr__(name):
+    # `from chatbot.graph import graph` keeps working; importing the module alone builds nothing
+    if name == "graph":
+        return get_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
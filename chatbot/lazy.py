@@ -0,0 +1,25 @@
+import functools
+import threading
+
+
+def once(factory):
+    """Decorator for a zero-argument factory: the first call builds the object (under a lock, so
+    concurrent first calls still build it once), every later call returns the same object.
+
+    Used for the expensive module-level objects (LLM client, bound runnables, compiled graph), so that
+    importing a module costs nothing until the object is actually needed. `factory.built()` tells
+    whether it has been built yet.
+    """
+    lock = threading.Lock()
+    built = []
+
+    @functools.wraps(factory)
+    def get():
+        if not built:
+            with lock:
+                if not built:
+                    built.append(factory())
+        return built[0]
+
+    get.built = lambda: bool(built)
+    return get
@@ -0,0 +1,244 @@
+import bisect
+import json
+import threading
+import time
+from typing import Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# upper bounds in seconds; graph runs and LLM calls take seconds, nodes and tools milliseconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# SQL statements and FAQ lookups are usually well below a millisecond
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Histogram:
+    """Prometheus-style histogram: per label set, the observation count, sum and count per bucket."""
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series: dict[tuple, dict] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            series["counts"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def _snapshot(self) -> dict[tuple, dict]:
+        with self._lock:
+            return {key: dict(series, counts=list(series["counts"])) for key, series in self._series.items()}
+
+    def _quantile(self, q: float, counts: list, total: int) -> Optional[float]:
+        # linear interpolation inside the bucket, like PromQL's histogram_quantile
+        if not total:
+            return None
+        rank, seen = q * total, 0
+        for i, count in enumerate(counts):
+            if count and seen + count >= rank:
+                if i == len(self.buckets):
+                    return self.buckets[-1]  # beyond the last bound: the best known lower bound
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def to_dict(self) -> list[dict]:
+        series = []
+        for key, data in sorted(self._snapshot().items()):
+            series.append({
+                "labels": dict(zip(self.labels, key)),
+                "count": data["count"],
+                "sum": data["sum"],
+                "mean": data["sum"] / data["count"] if data["count"] else None,
+                **{f"p{int(q * 100)}": self._quantile(q, data["counts"], data["count"]) for q in (0.5, 0.9, 0.99)},
+                # per bucket, not cumulative; "+Inf" holds the observations above the last bound
+                "buckets": {**{str(bound): count for bound, count in zip(self.buckets, data["counts"])},
+                            "+Inf": data["counts"][-1]},
+            })
+        return series
+
+    def to_prometheus(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, data in sorted(self._snapshot().items()):
+            labels = [f'{label}="{_escape(value)}"' for label, value in zip(self.labels, key)]
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), data["counts"]):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{{{','.join(labels + [le])}}} {cumulative}")
+            suffix = f"{{{','.join(labels)}}}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {data['sum']!r}")
+            lines.append(f"{self.name}_count{suffix} {data['count']}")
+        return lines
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series = {}
+
+
+class MetricsRegistry:
+    """The process's histograms, exported as Prometheus text (`to_prometheus`) or JSON (`to_dict`, `dump`)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: dict[str, Histogram] = {}
+
+    def histogram(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        """Return the histogram `name`, registering it on first use."""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(name, help, labels, buckets)
+            return histogram
+
+    def to_prometheus(self) -> str:
+        with self._lock:
+            histograms = list(self._histograms.values())
+        return "\n".join(line for histogram in histograms for line in histogram.to_prometheus()) + "\n"
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            histograms = list(self._histograms.values())
+        return {histogram.name: histogram.to_dict() for histogram in histograms}
+
+    def dump(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def reset(self) -> None:
+        with self._lock:
+            histograms = list(self._histograms.values())
+        for histogram in histograms:
+            histogram.reset()
+
+
+registry = MetricsRegistry()
+
+run_seconds = registry.histogram(
+    "chatbot_run_seconds", "Wall time of one graph run (a user message or an approval).", ("outcome",))
+node_seconds = registry.histogram("chatbot_node_seconds", "Wall time of one graph node run.", ("node",))
+tool_seconds = registry.histogram("chatbot_tool_seconds", "Wall time of one tool call.", ("tool", "status"))
+llm_seconds = registry.histogram("chatbot_llm_seconds", "Total time of one LLM call.", ("node", "model"))
+llm_first_token_seconds = registry.histogram(
+    "chatbot_llm_first_token_seconds",
+    "Time to the first token of one LLM call (the whole response when the call is not streamed).", ("node", "model"))
+sql_seconds = registry.histogram(
+    "chatbot_sql_seconds", "Time a service method held its database connection.", ("operation",), FAST_BUCKETS)
+retriever_seconds = registry.histogram(
+    "chatbot_retriever_seconds", "Time of one lookup_policy FAQ search, by semantic cache outcome.", ("cache",),
+    FAST_BUCKETS)
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Feeds the graph, node, tool and LLM histograms from the run callbacks.
+
+    A graph run is a run without a parent; its direct children are the node runs (`__start__` and
+    the other internal steps are skipped). A GraphInterrupt (approval needed) ends the graph run with
+    outcome "interrupted". LLM calls are labelled with the node that made them.
+    """
+
+    run_inline = True  # keep the timings out of the async callback executor
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._graph_runs: dict[UUID, float] = {}
+        self._runs: dict[UUID, tuple] = {}
+
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs):
+        now = time.perf_counter()
+        name = kwargs.get("name") or ""
+        with self._lock:
+            if parent_run_id is None:
+                self._graph_runs[run_id] = now
+            elif parent_run_id in self._graph_runs and not name.startswith("__"):
+                self._runs[run_id] = ("node", name, now)
+
+    def _end_chain(self, run_id: UUID, outcome: str) -> None:
+        now = time.perf_counter()
+        with self._lock:
+            graph_started = self._graph_runs.pop(run_id, None)
+            run = self._runs.pop(run_id, None)
+        if graph_started is not None:
+            run_seconds.observe(now - graph_started, outcome=outcome)
+        elif run is not None:
+            node_seconds.observe(now - run[2], node=run[1])
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs):
+        self._end_chain(run_id, "done")
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        self._end_chain(run_id, "interrupted" if type(error).__name__ == "GraphInterrupt" else "error")
+
+    def on_tool_start(self, serialized, input_str, *, run_id: UUID, **kwargs):
+        with self._lock:
+            self._runs[run_id] = ("tool", (serialized or {}).get("name") or kwargs.get("name"), time.perf_counter())
+
+    def _end_tool(self, run_id: UUID, status: str) -> None:
+        now = time.perf_counter()
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is not None:
+            tool_seconds.observe(now - run[2], tool=run[1], status=status)
+
+    def on_tool_end(self, output, *, run_id: UUID, **kwargs):
+        self._end_tool(run_id, "error" if getattr(output, "status", None) == "error" else "success")
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        self._end_tool(run_id, "error")
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata: Optional[dict] = None, **kwargs):
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model_name") or params.get("model") or params.get("_type") or "unknown"
+        node = (metadata or {}).get("langgraph_node", "")
+        with self._lock:
+            # (kind, (node, model), started, first token seen)
+            self._runs[run_id] = ("llm", (node, model), time.perf_counter(), False)
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs):
+        now = time.perf_counter()
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is None or run[3]:
+                return
+            self._runs[run_id] = run[:3] + (True,)
+        llm_first_token_seconds.observe(now - run[2], node=run[1][0], model=run[1][1])
+
+    def _end_llm(self, run_id: UUID) -> None:
+        now = time.perf_counter()
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        (node, model), elapsed = run[1], now - run[2]
+        if not run[3]:
+            llm_first_token_seconds.observe(elapsed, node=node, model=model)
+        llm_seconds.observe(elapsed, node=node, model=model)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs):
+        self._end_llm(run_id)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        self._end_llm(run_id)
+
+
+metrics_handler = MetricsCallbackHandler()
+
+
+def instrument(graph):
+    """`graph` with the metrics handler bound to every run (merged with the callbacks a caller passes)."""
+    return graph.with_config(callbacks=[metrics_handler])
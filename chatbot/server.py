@@ -0,0 +1,203 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from langchain_core.messages import BaseMessage
+from pydantic import BaseModel
+
+from chatbot.agents.agents_utilities import deny_tool_calls
+from chatbot.graph import get_graph
+from chatbot.metrics import registry
+from chatbot.tools.Data import DataPreparer
+
+logger = logging.getLogger("chatbot.server")
+
+
+class ChatRequest(BaseModel):
+    message: str
+    passenger_id: str
+
+
+class DenyRequest(BaseModel):
+    reason: str = "No reason given."
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # same preparation as the CLI; prepare_all skips everything that is already in place
+    Path("./database").mkdir(parents=True, exist_ok=True)
+    await asyncio.to_thread(DataPreparer().prepare_all)
+    # build the graph (LLM clients, bound tool schemas) before the first request instead of during it
+    await asyncio.to_thread(get_graph)
+    yield
+
+
+app = FastAPI(title="Travel Assistant", lifespan=lifespan)
+
+# one run at a time per conversation: a second message while the graph is still working on the thread
+# (or an approval racing a new message) would fork its checkpoint history
+_busy_threads: set[str] = set()
+
+
+@app.middleware("http")
+async def log_latency(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    logger.info("%s %s -> %s in %.1f ms", request.method, request.url.path, response.status_code,
+                (time.perf_counter() - started) * 1000)
+    return response
+
+
+def _message_json(message: BaseMessage) -> dict:
+    return {
+        "id": message.id,
+        "type": message.type,
+        "name": message.name,
+        "content": message.content,
+        "tool_calls": getattr(message, "tool_calls", []),
+    }
+
+
+def _update_json(update) -> dict:
+    update = dict(update or {})
+    messages = update.get("messages")
+    if messages is not None:
+        messages = messages if isinstance(messages, list) else [messages]
+        update["messages"] = [_message_json(m) for m in messages if isinstance(m, BaseMessage)]
+    return update
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _config(thread_id: str, passenger_id: str) -> dict:
+    return {"configurable": {"thread_id": thread_id, "passenger_id": passenger_id}}
+
+
+async def _pending(config: dict) -> list[dict]:
+    """Tool calls the graph is waiting on approval for (empty when the run finished)."""
+    snapshot = await get_graph().aget_state(config)
+    if not snapshot.next:
+        return []
+    return [{"node": node, "tool_calls": snapshot.values["messages"][-1].tool_calls} for node in snapshot.next]
+
+
+async def _stream_run(thread_id: str, graph_input, config: dict) -> AsyncIterator[str]:
+    """Stream one graph run as server-sent events: one `update` per node, then `interrupt` or `done`."""
+    started = time.perf_counter()
+    first_event = None
+    try:
+        async for chunk in get_graph().astream(graph_input, config, stream_mode="updates"):
+            if first_event is None:
+                first_event = time.perf_counter() - started
+            for node, update in chunk.items():
+                yield _sse("update", {"node": node, "update": _update_json(update)})
+
+        pending = await _pending(config)
+        if pending:
+            yield _sse("interrupt", {"thread_id": thread_id, "pending": pending})
+        else:
+            yield _sse("done", {"thread_id": thread_id})
+    except Exception as e:
+        logger.exception("run failed for thread %s", thread_id)
+        yield _sse("error", {"thread_id": thread_id, "error": repr(e)})
+    finally:
+        logger.info("thread %s: first event %s ms, run %.1f ms", thread_id,
+                    f"{first_event * 1000:.1f}" if first_event is not None else "-",
+                    (time.perf_counter() - started) * 1000)
+
+
+class _RunResponse(StreamingResponse):
+    """The event stream of a run, which releases the thread's claim however the response ends: run done
+    or failed, client gone before or during the stream, or the send failing."""
+
+    def __init__(self, thread_id: str, content: AsyncIterator[str]):
+        super().__init__(content, media_type="text/event-stream")
+        self.thread_id = thread_id
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            _busy_threads.discard(self.thread_id)
+
+
+def _start_run(thread_id: str, graph_input, config: dict) -> StreamingResponse:
+    # claimed here, so a second request gets a plain 409, and released by the response, whose __call__
+    # runs even when the stream's generator is never started
+    if thread_id in _busy_threads:
+        raise HTTPException(status_code=409, detail=f"Thread {thread_id} is already running.")
+    _busy_threads.add(thread_id)
+    return _RunResponse(thread_id, _stream_run(thread_id, graph_input, config))
+
+
+async def _interrupted_config(thread_id: str) -> tuple[dict, Optional[BaseMessage]]:
+    snapshot = await get_graph().aget_state({"configurable": {"thread_id": thread_id}})
+    if not snapshot.next:
+        raise HTTPException(status_code=409, detail=f"Thread {thread_id} is not waiting for an approval.")
+    # the passenger is recorded in the state by fetch_user_info, so approvals only need the thread id
+    config = _config(thread_id, snapshot.values.get("user_info_passenger_id"))
+    return config, snapshot.values["messages"][-1]
+
+
+@app.post("/threads")
+async def create_thread() -> dict:
+    return {"thread_id": str(uuid.uuid4())}
+
+
+@app.post("/threads/{thread_id}/messages")
+async def send_message(thread_id: str, request: ChatRequest) -> StreamingResponse:
+    config = _config(thread_id, request.passenger_id)
+    if await _pending(config):
+        raise HTTPException(status_code=409, detail=f"Thread {thread_id} is waiting for an approval.")
+    return _start_run(thread_id, {"messages": ("user", request.message)}, config)
+
+
+@app.post("/threads/{thread_id}/approve")
+async def approve(thread_id: str) -> StreamingResponse:
+    config, _ = await _interrupted_config(thread_id)
+    return _start_run(thread_id, None, config)
+
+
+@app.post("/threads/{thread_id}/deny")
+async def deny(thread_id: str, request: DenyRequest) -> StreamingResponse:
+    config, last_message = await _interrupted_config(thread_id)
+    denial = deny_tool_calls(last_message, request.reason)
+    return _start_run(thread_id, denial, config)
+
+
+@app.get("/threads/{thread_id}")
+async def get_thread(thread_id: str) -> dict:
+    config = {"configurable": {"thread_id": thread_id}}
+    snapshot = await get_graph().aget_state(config)
+    if not snapshot.values:
+        raise HTTPException(status_code=404, detail=f"Unknown thread {thread_id}.")
+    return {
+        "thread_id": thread_id,
+        "dialog_state": snapshot.values.get("dialog_state", []),
+        "messages": [_message_json(m) for m in snapshot.values["messages"]],
+        "pending": await _pending(config),
+    }
+
+
+@app.get("/metrics")
+async def metrics(format: str = "prometheus"):
+    """Latency histograms (graph runs, nodes, tools, LLM calls, SQL, FAQ lookups), Prometheus text or JSON."""
+    if format == "json":
+        return registry.to_dict()
+    return PlainTextResponse(registry.to_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"))
+    uvicorn.run(app, host=os.environ.get("HOST", "0.0.0.0"), port=int(os.environ.get("PORT", "8000")))
@@ -17,6 +17,13 @@ def update_dialogue_stack(left: list[str], right: Optional[str]) -> list[str]:
 class State(TypedDict):
     messages: Annotated[list[AnyMessage], add_messages]
     user_info: str
+    # bookkeeping for the cached user_info: when it was fetched, for whom, and how long the history was
+    user_info_fetched_at: float
+    user_info_passenger_id: str
+    user_info_message_count: int
+    # rolling summary of the messages the context manager no longer sends to the LLM
+    context_summary: str
+    context_summarized_count: int
     dialog_state: Annotated[
         list[
             Literal[
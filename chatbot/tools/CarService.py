@@ -1,7 +1,17 @@
-import sqlite3
 from datetime import date, datetime
 from typing import Optional, Union
 
+from chatbot.tools.Database import connection, execute_write
+from chatbot.tools.FullText import search_text
+from chatbot.tools.Pagination import DEFAULT_PAGE_SIZE
+from chatbot.tools.ResultCache import result_cache
+
+# the statements the service runs (Schema.service_queries checks their plans)
+BOOK_CAR_RENTAL = "UPDATE car_rentals SET booked = 1 WHERE id = ?"
+UPDATE_CAR_RENTAL_START = "UPDATE car_rentals SET start_date = ? WHERE id = ?"
+UPDATE_CAR_RENTAL_END = "UPDATE car_rentals SET end_date = ? WHERE id = ?"
+CANCEL_CAR_RENTAL = "UPDATE car_rentals SET booked = 0 WHERE id = ?"
+
 
 # Car Rental Service
 class CarService:
@@ -18,78 +28,59 @@ class CarService:
             self.cancel_car_rental,
         ]
 
+    @result_cache.cached("car_rentals", case_insensitive=("location", "name"))
     def search_car_rentals(
             self, location: Optional[str] = None,
             name: Optional[str] = None,
             price_tier: Optional[str] = None,
             start_date: Optional[Union[datetime, date]] = None,
             end_date: Optional[Union[datetime, date]] = None,
+            limit: int = DEFAULT_PAGE_SIZE,
+            offset: int = 0,
+            cursor: Optional[str] = None,
     ) -> list[dict]:
         """ search_car_rentals """
-        conn = sqlite3.connect(self.DB)
-        cursor = conn.cursor()
-
-        query = "SELECT * FROM car_rentals WHERE 1=1"
-        params = []
-
-        if location:
-            query += " AND location LIKE ?"
-            params.append(f"%{location}%")
-        if name:
-            query += " AND name LIKE ?"
-            params.append(f"%{name}%")
-
-        cursor.execute(query, params)
-        results = cursor.fetchall()
-        conn.close()
-
-        return [dict(zip([column[0] for column in cursor.description], row)) for row in results]
+        return search_text(self.DB, "car_rentals", {"location": [location], "name": [name]},
+                           limit=limit, offset=offset, cursor=cursor)
 
+    @result_cache.invalidates("car_rentals")
     def book_car_rental(self, rental_id: int) -> str:
         """ book_car_rental """
-        conn = sqlite3.connect(self.DB)
-        cursor = conn.cursor()
+        with connection(self.DB) as conn:
+            changed = execute_write(conn, BOOK_CAR_RENTAL, (rental_id,))
+            conn.commit()
 
-        cursor.execute("UPDATE car_rentals SET booked = 1 WHERE id = ?", (rental_id,))
-        conn.commit()
-
-        if cursor.rowcount > 0:
-            conn.close()
+        if changed > 0:
             return f"Car rental {rental_id} successfully booked."
         else:
-            conn.close()
             return f"No car rental found with ID {rental_id}."
 
+    @result_cache.invalidates("car_rentals")
     def update_car_rental(self, rental_id: int, start_date: Optional[Union[datetime, date]] = None,
                           end_date: Optional[Union[datetime, date]] = None) -> str:
         """ update_car_rental """
-        conn = sqlite3.connect(self.DB)
-        cursor = conn.cursor()
+        with connection(self.DB) as conn:
+            changed = 0
+            if start_date:
+                changed = execute_write(conn, UPDATE_CAR_RENTAL_START, (start_date, rental_id))
+            if end_date:
+                changed = execute_write(conn, UPDATE_CAR_RENTAL_END, (end_date, rental_id))
 
-        if start_date:
-            cursor.execute("UPDATE car_rentals SET start_date = ? WHERE id = ?", (start_date, rental_id))
-        if end_date:
-            cursor.execute("UPDATE car_rentals SET end_date = ? WHERE id = ?", (end_date, rental_id))
+            conn.commit()
 
-        conn.commit()
-        if cursor.rowcount > 0:
-            conn.close()
+        if changed > 0:
             return f"Car rental {rental_id} successfully updated."
         else:
-            conn.close()
             return f"No car rental found with ID {rental_id}."
 
+    @result_cache.invalidates("car_rentals")
     def cancel_car_rental(self, rental_id: int) -> str:
         """ cancel_car_rental """
-        conn = sqlite3.connect(self.DB)
-        cursor = conn.cursor()
-
-        cursor.execute("UPDATE car_rentals SET booked = 0 WHERE id = ?", (rental_id,))
-        conn.commit()
+        with connection(self.DB) as conn:
+            changed = execute_write(conn, CANCEL_CAR_RENTAL, (rental_id,))
+            conn.commit()
 
-        if cursor.rowcount > 0:
-            conn.close()
+        if changed > 0:
             return f"Car rental {rental_id} successfully cancelled."
         else:
-            conn.close()
             return f"No car rental found with ID {rental_id}."
@@ -1,12 +1,75 @@
+import hashlib
+import json
+import logging
 import os
 import shutil
 import sqlite3
-import pandas as pd
-import requests
 import re
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING
 from langchain_core.documents import Document
-from langchain_openai import OpenAIEmbeddings
-from langchain_chroma import Chroma
+from langchain_core.embeddings import Embeddings
+
+from chatbot.tools import Schema
+from chatbot.tools.NumpyVectorStore import NumpyVectorStore
+from chatbot.tools.ResultCache import result_cache
+
+# pandas, requests, Chroma and the OpenAI embeddings are imported where they are used: together they take
+# over a second to import, and a prepared database served from the numpy store needs none of them
+if TYPE_CHECKING:
+    from langchain_chroma import Chroma
+
+try:
+    import fcntl
+except ImportError:  # Windows: prepare_all runs without the cross-process lock
+    fcntl = None
+
+logger = logging.getLogger("chatbot.data")
+
+
+def _parse_timestamp(value: str) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    for fmt in ("%Y-%m-%d %H:%M:%S.%f%z", "%Y-%m-%d %H:%M:%S%z"):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    import pandas as pd
+
+    return pd.Timestamp(value).to_pydatetime()
+
+
+def _timestamp_epoch(value):
+    """SQLite function: seconds since the epoch, naive timestamps read as UTC ("\\N" and NULL -> NULL)."""
+    if value is None or value == "\\N":
+        return None
+    parsed = _parse_timestamp(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _shift_timestamp(value, seconds, to_utc):
+    """SQLite function: shift a timestamp and write it back in the format pandas' to_sql produced."""
+    if value is None or value == "\\N":
+        return None
+    shifted = _parse_timestamp(value) + timedelta(seconds=seconds)
+    if to_utc:
+        shifted = shifted.replace(tzinfo=timezone.utc) if shifted.tzinfo is None else shifted.astimezone(timezone.utc)
+    return shifted.isoformat(sep=" ", timespec="microseconds")
+
+
+# callbacks run whenever the FAQ collection is (re)built, e.g. to drop cached policy answers
+_vectorstore_listeners = []
+
+
+def on_vectorstore_rebuilt(callback) -> None:
+    _vectorstore_listeners.append(callback)
+
 
 class DataPreparer:
     def __init__(self,
@@ -16,6 +79,15 @@ class DataPreparer:
                  db_url: str = "https://storage.googleapis.com/benchmarks-artifacts/travel-db/travel2.sqlite",
                  faq_url: str = "https://storage.googleapis.com/benchmarks-artifacts/travel-db/swiss_faq.md",
                  vector_store: str = "./database/chroma_langchain_db",
+                 numpy_store: str = "./database/faq_numpy",
+                 vector_backend: str = None,
+                 numpy_dtype: str = "float32",
+                 faq_path: str = "./database/swiss_faq.md",
+                 manifest_path: str = "./database/prepare_manifest.json",
+                 db_sha256: str = None,
+                 chunk_size: int = 1 << 20,
+                 http_timeout: float = 60.0,
+                 embeddings: Embeddings = None,
                  ):
 
         self.verbose = verbose
@@ -25,34 +97,250 @@ class DataPreparer:
         self.db_url = db_url
         self.faq_url = faq_url
         self.vector_store = vector_store
+        self.numpy_store = numpy_store
+        # "chroma" or "numpy"; lookup_policy and prepare_all both use the default, set with VECTOR_BACKEND
+        self.vector_backend = vector_backend or os.environ.get("VECTOR_BACKEND", "chroma")
+        if self.vector_backend not in ("chroma", "numpy"):
+            raise ValueError(f"Unknown vector store backend: {self.vector_backend}")
+        self.numpy_dtype = numpy_dtype
+        self.embedding_model_name = "text-embedding-3-small"
+        self.embeddings = embeddings  # used instead of the OpenAI model when given (e.g. offline benchmarks)
+
+        # fingerprinted, resumable downloads (see prepare_all)
+        self.faq_path = faq_path
+        self.manifest_path = manifest_path
+        self.db_sha256 = db_sha256  # optional expected checksum of the downloaded DB
+        self.chunk_size = chunk_size
+        self.http_timeout = http_timeout
 
     def log(self, message: str) -> None:
         """Helper method for logging if verbose is True."""
         if self.verbose:
             print(message)
 
-    def download_databases(self, overwrite: bool = False) -> None:
-        if overwrite or not os.path.exists(self.db_path):
-            self.log("Trying to request and download database from URL...")
-            response = requests.get(self.db_url)
-            # Ensure the request was successful
+    def _load_manifest(self) -> dict:
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+        else:
+            manifest = {}
+        manifest.setdefault("downloads", {})
+        manifest.setdefault("stages", {})
+        return manifest
+
+    def _save_manifest(self, manifest: dict) -> None:
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    @contextmanager
+    def _manifest_lock(self):
+        """Hold an exclusive lock on `manifest_path` + ".lock", so processes sharing ./database (the CLI
+        and the server, or several workers) prepare it one at a time."""
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.manifest_path)), exist_ok=True)
+        with open(self.manifest_path + ".lock", "a") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                logger.info("Waiting for another process to finish preparing %s", self.manifest_path)
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _fingerprint(*inputs) -> str:
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _download(self, url: str, path: str, etag: str = None, expected_sha256: str = None) -> dict:
+        """Stream `url` to `path` in chunks, resuming an interrupted `.part` file when the server allows it.
+
+        Sends If-None-Match when an ETag is known, so an unchanged file costs a single 304 response.
+        Returns {"changed", "etag", "sha256"}.
+        """
+        part_path = path + ".part"
+        part_etag_path = part_path + ".etag"
+        headers = {}
+        resume_from = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if resume_from:
+            headers["Range"] = f"bytes={resume_from}-"
+            if os.path.exists(part_etag_path):
+                with open(part_etag_path, encoding="utf-8") as f:
+                    headers["If-Range"] = f.read()
+        elif etag:
+            headers["If-None-Match"] = etag
+
+        import requests
+
+        with requests.get(url, headers=headers, stream=True, timeout=self.http_timeout) as response:
+            if response.status_code == 304:
+                return {"changed": False, "etag": etag, "sha256": None}
+            if response.status_code == 416:
+                # the partial file does not match the remote one any more: start over
+                os.remove(part_path)
+                return self._download(url, path, etag, expected_sha256)
             response.raise_for_status()
-            with open(self.db_path, "wb") as f:
-                f.write(response.content)
-            self.log(f"DB saved to {self.db_path}")
-            # Backup - we will use this to "reset" our DB in each section
-            shutil.copy(self.db_path, self.db_path_backup)
-            self.log(f"DB copied to {self.db_path_backup}")
+            new_etag = response.headers.get("ETag")
+
+            digest = hashlib.sha256()
+            if response.status_code == 206:
+                self.log(f"Resuming download of {url} at byte {resume_from}")
+                with open(part_path, "rb") as f:
+                    for chunk in iter(lambda: f.read(self.chunk_size), b""):
+                        digest.update(chunk)
+                mode = "ab"
+            else:
+                mode = "wb"
+                if new_etag:
+                    with open(part_etag_path, "w", encoding="utf-8") as f:
+                        f.write(new_etag)
+
+            with open(part_path, mode) as f:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    f.write(chunk)
+                    digest.update(chunk)
+
+        sha256 = digest.hexdigest()
+        if expected_sha256 and sha256 != expected_sha256:
+            os.remove(part_path)
+            raise ValueError(f"Checksum mismatch for {url}: expected {expected_sha256}, got {sha256}")
+        os.replace(part_path, path)
+        if os.path.exists(part_etag_path):
+            os.remove(part_etag_path)
+        return {"changed": True, "etag": new_etag, "sha256": sha256}
+
+    def _fetch(self, name: str, url: str, path: str, expected_sha256: str = None, force: bool = False) -> str:
+        """Make sure `path` holds the current content of `url`; returns its sha256 fingerprint."""
+        import requests
+
+        manifest = self._load_manifest()
+        record = manifest["downloads"].get(name, {})
+        have_local = os.path.exists(path) and record.get("sha256") and record.get("url") == url
+        try:
+            result = self._download(url, path,
+                                    etag=record.get("etag") if have_local and not force else None,
+                                    expected_sha256=expected_sha256)
+        except requests.RequestException as e:
+            if not have_local:
+                raise
+            self.log(f"Could not reach {url} ({e}); using the local copy at {path}")
+            return record["sha256"]
+
+        if not result["changed"]:
+            self.log(f"{path} is up to date (ETag {record.get('etag')})")
+            return record["sha256"]
+        manifest = self._load_manifest()
+        manifest["downloads"][name] = {"url": url, "etag": result["etag"], "sha256": result["sha256"]}
+        self._save_manifest(manifest)
+        self.log(f"Downloaded {url} to {path} (sha256 {result['sha256'][:12]})")
+        return result["sha256"]
+
+    def download_databases(self, overwrite: bool = False) -> bool:
+        """Fetch travel2.sqlite into the pristine backup copy, then (re)create the working copy from it.
+
+        The working copy is only replaced when the downloaded content changed, when it is missing, or
+        when `overwrite` is set. Returns True when the working copy was (re)created.
+        """
+        self.log("Checking the database at its URL...")
+        # Backup - the pristine download, we will use this to "reset" our DB in each section
+        sha256 = self._fetch("database", self.db_url, self.db_path_backup, self.db_sha256, force=overwrite)
+
+        manifest = self._load_manifest()
+        working = manifest.get("working_db", {})
+        if not overwrite and os.path.exists(self.db_path) and working.get("sha256") == sha256:
+            self.log(f"DB already exists at {self.db_path} and its source is unchanged. Skipping copy...")
+            return False
+
+        for suffix in ("-wal", "-shm"):
+            # a stale write-ahead log must never be replayed onto a fresh copy
+            if os.path.exists(self.db_path + suffix):
+                os.remove(self.db_path + suffix)
+        shutil.copy(self.db_path_backup, self.db_path)
+        result_cache.clear()
+        manifest["working_db"] = {"sha256": sha256, "restored_at": datetime.now(timezone.utc).isoformat()}
+        self._save_manifest(manifest)
+        self.log(f"DB copied to {self.db_path}")
+        return True
+
+    def update_timestamps(self, in_place: bool = True, min_shift_seconds: float = 60.0) -> None:
+        """Shift flight and booking timestamps so the latest departure is "now".
+
+        By default only the affected columns of `flights` and `bookings` are rewritten, in place and
+        in one transaction, so the schema and indexes survive. The cumulative offset is recorded in
+        the `prepare_metadata` table, and a re-run only applies the drift since the previous shift
+        (nothing at all when it is below `min_shift_seconds`). `in_place=False` keeps the original
+        pandas round-trip, which rewrites every table.
+        """
+        if in_place:
+            self._update_timestamps_in_place(min_shift_seconds)
         else:
-            self.log(f"DB already exists at {self.db_path}. Skipping download...")
+            self._update_timestamps_pandas()
+        # cached search results still carry the old timestamps
+        result_cache.clear()
+
+    def _update_timestamps_in_place(self, min_shift_seconds: float) -> None:
+        conn = sqlite3.connect(self.db_path)
+        conn.create_function("ts_epoch", 1, _timestamp_epoch, deterministic=True)
+        conn.create_function("ts_shift", 3, _shift_timestamp, deterministic=True)
+        self.log(f"DB connection established to {self.db_path}")
+
+        latest_flight_epoch = conn.execute("SELECT MAX(ts_epoch(actual_departure)) FROM flights").fetchone()[0]
+        if latest_flight_epoch is None:
+            self.log("No departed flights found, timestamps left unchanged")
+            conn.close()
+            return
+        time_diff = datetime.now(timezone.utc).timestamp() - latest_flight_epoch
+
+        if abs(time_diff) < min_shift_seconds:
+            self.log(f"Timestamps already current (drift {time_diff:.0f}s), nothing to shift")
+            conn.close()
+            return
+
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS prepare_metadata (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("UPDATE bookings SET book_date = ts_shift(book_date, ?, 1)", (time_diff,))
+            self.log(f"Bookings table, timestamps shifted by {timedelta(seconds=time_diff)} days")
+
+            conn.execute(
+                """
+                UPDATE flights SET
+                    scheduled_departure = ts_shift(scheduled_departure, :diff, 0),
+                    scheduled_arrival = ts_shift(scheduled_arrival, :diff, 0),
+                    actual_departure = ts_shift(actual_departure, :diff, 0),
+                    actual_arrival = ts_shift(actual_arrival, :diff, 0)
+                """,
+                {"diff": time_diff},
+            )
+            self.log(f"Flights table, timestamps shifted by {timedelta(seconds=time_diff)} days")
+
+            row = conn.execute("SELECT value FROM prepare_metadata WHERE key = 'timestamp_offset_seconds'").fetchone()
+            total_offset = (float(row[0]) if row else 0.0) + time_diff
+            conn.executemany(
+                "INSERT OR REPLACE INTO prepare_metadata (key, value) VALUES (?, ?)",
+                [("timestamp_offset_seconds", repr(total_offset)),
+                 ("timestamps_shifted_at", datetime.now(timezone.utc).isoformat())],
+            )
+
+        self.log(f"Timestamps shifted in place (total offset {timedelta(seconds=total_offset)}): {self.db_path}")
+        conn.close()
+
+    def _update_timestamps_pandas(self) -> None:
+        import pandas as pd
 
-    def update_timestamps(self) -> None:
         conn = sqlite3.connect(self.db_path)
         self.log(f"DB connection established to {self.db_path}")
         cursor = conn.cursor()
 
         sql_query = """SELECT name FROM sqlite_master WHERE type='table';"""
-        tables = pd.read_sql(sql_query, conn)["name"].to_list()
+        # SQLite's own tables (sqlite_stat1 from ANALYZE) and the full-text indexes are derived data; tune_schema
+        # rebuilds the indexes once the inventory tables are replaced
+        tables = [table for table in pd.read_sql(sql_query, conn)["name"].to_list()
+                  if not table.startswith("sqlite_") and not Schema.is_fts_table(table)]
 
         table_dataframes = {}
         for table in tables:
@@ -98,11 +386,35 @@ class DataPreparer:
         conn.commit()
         conn.close()
 
+    def tune_schema(self) -> list[dict]:
+        """Create the service and full-text indexes, verify them and report the query plans of every service query."""
+        conn = sqlite3.connect(self.db_path)
+        created = Schema.create_indexes(conn)
+        self.log(f"Indexes created: {', '.join(created) if created else 'none (all present)'}")
+        rebuilt = Schema.create_fts(conn)
+        self.log(f"Full-text indexes rebuilt: {', '.join(rebuilt) if rebuilt else 'none (all present)'}")
+
+        missing = Schema.missing_indexes(conn) + Schema.missing_fts(conn)
+        if missing:
+            logger.warning("indexes missing after schema tuning: %s", ", ".join(missing))
+
+        report = Schema.explain_queries(conn)
+        conn.close()
+        for entry in report:
+            if entry["error"]:
+                logger.warning("query '%s' cannot be planned: %s", entry["query"], entry["error"])
+            elif entry["regression"]:
+                logger.warning("full table scan in '%s': %s", entry["query"], "; ".join(entry["full_scans"]))
+            else:
+                self.log(f"Query plan ok for '{entry['query']}': {'; '.join(entry['plan'])}")
+        return report
+
     def create_faq_documents(self) -> list[Document]:
         """Custom text splitter for the FAQ document."""
-        response = requests.get(self.faq_url)
-        response.raise_for_status()
-        faq_text = response.text
+        if not os.path.exists(self.faq_path):
+            self._fetch("faq", self.faq_url, self.faq_path)
+        with open(self.faq_path, encoding="utf-8") as f:
+            faq_text = f.read()
 
         docs = [
             Document(page_content=txt.strip())
@@ -110,8 +422,17 @@ class DataPreparer:
         ]
         return docs
 
-    def create_vectorstore(self, overwrite: bool = False) -> Chroma:
-        embedding_model = OpenAIEmbeddings(model="text-embedding-3-small")
+    def embedding_model(self) -> Embeddings:
+        if self.embeddings is not None:
+            return self.embeddings
+        from langchain_openai import OpenAIEmbeddings
+
+        return OpenAIEmbeddings(model=self.embedding_model_name)
+
+    def create_vectorstore(self, overwrite: bool = False) -> "Chroma":
+        from langchain_chroma import Chroma
+
+        embedding_model = self.embedding_model()
         collection_name = "faq_vectors"
 
         if os.path.exists(self.vector_store) and not overwrite:
@@ -123,6 +444,13 @@ class DataPreparer:
             )
             self.log("Existing vectorstore loaded successfully with type: VectorStore")
         else:
+            if os.path.exists(self.vector_store):
+                # from_documents appends to an existing collection, so clear it before re-embedding
+                Chroma(
+                    collection_name=collection_name,
+                    embedding_function=embedding_model,
+                    persist_directory=self.vector_store,
+                ).delete_collection()
             # Create a new vector store from documents and persist it
             vectorstore = Chroma.from_documents(
                 documents=self.create_faq_documents(),
@@ -131,18 +459,83 @@ class DataPreparer:
                 collection_name=collection_name,
             )
             self.log("Vector database created from the documents successfully!")
+            for callback in _vectorstore_listeners:
+                callback()
 
         return vectorstore
 
-    def start_retriever(self, overwrite: bool = False, k: int = 2):
-        vectorstore = self.create_vectorstore(overwrite)
+    def create_numpy_vectorstore(self, overwrite: bool = False) -> NumpyVectorStore:
+        """Same FAQ chunks and embeddings as `create_vectorstore`, kept in a memory-mapped NumPy matrix."""
+        embedding_model = self.embedding_model()
+
+        if NumpyVectorStore.exists(self.numpy_store) and not overwrite:
+            vectorstore = NumpyVectorStore.load(self.numpy_store, embedding_model)
+            self.log(f"Existing NumPy vectorstore loaded from {self.numpy_store}")
+        else:
+            documents = self.create_faq_documents()
+            vectorstore = NumpyVectorStore.from_texts(
+                texts=[doc.page_content for doc in documents],
+                embedding=embedding_model,
+                metadatas=[doc.metadata for doc in documents],
+            )
+            vectorstore.save(self.numpy_store, dtype=self.numpy_dtype)
+            self.log(f"NumPy vector database created at {self.numpy_store}")
+            for callback in _vectorstore_listeners:
+                callback()
+
+        return vectorstore
+
+    def start_retriever(self, overwrite: bool = False, k: int = 2, backend: str = None):
+        backend = backend or self.vector_backend
+        if backend == "numpy":
+            vectorstore = self.create_numpy_vectorstore(overwrite)
+        elif backend == "chroma":
+            vectorstore = self.create_vectorstore(overwrite)
+        else:
+            raise ValueError(f"Unknown vector store backend: {backend}")
         retriever = vectorstore.as_retriever(search_type="similarity", search_kwargs={"k": k})
-        self.log(f"Retriever instantiated = 'similarity: {k}'")
+        self.log(f"Retriever instantiated = '{backend} similarity: {k}'")
         return retriever
 
-    def prepare_all(self) -> None:
+    def _run_stage(self, name: str, inputs: list, action, outputs_exist: bool = True, force: bool = False) -> bool:
+        """Run `action` unless the fingerprint of `inputs` matches the last successful run."""
+        fingerprint = self._fingerprint(name, *inputs)
+        manifest = self._load_manifest()
+        if not force and outputs_exist and manifest["stages"].get(name) == fingerprint:
+            self.log(f"Stage '{name}' inputs unchanged. Skipping...")
+            return False
+        action()
+        manifest = self._load_manifest()
+        manifest["stages"][name] = fingerprint
+        self._save_manifest(manifest)
+        return True
+
+    def vectorstore_exists(self, backend: str = None) -> bool:
+        if (backend or self.vector_backend) == "numpy":
+            return NumpyVectorStore.exists(self.numpy_store)
+        return os.path.exists(self.vector_store)
+
+    def prepare_all(self, force: bool = False) -> None:
+        """Idempotent preparation: each stage only runs when its inputs changed since the last run.
+
+        Fingerprints live in `manifest_path`. The database and the FAQ are re-validated with
+        conditional requests (a 304 costs almost nothing); the timestamp shift is keyed on the working
+        copy and the current UTC date; the indexes on the working copy, `Schema.INDEXES` and
+        `Schema.FTS_TABLES`; the embeddings on the FAQ content, the embedding model and the store backend.
+        Concurrent calls on the same manifest run one after the other; the later ones find the stages done.
+        """
+        with self._manifest_lock():
+            self.download_databases(overwrite=force)
+            working_db = self._load_manifest()["working_db"]
+
+            self._run_stage("timestamps", [working_db, datetime.now(timezone.utc).date()],
+                            self.update_timestamps, force=force)
+            self._run_stage("schema", [working_db, Schema.INDEXES, Schema.FTS_TABLES, Schema.FTS_TOKENIZER],
+                            self.tune_schema, force=force)
 
-        self.download_databases(overwrite=True)
-        self.update_timestamps()
-        retriever = self.start_retriever(overwrite=False)
+            faq_sha256 = self._fetch("faq", self.faq_url, self.faq_path, force=force)
+            self._run_stage("embeddings",
+                            [faq_sha256, self.embedding_model_name, self.vector_backend, self.numpy_dtype],
+                            lambda: self.start_retriever(overwrite=True),
+                            outputs_exist=self.vectorstore_exists(), force=force)
         self.log("All preparation steps completed successfully.")
@@ -0,0 +1,229 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Optional
+
+from langchain_core.runnables import ensure_config
+
+from chatbot.metrics import sql_seconds
+from chatbot.tools.Sandbox import get_sandboxes
+
+
+class _PooledConnection:
+    """A SQLite connection owned by one thread, plus the bookkeeping the pool needs."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.depth = 0
+
+    def close(self) -> None:
+        try:
+            self.conn.close()
+        except sqlite3.Error:
+            pass
+
+
+class ConnectionPool:
+    """Shared SQLite connections for the tool services.
+
+    Every thread keeps its own long-lived connection (WAL mode, busy timeout and a prepared
+    statement cache), so a tool call no longer pays for opening the file and parsing the schema.
+    `pool_size` bounds how many threads may hold a connection at the same time; callers beyond
+    that wait for a free slot and are counted in `stats["waits"]`. `stats["held_seconds"]` sums the
+    time connections were checked out, i.e. the time the services spent in the database.
+    """
+
+    def __init__(self,
+                 db_path: str,
+                 pool_size: int = 8,
+                 busy_timeout: float = 5.0,
+                 cached_statements: int = 256,
+                 checkout_timeout: float = 30.0,
+                 health_check_interval: float = 60.0,
+                 max_lifetime: float = 3600.0,
+                 ):
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self.max_lifetime = max_lifetime
+
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._open = weakref.WeakSet()
+        self.stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_seconds": 0.0,
+            "held_seconds": 0.0,
+            "timeouts": 0,
+            "opened": 0,
+            "recycled": 0,
+            "health_failures": 0,
+        }
+
+    def _count(self, key: str, value=1) -> None:
+        with self._lock:
+            self.stats[key] += value
+
+    def _open_connection(self) -> _PooledConnection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout,
+            cached_statements=self.cached_statements,
+            check_same_thread=False,  # each connection is only ever used by the thread that opened it
+        )
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout * 1000)}")
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+        except sqlite3.OperationalError:
+            # read-only files cannot switch journal mode; they still work in the default mode
+            pass
+        pooled = _PooledConnection(conn)
+        self._open.add(pooled)
+        self._count("opened")
+        return pooled
+
+    def _is_healthy(self, pooled: _PooledConnection) -> bool:
+        now = time.monotonic()
+        if now - pooled.created_at > self.max_lifetime:
+            self._count("recycled")
+            return False
+        if now - pooled.last_used > self.health_check_interval:
+            try:
+                pooled.conn.execute("SELECT 1").fetchone()
+            except sqlite3.Error:
+                self._count("health_failures")
+                return False
+        return True
+
+    def _acquire_slot(self) -> None:
+        if self._slots.acquire(blocking=False):
+            return
+        self._count("waits")
+        started = time.perf_counter()
+        acquired = self._slots.acquire(timeout=self.checkout_timeout)
+        self._count("wait_seconds", time.perf_counter() - started)
+        if not acquired:
+            self._count("timeouts")
+            raise TimeoutError(f"No free database connection for {self.db_path} after {self.checkout_timeout}s")
+
+    @contextmanager
+    def connection(self):
+        """Check out this thread's connection; nested checkouts on the same thread reuse it."""
+        pooled = getattr(self._local, "pooled", None)
+        if pooled is not None and pooled.depth > 0:
+            pooled.depth += 1
+            try:
+                yield pooled.conn
+            finally:
+                pooled.depth -= 1
+            return
+
+        self._acquire_slot()
+        try:
+            if pooled is None or not self._is_healthy(pooled):
+                if pooled is not None:
+                    pooled.close()
+                pooled = self._open_connection()
+                self._local.pooled = pooled
+            self._count("checkouts")
+            pooled.depth = 1
+            checked_out = time.perf_counter()
+            try:
+                yield pooled.conn
+            except BaseException:
+                if pooled.conn.in_transaction:
+                    pooled.conn.rollback()
+                raise
+            finally:
+                pooled.depth = 0
+                pooled.last_used = time.monotonic()
+                if pooled.conn.in_transaction:
+                    # never hand a half-finished transaction to the next checkout
+                    pooled.conn.rollback()
+                self._count("held_seconds", time.perf_counter() - checked_out)
+        finally:
+            self._slots.release()
+
+    def close_all(self) -> None:
+        """Close every connection opened by this pool (threads reopen lazily on next use)."""
+        for pooled in list(self._open):
+            pooled.close()
+        self._open = weakref.WeakSet()
+        self._local = threading.local()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        stats["open_connections"] = len(self._open)
+        stats["pool_size"] = self.pool_size
+        return stats
+
+
+_pools: dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str, **settings) -> ConnectionPool:
+    """Return the process-wide pool for `db_path`, creating it with `settings` on first use."""
+    key = os.path.abspath(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(db_path, **settings)
+            _pools[key] = pool
+        return pool
+
+
+def connection(db_path: str, operation: Optional[str] = None):
+    """Shorthand used by the services: `with connection(self.DB) as conn: ...`
+
+    When the run's config sets `configurable.db_sandbox`, the call is served from the session's
+    (`thread_id`) copy-on-write sandbox instead of the shared pool, see `Sandbox.py`. The time the
+    connection is held goes to the `chatbot_sql_seconds` histogram, labelled with `operation` (by
+    default the name of the calling function, i.e. the service method).
+    """
+    configurable = ensure_config().get("configurable", {})
+    if configurable.get("db_sandbox"):
+        source = get_sandboxes(db_path).connection(configurable["thread_id"])
+    else:
+        source = get_pool(db_path).connection()
+    return _timed(source, operation or sys._getframe(1).f_code.co_name)
+
+
+def execute_write(conn: sqlite3.Connection, sql: str, params=()) -> int:
+    """Run an UPDATE or DELETE and return the changes it made, counting those made by its triggers.
+
+    Unlike `cursor.rowcount`, which stays 0 for writes to a sandbox's overlay views (see `Sandbox.py`),
+    this counts the rows their INSTEAD OF triggers record, so "did it match anything" holds in both modes.
+    """
+    before = conn.total_changes
+    conn.execute(sql, params)
+    return conn.total_changes - before
+
+
+@contextmanager
+def _timed(source, operation: str):
+    with source as conn:
+        started = time.perf_counter()
+        try:
+            yield conn
+        finally:
+            sql_seconds.observe(time.perf_counter() - started, operation=operation)
+
+
+def close_all_pools() -> None:
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close_all()
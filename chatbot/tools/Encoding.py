@@ -0,0 +1,129 @@
+import functools
+import json
+import re
+import threading
+from typing import Callable, Optional
+
+from langchain_core.tools import BaseTool
+
+# Columns each tool result keeps, in order; tools not listed keep every column. search_flights drops the
+# aircraft and actual times (the agent books on flight_id and the scheduled times); the inventory tables
+# are already narrow, so only their column order is fixed.
+PROJECTIONS = {
+    "search_flights": ["flight_id", "flight_no", "departure_airport", "arrival_airport",
+                       "scheduled_departure", "scheduled_arrival", "status"],
+    "fetch_user_flight_information": ["ticket_no", "book_ref", "flight_id", "flight_no", "departure_airport",
+                                      "arrival_airport", "scheduled_departure", "scheduled_arrival", "seat_no",
+                                      "fare_conditions"],
+    "search_hotels": ["id", "name", "location", "price_tier", "checkin_date", "checkout_date", "booked"],
+    "search_car_rentals": ["id", "name", "location", "price_tier", "start_date", "end_date", "booked"],
+    "search_trip_recommendations": ["id", "name", "location", "keywords", "details", "booked"],
+}
+
+_MICROSECONDS = re.compile(r"(\d{2}:\d{2}:\d{2})\.\d+")
+
+
+def approximate_tokens(text: str) -> int:
+    # same ~4 characters per token estimate as the context manager
+    return len(text) // 4
+
+
+def _cell(value) -> str:
+    if value is None or value == "\\N":
+        return ""
+    text = _MICROSECONDS.sub(r"\1", str(value))
+    return " ".join(text.replace("|", "\\|").split())
+
+
+class ResultEncoder:
+    """Compact text encoding of the service tool results, with per-tool size accounting.
+
+    The services return lists of row dicts, which ToolNode would serialize as JSON, repeating every
+    column name on every row, and the result then stays in the checkpointed history. `encode` projects
+    the rows on the tool's `PROJECTIONS` entry and writes them as one header line plus one `|`-separated
+    line per row (NULLs empty, timestamps without microseconds). The pagination marker (see
+    `Pagination.py`) becomes a last `more_results:` line. Strings pass through; anything else that is
+    not a list of rows is written as compact JSON.
+
+    `stats["by_tool"]` holds, per tool, the bytes and estimated tokens of the JSON ToolNode would have
+    sent ("before") and of the encoded text ("after").
+    """
+
+    def __init__(self, projections: Optional[dict] = None, token_counter: Callable[[str], int] = approximate_tokens):
+        self.projections = PROJECTIONS if projections is None else projections
+        self.token_counter = token_counter
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "by_tool": {}}
+
+    def _table(self, name: str, rows: list[dict]) -> str:
+        markers = [row for row in rows if row.get("more_results")]
+        rows = [row for row in rows if not row.get("more_results")]
+        if not rows:
+            lines = ["0 rows"]
+        else:
+            columns = self.projections.get(name)
+            if columns is None:
+                columns = list(dict.fromkeys(column for row in rows for column in row))
+            else:
+                columns = [column for column in columns if any(column in row for row in rows)]
+            lines = [f"{len(rows)} rows", "|".join(columns)]
+            lines += ["|".join(_cell(row.get(column)) for column in columns) for row in rows]
+        for marker in markers:
+            lines.append(f"more_results: next_cursor={marker['next_cursor']} next_offset={marker['next_offset']}"
+                         f" ({marker['note']})")
+        return "\n".join(lines)
+
+    def encode(self, name: str, output) -> str:
+        if isinstance(output, str):
+            return output
+        if isinstance(output, list) and output and all(isinstance(row, dict) for row in output):
+            encoded = self._table(name, output)
+        elif isinstance(output, list) and not output:
+            encoded = "0 rows"
+        else:
+            encoded = json.dumps(output, separators=(",", ":"), default=str)
+        self._record(name, output, encoded)
+        return encoded
+
+    def _record(self, name: str, output, encoded: str) -> None:
+        try:
+            before = json.dumps(output)  # what ToolNode sends for a non-string result
+        except (TypeError, ValueError):
+            before = str(output)
+        with self._lock:
+            self.stats["calls"] += 1
+            tool = self.stats["by_tool"].setdefault(name, {
+                "calls": 0, "bytes_before": 0, "bytes_after": 0, "tokens_before": 0, "tokens_after": 0,
+            })
+            tool["calls"] += 1
+            tool["bytes_before"] += len(before.encode())
+            tool["bytes_after"] += len(encoded.encode())
+            tool["tokens_before"] += self.token_counter(before)
+            tool["tokens_after"] += self.token_counter(encoded)
+
+    def wrap(self, func):
+        """The service method `func` with its result encoded; name, docstring and signature (hence the
+        tool schema) unchanged. Tools that are already `BaseTool`s (web search, policy lookup) are kept."""
+        if isinstance(func, BaseTool):
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return self.encode(func.__name__, func(*args, **kwargs))
+
+        return wrapper
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            by_tool = {name: dict(tool) for name, tool in self.stats["by_tool"].items()}
+            stats = dict(self.stats, by_tool=by_tool)
+        for tool in by_tool.values():
+            tool["bytes_saved_ratio"] = 1 - tool["bytes_after"] / tool["bytes_before"] if tool["bytes_before"] else None
+        return stats
+
+
+result_encoder = ResultEncoder()
+
+
+def encode_tools(tools: list) -> list:
+    return [result_encoder.wrap(tool) for tool in tools]
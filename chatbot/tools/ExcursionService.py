@@ -1,6 +1,15 @@
-import sqlite3
 from typing import Optional
 
+from chatbot.tools.Database import connection, execute_write
+from chatbot.tools.FullText import search_text
+from chatbot.tools.Pagination import DEFAULT_PAGE_SIZE
+from chatbot.tools.ResultCache import result_cache
+
+# the statements the service runs (Schema.service_queries checks their plans)
+BOOK_EXCURSION = "UPDATE trip_recommendations SET booked = 1 WHERE id = ?"
+UPDATE_EXCURSION = "UPDATE trip_recommendations SET details = ? WHERE id = ?"
+CANCEL_EXCURSION = "UPDATE trip_recommendations SET booked = 0 WHERE id = ?"
+
 
 # Excursion Service
 class ExcursionService:
@@ -17,74 +26,49 @@ class ExcursionService:
             self.cancel_excursion,
         ]
 
+    @result_cache.cached("trip_recommendations", case_insensitive=("location", "name", "keywords"))
     def search_trip_recommendations(self, location: Optional[str] = None, name: Optional[str] = None,
-                                    keywords: Optional[str] = None) -> list[dict]:
+                                    keywords: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+                                    offset: int = 0, cursor: Optional[str] = None) -> list[dict]:
         """ search_trip_recommendations """
-        conn = sqlite3.connect(self.DB)
-        cursor = conn.cursor()
-
-        query = "SELECT * FROM trip_recommendations WHERE 1=1"
-        params = []
-
-        if location:
-            query += " AND location LIKE ?"
-            params.append(f"%{location}%")
-        if name:
-            query += " AND name LIKE ?"
-            params.append(f"%{name}%")
-        if keywords:
-            keyword_list = keywords.split(",")
-            keyword_conditions = " OR ".join(["keywords LIKE ?" for _ in keyword_list])
-            query += f" AND ({keyword_conditions})"
-            params.extend([f"%{keyword.strip()}%" for keyword in keyword_list])
-
-        cursor.execute(query, params)
-        results = cursor.fetchall()
-        conn.close()
-
-        return [dict(zip([column[0] for column in cursor.description], row)) for row in results]
+        # comma-separated keywords: any of them may match, and the excursions matching most come first
+        keyword_list = (keywords or "").split(",")
+        terms = {"location": [location], "name": [name], "keywords": keyword_list}
+        return search_text(self.DB, "trip_recommendations", terms, limit=limit, offset=offset, cursor=cursor,
+                           ranked=len(keyword_list) > 1)
 
+    @result_cache.invalidates("trip_recommendations")
     def book_excursion(self, recommendation_id: int) -> str:
         """ book_excursion """
-        conn = sqlite3.connect(self.DB)
-        cursor = conn.cursor()
-
-        cursor.execute("UPDATE trip_recommendations SET booked = 1 WHERE id = ?", (recommendation_id,))
-        conn.commit()
+        with connection(self.DB) as conn:
+            changed = execute_write(conn, BOOK_EXCURSION, (recommendation_id,))
+            conn.commit()
 
-        if cursor.rowcount > 0:
-            conn.close()
+        if changed > 0:
             return f"Trip recommendation {recommendation_id} successfully booked."
         else:
-            conn.close()
             return f"No trip recommendation found with ID {recommendation_id}."
 
+    @result_cache.invalidates("trip_recommendations")
     def update_excursion(self, recommendation_id: int, details: str) -> str:
         """ update_excursion """
-        conn = sqlite3.connect(self.DB)
-        cursor = conn.cursor()
+        with connection(self.DB) as conn:
+            changed = execute_write(conn, UPDATE_EXCURSION, (details, recommendation_id))
+            conn.commit()
 
-        cursor.execute("UPDATE trip_recommendations SET details = ? WHERE id = ?", (details, recommendation_id))
-        conn.commit()
-
-        if cursor.rowcount > 0:
-            conn.close()
+        if changed > 0:
             return f"Trip recommendation {recommendation_id} successfully updated."
         else:
-            conn.close()
             return f"No trip recommendation found with ID {recommendation_id}."
 
+    @result_cache.invalidates("trip_recommendations")
     def cancel_excursion(self, recommendation_id: int) -> str:
         """ update_excursion """
-        conn = sqlite3.connect(self.DB)
-        cursor = conn.cursor()
-
-        cursor.execute("UPDATE trip_recommendations SET booked = 0 WHERE id = ?", (recommendation_id,))
-        conn.commit()
+        with connection(self.DB) as conn:
+            changed = execute_write(conn, CANCEL_EXCURSION, (recommendation_id,))
+            conn.commit()
 
-        if cursor.rowcount > 0:
-            conn.close()
+        if changed > 0:
             return f"Trip recommendation {recommendation_id} successfully cancelled."
         else:
-            conn.close()
             return f"No trip recommendation found with ID {recommendation_id}."
@@ -1,9 +1,53 @@
-import sqlite3
 from datetime import date, datetime
 from typing import Optional
 import pytz
 from langchain_core.runnables import ensure_config
 
+from chatbot.tools.Database import connection
+from chatbot.tools.ResultCache import result_cache
+
+# the statements the service runs (Schema.service_queries checks their plans)
+USER_FLIGHTS_QUERY = """
+        SELECT
+            t.ticket_no, t.book_ref, f.flight_id, f.flight_no,
+            f.departure_airport, f.arrival_airport, f.scheduled_departure,
+            f.scheduled_arrival, bp.seat_no, tf.fare_conditions
+        FROM
+            tickets t
+            JOIN ticket_flights tf ON t.ticket_no = tf.ticket_no
+            JOIN flights f ON tf.flight_id = f.flight_id
+            JOIN boarding_passes bp ON bp.ticket_no = t.ticket_no AND bp.flight_id = f.flight_id
+        WHERE t.passenger_id = ?
+        """
+NEW_FLIGHT_QUERY = "SELECT departure_airport, arrival_airport, scheduled_departure FROM flights WHERE flight_id = ?"
+TICKET_FLIGHT_QUERY = "SELECT flight_id FROM ticket_flights WHERE ticket_no = ?"
+TICKET_OWNER_QUERY = "SELECT * FROM tickets WHERE ticket_no = ? AND passenger_id = ?"
+UPDATE_TICKET_FLIGHT = "UPDATE ticket_flights SET flight_id = ? WHERE ticket_no = ?"
+DELETE_TICKET_FLIGHTS = "DELETE FROM ticket_flights WHERE ticket_no = ?"
+
+
+def search_flights_query(departure_airport=None, arrival_airport=None, start_time=None, end_time=None,
+                         limit: int = 20) -> tuple[str, list]:
+    query = "SELECT * FROM flights WHERE 1 = 1"
+    params = []
+
+    if departure_airport:
+        query += " AND departure_airport = ?"
+        params.append(departure_airport)
+    if arrival_airport:
+        query += " AND arrival_airport = ?"
+        params.append(arrival_airport)
+    if start_time:
+        query += " AND scheduled_departure >= ?"
+        params.append(start_time)
+    if end_time:
+        query += " AND scheduled_departure <= ?"
+        params.append(end_time)
+
+    query += " LIMIT ?"
+    params.append(limit)
+    return query, params
+
 
 # Flight Service
 class FlightService:
@@ -24,31 +68,17 @@ class FlightService:
         if not passenger_id:
             raise ValueError("No passenger ID configured.")
 
-        conn = sqlite3.connect(self.DB)
-        cursor = conn.cursor()
+        with connection(self.DB) as conn:
+            cursor = conn.cursor()
+            cursor.execute(USER_FLIGHTS_QUERY, (passenger_id,))
+            rows = cursor.fetchall()
+            column_names = [column[0] for column in cursor.description]
+            cursor.close()
 
-        query = """
-        SELECT
-            t.ticket_no, t.book_ref, f.flight_id, f.flight_no,
-            f.departure_airport, f.arrival_airport, f.scheduled_departure,
-            f.scheduled_arrival, bp.seat_no, tf.fare_conditions
-        FROM
-            tickets t
-            JOIN ticket_flights tf ON t.ticket_no = tf.ticket_no
-            JOIN flights f ON tf.flight_id = f.flight_id
-            JOIN boarding_passes bp ON bp.ticket_no = t.ticket_no AND bp.flight_id = f.flight_id
-        WHERE t.passenger_id = ?
-        """
-        cursor.execute(query, (passenger_id,))
-        rows = cursor.fetchall()
-        column_names = [column[0] for column in cursor.description]
         results = [dict(zip(column_names, row)) for row in rows]
-
-        cursor.close()
-        conn.close()
-
         return results
 
+    @result_cache.cached("flights")
     def search_flights(
             self,
             departure_airport: Optional[str] = None,
@@ -58,37 +88,19 @@ class FlightService:
             limit: int = 20,
     ) -> list[dict]:
         """ search_flights """
-        conn = sqlite3.connect(self.DB)
-        cursor = conn.cursor()
-
-        query = "SELECT * FROM flights WHERE 1 = 1"
-        params = []
-
-        if departure_airport:
-            query += " AND departure_airport = ?"
-            params.append(departure_airport)
-        if arrival_airport:
-            query += " AND arrival_airport = ?"
-            params.append(arrival_airport)
-        if start_time:
-            query += " AND scheduled_departure >= ?"
-            params.append(start_time)
-        if end_time:
-            query += " AND scheduled_departure <= ?"
-            params.append(end_time)
-
-        query += " LIMIT ?"
-        params.append(limit)
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        column_names = [column[0] for column in cursor.description]
-        results = [dict(zip(column_names, row)) for row in rows]
-
-        cursor.close()
-        conn.close()
+        query, params = search_flights_query(departure_airport, arrival_airport, start_time, end_time, limit)
+        with connection(self.DB) as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+            column_names = [column[0] for column in cursor.description]
+            cursor.close()
 
+        results = [dict(zip(column_names, row)) for row in rows]
         return results
 
+    # no cached search reads ticket_flights (search_flights only reads flights), so the ticket changes
+    # invalidate nothing; the graph refetches the passenger's flights after them (see graph.py)
     def update_ticket_to_new_flight(self, ticket_no: str, new_flight_id: int) -> str:
         """ update_ticket_to_new_flight """
         config = ensure_config()
@@ -97,46 +109,41 @@ class FlightService:
         if not passenger_id:
             raise ValueError("No passenger ID configured.")
 
-        conn = sqlite3.connect(self.DB)
-        cursor = conn.cursor()
-
-        cursor.execute(
-            "SELECT departure_airport, arrival_airport, scheduled_departure FROM flights WHERE flight_id = ?",
-            (new_flight_id,))
-        new_flight = cursor.fetchone()
-        if not new_flight:
-            cursor.close()
-            conn.close()
-            return "Invalid new flight ID provided."
-
-        column_names = [column[0] for column in cursor.description]
-        new_flight_dict = dict(zip(column_names, new_flight))
-        timezone = pytz.timezone("Etc/GMT-3")
-        current_time = datetime.now(tz=timezone)
-        departure_time = datetime.strptime(new_flight_dict["scheduled_departure"], "%Y-%m-%d %H:%M:%S.%f%z")
-        time_until = (departure_time - current_time).total_seconds()
-
-        if time_until < (3 * 3600):
-            return f"Not permitted to reschedule to a flight that is less than 3 hours from the current time."
-
-        cursor.execute("SELECT flight_id FROM ticket_flights WHERE ticket_no = ?", (ticket_no,))
-        current_flight = cursor.fetchone()
-        if not current_flight:
-            cursor.close()
-            conn.close()
-            return "No existing ticket found for the given ticket number."
-
-        cursor.execute("SELECT * FROM tickets WHERE ticket_no = ? AND passenger_id = ?", (ticket_no, passenger_id))
-        current_ticket = cursor.fetchone()
-        if not current_ticket:
+        with connection(self.DB) as conn:
+            cursor = conn.cursor()
+
+            cursor.execute(NEW_FLIGHT_QUERY, (new_flight_id,))
+            new_flight = cursor.fetchone()
+            if not new_flight:
+                cursor.close()
+                return "Invalid new flight ID provided."
+
+            column_names = [column[0] for column in cursor.description]
+            new_flight_dict = dict(zip(column_names, new_flight))
+            timezone = pytz.timezone("Etc/GMT-3")
+            current_time = datetime.now(tz=timezone)
+            departure_time = datetime.strptime(new_flight_dict["scheduled_departure"], "%Y-%m-%d %H:%M:%S.%f%z")
+            time_until = (departure_time - current_time).total_seconds()
+
+            if time_until < (3 * 3600):
+                cursor.close()
+                return f"Not permitted to reschedule to a flight that is less than 3 hours from the current time."
+
+            cursor.execute(TICKET_FLIGHT_QUERY, (ticket_no,))
+            current_flight = cursor.fetchone()
+            if not current_flight:
+                cursor.close()
+                return "No existing ticket found for the given ticket number."
+
+            cursor.execute(TICKET_OWNER_QUERY, (ticket_no, passenger_id))
+            current_ticket = cursor.fetchone()
+            if not current_ticket:
+                cursor.close()
+                return f"Current signed-in passenger with ID {passenger_id} not the owner of ticket {ticket_no}"
+
+            cursor.execute(UPDATE_TICKET_FLIGHT, (new_flight_id, ticket_no))
+            conn.commit()
             cursor.close()
-            conn.close()
-            return f"Current signed-in passenger with ID {passenger_id} not the owner of ticket {ticket_no}"
-
-        cursor.execute("UPDATE ticket_flights SET flight_id = ? WHERE ticket_no = ?", (new_flight_id, ticket_no))
-        conn.commit()
-        cursor.close()
-        conn.close()
 
         return "Ticket successfully updated to new flight."
 
@@ -148,27 +155,23 @@ class FlightService:
         if not passenger_id:
             raise ValueError("No passenger ID configured.")
 
-        conn = sqlite3.connect(self.DB)
-        cursor = conn.cursor()
+        with connection(self.DB) as conn:
+            cursor = conn.cursor()
 
-        cursor.execute("SELECT flight_id FROM ticket_flights WHERE ticket_no = ?", (ticket_no,))
-        existing_ticket = cursor.fetchone()
-        if not existing_ticket:
-            cursor.close()
-            conn.close()
-            return "No existing ticket found for the given ticket number."
+            cursor.execute(TICKET_FLIGHT_QUERY, (ticket_no,))
+            existing_ticket = cursor.fetchone()
+            if not existing_ticket:
+                cursor.close()
+                return "No existing ticket found for the given ticket number."
 
-        cursor.execute("SELECT flight_id FROM tickets WHERE ticket_no = ? AND passenger_id = ?",
-                       (ticket_no, passenger_id))
-        current_ticket = cursor.fetchone()
-        if not current_ticket:
-            cursor.close()
-            conn.close()
-            return f"Current signed-in passenger with ID {passenger_id} not the owner of ticket {ticket_no}"
+            cursor.execute(TICKET_OWNER_QUERY, (ticket_no, passenger_id))
+            current_ticket = cursor.fetchone()
+            if not current_ticket:
+                cursor.close()
+                return f"Current signed-in passenger with ID {passenger_id} not the owner of ticket {ticket_no}"
 
-        cursor.execute("DELETE FROM ticket_flights WHERE ticket_no = ?", (ticket_no,))
-        conn.commit()
-        cursor.close()
-        conn.close()
+            cursor.execute(DELETE_TICKET_FLIGHTS, (ticket_no,))
+            conn.commit()
+            cursor.close()
 
         return "Ticket successfully cancelled."
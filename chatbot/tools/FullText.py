@@ -0,0 +1,158 @@
+import re
+import sqlite3
+import threading
+from typing import Optional
+
+from chatbot.tools.Database import connection
+from chatbot.tools.Pagination import DEFAULT_PAGE_SIZE, clamp_limit, more_results, parse_cursor, search_page
+from chatbot.tools.Schema import FTS_TABLES
+
+_INDEX = {table: name for name, (table, _) in FTS_TABLES.items()}
+_WORD = re.compile(r"\w+")
+
+_lock = threading.Lock()
+_stats = {"fts": 0, "fts_and_infix": 0, "infix": 0, "like": 0, "fallback_missing_index": 0}
+
+
+def _count(key: str) -> None:
+    with _lock:
+        _stats[key] += 1
+
+
+def match_expression(terms: dict[str, list[str]]) -> Optional[str]:
+    """FTS5 query for `terms` (column -> alternatives), or None when a term has no word to match on.
+
+    Columns are ANDed, a column's alternatives ORed, and every word of an alternative must match a token
+    prefix: {"location": ["zur"], "keywords": ["art", "old town"]} becomes
+    `location : (("zur"*)) AND keywords : (("art"*) OR ("old"* AND "town"*))`.
+    """
+    clauses = []
+    for column, alternatives in terms.items():
+        groups = []
+        for alternative in alternatives:
+            words = _WORD.findall(alternative.casefold())
+            if not words:
+                return None
+            groups.append("(" + " AND ".join(f'"{word}"*' for word in words) + ")")
+        clauses.append(f"{column} : ({' OR '.join(groups)})")
+    return " AND ".join(clauses) if clauses else None
+
+
+def fts_query(table: str, expression: str, ranked: bool = False) -> tuple[str, list, dict]:
+    """The search `fts_page` pages through: SQL, parameters and its ordering (`search_page` arguments)."""
+    index = _INDEX[table]
+    if not ranked:
+        query = f"SELECT {table}.* FROM {index} JOIN {table} ON {table}.id = {index}.rowid WHERE {index} MATCH ?"
+        return query, [expression], {"key": f"{index}.rowid"}
+    query = (f"SELECT {table}.* FROM {table} JOIN (SELECT rowid AS fts_id, bm25({index}) AS fts_rank "
+             f"FROM {index} WHERE {index} MATCH ?) ON fts_id = {table}.id WHERE 1=1")
+    return query, [expression], {"order_by": "fts_rank, id"}
+
+
+def fts_page(db_path: str, table: str, expression: str, limit: Optional[int] = DEFAULT_PAGE_SIZE,
+             offset: Optional[int] = 0, cursor: Optional[str] = None, ranked: bool = False) -> list[dict]:
+    """One page of `table` rows matching `expression`.
+
+    Unranked pages follow the index in rowid (= id) order, so a page stops reading after `limit` matches
+    and keyset cursors seek in the index. Ranked pages (best bm25 first) have to score every match before
+    the first row comes out, and continue with offset cursors.
+    """
+    query, params, ordering = fts_query(table, expression, ranked)
+    return search_page(db_path, query, params, limit=limit, offset=offset, cursor=cursor,
+                       operation=f"search_{table}", **ordering)
+
+
+def like_query(table: str, terms: dict[str, list[str]]) -> tuple[str, list]:
+    """The original substring search: `column LIKE '%term%'`, which scans the whole table."""
+    query = f"SELECT * FROM {table} WHERE 1=1"
+    params = []
+    for column, alternatives in terms.items():
+        query += " AND (" + " OR ".join(f"{column} LIKE ?" for _ in alternatives) + ")"
+        params.extend(f"%{alternative}%" for alternative in alternatives)
+    return query, params
+
+
+def like_page(db_path: str, table: str, terms: dict[str, list[str]], limit: Optional[int] = DEFAULT_PAGE_SIZE,
+              offset: Optional[int] = 0, cursor: Optional[str] = None) -> list[dict]:
+    """One page of `like_query`, in id order."""
+    query, params = like_query(table, terms)
+    return search_page(db_path, query, params, limit=limit, offset=offset, cursor=cursor,
+                       operation=f"search_{table}")
+
+
+def infix_query(table: str, terms: dict[str, list[str]], expression: str) -> tuple[str, list]:
+    """The LIKE matches `expression` does not find (infix matches such as "rich" in "Zurich")."""
+    query, params = like_query(table, terms)
+    index = _INDEX[table]
+    return f"{query} AND id NOT IN (SELECT rowid FROM {index} WHERE {index} MATCH ?)", params + [expression]
+
+
+def infix_page(db_path: str, table: str, terms: dict[str, list[str]], expression: str,
+               limit: Optional[int] = DEFAULT_PAGE_SIZE, offset: Optional[int] = 0) -> list[dict]:
+    """One page of `infix_query`, in id order."""
+    query, params = infix_query(table, terms, expression)
+    return search_page(db_path, query, params, limit=limit, offset=offset, operation=f"search_{table}")
+
+
+def count_query(table: str, expression: str) -> tuple[str, list]:
+    index = _INDEX[table]
+    return f"SELECT count(*) FROM {index} WHERE {index} MATCH ?", [expression]
+
+
+def count_matches(db_path: str, table: str, expression: str) -> int:
+    query, params = count_query(table, expression)
+    with connection(db_path, f"search_{table}") as conn:
+        return conn.execute(query, params).fetchone()[0]
+
+
+def search_text(db_path: str, table: str, terms: dict[str, list[Optional[str]]],
+                limit: Optional[int] = DEFAULT_PAGE_SIZE, offset: Optional[int] = 0,
+                cursor: Optional[str] = None, ranked: bool = False) -> list[dict]:
+    """Inventory search through the table's full-text index, followed by the infix matches it misses.
+
+    The results of a text search are one sequence: the index matches (in id order, or best bm25 first
+    when `ranked`), then the LIKE matches the index does not find (such as "rich" in "Zurich") in id
+    order. Pages address it by position, so the whole cursor chain ("offset=<n>") follows that one order
+    and no row is shown twice or skipped. Only a page that runs out of index matches pays for the LIKE
+    scan. The LIKE path alone serves searches without text terms, terms with no word characters, and
+    databases whose index has not been built yet (see `Schema.create_fts`); a keyset cursor can only come
+    from such a page, and continues there.
+    """
+    terms = {column: [term.strip() for term in alternatives if term and term.strip()]
+             for column, alternatives in terms.items()}
+    terms = {column: alternatives for column, alternatives in terms.items() if alternatives}
+    expression = match_expression(terms)
+    parsed = parse_cursor(cursor)
+    if expression is not None and not (parsed is not None and parsed[0] == "after_id"):
+        limit = clamp_limit(limit)
+        start = parsed[1] if parsed is not None else offset
+        start = max(int(start or 0), 0)
+        try:
+            rows = fts_page(db_path, table, expression, limit=limit, offset=start, ranked=ranked)
+        except sqlite3.OperationalError as e:
+            if "no such table" not in str(e):
+                raise
+            _count("fallback_missing_index")
+        else:
+            if rows and rows[-1].get("more_results"):
+                _count("fts")
+                return rows[:-1] + [more_results(limit, start + limit, f"offset={start + limit}")]
+            # the index matches end on this page: fill it with the infix matches, which come after them
+            matched = start + len(rows) if rows or start == 0 else count_matches(db_path, table, expression)
+            room = limit - len(rows)
+            tail = infix_page(db_path, table, terms, expression, limit=room or 1,
+                              offset=max(start + len(rows) - matched, 0))
+            more = bool(tail) if room == 0 else bool(tail) and bool(tail[-1].get("more_results"))
+            tail = [row for row in tail if not row.get("more_results")][:room]
+            _count("fts" if not tail else "fts_and_infix" if rows else "infix")
+            rows += tail
+            if more:
+                rows.append(more_results(limit, start + limit, f"offset={start + limit}"))
+            return rows
+    _count("like")
+    return like_page(db_path, table, terms, limit=limit, offset=offset, cursor=cursor)
+
+
+def get_stats() -> dict:
+    with _lock:
+        return dict(_stats)
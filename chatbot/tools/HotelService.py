@@ -1,8 +1,18 @@
-import sqlite3
 from datetime import date, datetime
 from typing import Optional, Union
+
+from chatbot.tools.Database import connection, execute_write
+from chatbot.tools.FullText import search_text
+from chatbot.tools.Pagination import DEFAULT_PAGE_SIZE
+from chatbot.tools.ResultCache import result_cache
 # from langchain_core.tools import tool
 
+# the statements the service runs (Schema.service_queries checks their plans)
+BOOK_HOTEL = "UPDATE hotels SET booked = 1 WHERE id = ?"
+UPDATE_HOTEL_CHECKIN = "UPDATE hotels SET checkin_date = ? WHERE id = ?"
+UPDATE_HOTEL_CHECKOUT = "UPDATE hotels SET checkout_date = ? WHERE id = ?"
+CANCEL_HOTEL = "UPDATE hotels SET booked = 0 WHERE id = ?"
+
 
 # Hotel Service
 class HotelService:
@@ -19,78 +29,62 @@ class HotelService:
             self.cancel_hotel
         ]
 
+    @result_cache.cached("hotels", case_insensitive=("location", "name"))
     def search_hotels(self, location: Optional[str] = None,
                       name: Optional[str] = None,
                       price_tier: Optional[str] = None,
                       checkin_date: Optional[Union[datetime, date]] = None,
                       checkout_date: Optional[Union[datetime, date]] = None,
+                      limit: int = DEFAULT_PAGE_SIZE,
+                      offset: int = 0,
+                      cursor: Optional[str] = None,
                       ) -> list[dict]:
         """ search_hotels """
-        conn = sqlite3.connect(self.DB)
-        cursor = conn.cursor()
-        query = "SELECT * FROM hotels WHERE 1=1"
-        params = []
-
-        if location:
-            query += " AND location LIKE ?"
-            params.append(f"%{location}%")
-        if name:
-            query += " AND name LIKE ?"
-            params.append(f"%{name}%")
-
-        cursor.execute(query, params)
-        results = cursor.fetchall()
-        conn.close()
-
-        return [dict(zip([column[0] for column in cursor.description], row)) for row in results]
+        return search_text(self.DB, "hotels", {"location": [location], "name": [name]},
+                           limit=limit, offset=offset, cursor=cursor)
 
+    @result_cache.invalidates("hotels")
     def book_hotel(self, hotel_id: int) -> str:
         """ book_hotel """
-        conn = sqlite3.connect(self.DB)
-        cursor = conn.cursor()
-        cursor.execute("UPDATE hotels SET booked = 1 WHERE id = ?", (hotel_id,))
-        conn.commit()
+        with connection(self.DB) as conn:
+            changed = execute_write(conn, BOOK_HOTEL, (hotel_id,))
+            conn.commit()
 
-        if cursor.rowcount > 0:
-            conn.close()
+        if changed > 0:
             return f"Hotel {hotel_id} successfully booked."
         else:
-            conn.close()
             return f"No hotel found with ID {hotel_id}."
 
+    @result_cache.invalidates("hotels")
     def update_hotel(
             self, hotel_id: int,
             checkin_date: Optional[Union[datetime, date]] = None,
             checkout_date: Optional[Union[datetime, date]] = None,
     ) -> str:
         """ update_hotel """
-        conn = sqlite3.connect(self.DB)
-        cursor = conn.cursor()
+        with connection(self.DB) as conn:
+            changed = 0
+            if checkin_date:
+                changed = execute_write(conn, UPDATE_HOTEL_CHECKIN, (checkin_date, hotel_id))
+            if checkout_date:
+                changed = execute_write(conn, UPDATE_HOTEL_CHECKOUT, (checkout_date, hotel_id))
 
-        if checkin_date:
-            cursor.execute("UPDATE hotels SET checkin_date = ? WHERE id = ?", (checkin_date, hotel_id))
-        if checkout_date:
-            cursor.execute("UPDATE hotels SET checkout_date = ? WHERE id = ?", (checkout_date, hotel_id))
+            conn.commit()
 
-        conn.commit()
-        if cursor.rowcount > 0:
-            conn.close()
+        if changed > 0:
             return f"Hotel {hotel_id} successfully updated."
         else:
-            conn.close()
             return f"No hotel found with ID {hotel_id}."
 
     # @tool
+    @result_cache.invalidates("hotels")
     def cancel_hotel(self, hotel_id: int) -> str:
         """ cancel_hotel """
-        conn = sqlite3.connect(self.DB)
-        cursor = conn.cursor()
-        cursor.execute("UPDATE hotels SET booked = 0 WHERE id = ?", (hotel_id,))
-        conn.commit()
+        with connection(self.DB) as conn:
+            changed = execute_write(conn, CANCEL_HOTEL, (hotel_id,))
+            conn.commit()
 
-        if cursor.rowcount > 0:
-            conn.close()
+        if changed > 0:
             return f"Hotel {hotel_id} successfully cancelled."
         else:
-            conn.close()
             return f"No hotel found with ID {hotel_id}."
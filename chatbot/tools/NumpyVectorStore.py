@@ -0,0 +1,125 @@
+import json
+import os
+import uuid
+from typing import Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+
+class NumpyVectorStore(VectorStore):
+    """In-process vector store backed by one contiguous matrix of unit-length embeddings.
+
+    Meant for small corpora such as the Swiss FAQ (a few dozen chunks), where Chroma's client and
+    persistence layer cost more than the search itself. Search is a single matrix-vector product
+    followed by a top-k partition. On disk the store is a plain directory:
+
+        vectors.npy       float32 or float16 matrix, one row per document (memory-mapped on load)
+        documents.jsonl   one {"id", "page_content", "metadata"} object per row
+    """
+
+    VECTORS_FILE = "vectors.npy"
+    DOCUMENTS_FILE = "documents.jsonl"
+
+    def __init__(self, embedding: Embeddings, vectors: Optional[np.ndarray] = None,
+                 documents: Optional[List[Document]] = None, ids: Optional[List[str]] = None):
+        self._embedding = embedding
+        self._documents = list(documents or [])
+        self._ids = list(ids or [str(uuid.uuid4()) for _ in self._documents])
+        self._vectors = vectors if vectors is not None else np.empty((0, 0), dtype=np.float32)
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = kwargs.get("ids") or [str(uuid.uuid4()) for _ in texts]
+        new_vectors = self._normalize(np.asarray(self._embedding.embed_documents(texts), dtype=np.float32))
+
+        if self._vectors.size:
+            self._vectors = np.ascontiguousarray(np.vstack([self._vectors.astype(np.float32), new_vectors]))
+        else:
+            self._vectors = np.ascontiguousarray(new_vectors)
+        self._documents.extend(Document(page_content=text, metadata=meta) for text, meta in zip(texts, metadatas))
+        self._ids.extend(ids)
+        return ids
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   **kwargs: Any) -> "NumpyVectorStore":
+        store = cls(embedding=embedding)
+        store.add_texts(texts, metadatas, **kwargs)
+        return store
+
+    def _top_k(self, embedding: List[float], k: int) -> List[Tuple[int, float]]:
+        if not self._documents:
+            return []
+        query = self._normalize(np.asarray(embedding, dtype=np.float32))
+        # float16 matrices are upcast in one pass; float32 (the default) is used as-is
+        scores = self._vectors.astype(np.float32, copy=False) @ query
+        k = min(k, scores.shape[0])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(i), float(scores[i])) for i in top]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [self._documents[i] for i, _ in self._top_k(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        embedding = self._embedding.embed_query(query)
+        return [(self._documents[i], score) for i, score in self._top_k(embedding, k)]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return self.similarity_search_by_vector(self._embedding.embed_query(query), k)
+
+    def _select_relevance_score_fn(self):
+        # scores are cosine similarities in [-1, 1]; map them onto [0, 1]
+        return lambda score: (score + 1.0) / 2.0
+
+    def save(self, directory: str, dtype: str = "float32") -> None:
+        """Write the store to `directory`, replacing an earlier copy.
+
+        Both files are written under temporary names and then moved into place with `os.replace`, so a
+        crash mid-write never leaves a truncated store, and a process that memory-mapped the old vectors
+        keeps reading the old file.
+        """
+        os.makedirs(directory, exist_ok=True)
+        vectors_path = os.path.join(directory, self.VECTORS_FILE)
+        documents_path = os.path.join(directory, self.DOCUMENTS_FILE)
+        with open(vectors_path + ".tmp", "wb") as f:  # np.save would append ".npy" to a path
+            np.save(f, self._vectors.astype(dtype))
+        with open(documents_path + ".tmp", "w", encoding="utf-8") as f:
+            for doc_id, doc in zip(self._ids, self._documents):
+                f.write(json.dumps({"id": doc_id, "page_content": doc.page_content, "metadata": doc.metadata}) + "\n")
+        os.replace(documents_path + ".tmp", documents_path)
+        os.replace(vectors_path + ".tmp", vectors_path)
+
+    @classmethod
+    def load(cls, directory: str, embedding: Embeddings, mmap: bool = True) -> "NumpyVectorStore":
+        vectors = np.load(os.path.join(directory, cls.VECTORS_FILE), mmap_mode="r" if mmap else None)
+        ids, documents = [], []
+        with open(os.path.join(directory, cls.DOCUMENTS_FILE), encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                ids.append(record["id"])
+                documents.append(Document(page_content=record["page_content"], metadata=record["metadata"]))
+        if len(vectors) != len(documents):
+            raise ValueError(f"{directory}: {len(vectors)} vectors but {len(documents)} documents")
+        return cls(embedding=embedding, vectors=vectors, documents=documents, ids=ids)
+
+    @classmethod
+    def exists(cls, directory: str) -> bool:
+        return os.path.exists(os.path.join(directory, cls.VECTORS_FILE)) and \
+            os.path.exists(os.path.join(directory, cls.DOCUMENTS_FILE))
@@ -0,0 +1,89 @@
+import itertools
+import re
+import sqlite3
+from typing import Iterator, Optional
+
+from chatbot.tools.Database import connection
+
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 50  # server-side cap, whatever the model asks for
+
+_CURSOR = re.compile(r"^(after_id|offset)=(-?\d+)$")
+
+
+def iter_rows(cursor: sqlite3.Cursor) -> Iterator[dict]:
+    """Yield the rows of an executed cursor as dicts, one at a time (no fetchall)."""
+    columns = [column[0] for column in cursor.description]
+    for row in cursor:
+        yield dict(zip(columns, row))
+
+
+def parse_cursor(cursor: Optional[str]) -> Optional[tuple[str, int]]:
+    """("after_id", id) for a keyset cursor, ("offset", n) for the cursor of a ranked search, or None."""
+    if not cursor:
+        return None
+    match = _CURSOR.match(cursor.strip())
+    if not match:
+        raise ValueError(f"Invalid cursor {cursor!r}; pass the next_cursor value of a previous page.")
+    return match.group(1), int(match.group(2))
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    """The page size actually served: `limit` (DEFAULT_PAGE_SIZE when unset) clamped to [1, MAX_PAGE_SIZE]."""
+    return min(max(int(limit or DEFAULT_PAGE_SIZE), 1), MAX_PAGE_SIZE)
+
+
+def more_results(limit: int, next_offset: int, next_cursor: str) -> dict:
+    """The marker entry that ends a page when more rows match."""
+    return {
+        "more_results": True,
+        "next_cursor": next_cursor,
+        "next_offset": next_offset,
+        "note": f"Showing {limit} results. More match: call again with cursor=<next_cursor>, or narrow the search.",
+    }
+
+
+def page_query(query: str, params: list, limit: Optional[int] = DEFAULT_PAGE_SIZE, offset: Optional[int] = 0,
+               cursor: Optional[str] = None, order_by: Optional[str] = None,
+               key: str = "id") -> tuple[str, list, int, int]:
+    """The SQL and parameters of one `search_page` page, plus the limit and offset it serves."""
+    limit = clamp_limit(limit)
+    offset = max(int(offset or 0), 0)
+    params = list(params)
+    parsed = parse_cursor(cursor)
+    if parsed is not None and parsed[0] == "offset":
+        offset = max(parsed[1], 0)
+    elif parsed is not None:
+        if order_by is not None:
+            raise ValueError(f"Cursor {cursor!r} belongs to an unranked search; pass offset=<n> instead.")
+        query += f" AND {key} > ?"
+        params.append(parsed[1])
+        offset = 0
+    query += f" ORDER BY {order_by or key} LIMIT ? OFFSET ?"
+    return query, params + [limit + 1, offset], limit, offset
+
+
+def search_page(db_path: str, query: str, params: list, limit: Optional[int] = DEFAULT_PAGE_SIZE,
+                offset: Optional[int] = 0, cursor: Optional[str] = None,
+                order_by: Optional[str] = None, key: str = "id", operation: Optional[str] = None) -> list[dict]:
+    """Run an inventory search (`SELECT ... WHERE 1=1 AND ...`) one page at a time, ordered by id.
+
+    `limit` is clamped to [1, MAX_PAGE_SIZE]. `cursor` (keyset, "after_id=<id>") takes precedence over
+    `offset`. One extra row is read to detect a further page; when there is one, a final marker entry
+    {"more_results": True, "next_cursor": ..., ...} tells the agent how to continue instead of every
+    match being dumped into its context. `order_by` (e.g. a relevance rank) replaces the id ordering;
+    such pages continue with an offset cursor ("offset=<n>"), since there is no id to resume after.
+    `key` is the expression the id order and the keyset filter use, when another one equals the row id
+    and is cheaper to seek on (the rowid of a full-text index, see `FullText.py`). `operation` labels the
+    SQL time in the metrics (the calling service method).
+    """
+    query, params, limit, offset = page_query(query, params, limit, offset, cursor, order_by, key)
+
+    with connection(db_path, operation) as conn:
+        rows = list(itertools.islice(iter_rows(conn.execute(query, params)), limit + 1))
+
+    if len(rows) <= limit:
+        return rows
+    rows = rows[:limit]
+    next_cursor = f"offset={offset + limit}" if order_by else f"after_id={rows[-1]['id']}"
+    return rows + [more_results(limit, offset + limit, next_cursor)]
@@ -0,0 +1,108 @@
+import threading
+import time
+from typing import Optional
+
+from langchain_core.documents import Document
+
+from chatbot.metrics import retriever_seconds
+from chatbot.tools.Data import DataPreparer, on_vectorstore_rebuilt
+from chatbot.tools.SemanticCache import SemanticCache
+
+
+class PolicyRetriever:
+    """Process-wide FAQ retriever shared by every `lookup_policy` call.
+
+    The embeddings client and the vector store are opened once, on first use, instead of on every
+    policy question. Answers go through a `SemanticCache`: exact repeats skip the embedding call,
+    near-duplicates skip the similarity search. Both are dropped when the FAQ collection is rebuilt.
+    Without a `preparer`, the store is the one `DataPreparer` picks: Chroma, or the numpy store when
+    the VECTOR_BACKEND environment variable is "numpy".
+    """
+
+    def __init__(self, preparer: Optional[DataPreparer] = None, k: int = 2,
+                 cache: Optional[SemanticCache] = None, use_cache: bool = True):
+        self.preparer = preparer
+        self.k = k
+        self.cache = cache or SemanticCache()
+        self.use_cache = use_cache
+        self._retriever = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            "builds": 0,
+            "startup_seconds": None,
+            "queries": 0,
+            "query_seconds_total": 0.0,
+            "last_query_seconds": None,
+        }
+        on_vectorstore_rebuilt(self._on_vectorstore_rebuilt)
+
+    def _build(self, overwrite: bool = False):
+        started = time.perf_counter()
+        preparer = self.preparer or DataPreparer()
+        retriever = preparer.start_retriever(overwrite=overwrite, k=self.k)
+        with self._stats_lock:
+            self.stats["builds"] += 1
+            self.stats["startup_seconds"] = time.perf_counter() - started
+        return retriever
+
+    def _on_vectorstore_rebuilt(self) -> None:
+        # may run inside reload() while the build lock is held, so only drop references here
+        self._retriever = None
+        self.cache.invalidate()
+
+    def get(self):
+        """Return the shared retriever, building it on first use (double-checked under a lock)."""
+        retriever = self._retriever
+        if retriever is None:
+            with self._lock:
+                if self._retriever is None:
+                    self._retriever = self._build()
+                retriever = self._retriever
+        return retriever
+
+    def reload(self, overwrite: bool = False) -> None:
+        """Rebuild the shared retriever, e.g. after the FAQ vector store was recreated."""
+        with self._lock:
+            self.cache.invalidate()
+            self._retriever = self._build(overwrite=overwrite)
+
+    def _search(self, query: str) -> tuple[list[Document], str]:
+        """The documents for `query` and how they were found: "off", "exact", "similar" or "miss"."""
+        retriever = self.get()
+        if not self.use_cache:
+            return retriever.invoke(query), "off"
+
+        docs = self.cache.get_exact(query)
+        if docs is not None:
+            return docs, "exact"
+        vectorstore = retriever.vectorstore
+        embedding = vectorstore.embeddings.embed_query(query)
+        docs = self.cache.get_similar(embedding)
+        if docs is not None:
+            return docs, "similar"
+        docs = vectorstore.similarity_search_by_vector(embedding, **retriever.search_kwargs)
+        self.cache.put(query, docs, embedding)
+        return docs, "miss"
+
+    def invoke(self, query: str) -> list[Document]:
+        self.get()  # keep a first-call build out of the per-query timings
+        started = time.perf_counter()
+        docs, cache = self._search(query)
+        elapsed = time.perf_counter() - started
+        retriever_seconds.observe(elapsed, cache=cache)
+        with self._stats_lock:
+            self.stats["queries"] += 1
+            self.stats["query_seconds_total"] += elapsed
+            self.stats["last_query_seconds"] = elapsed
+        return docs
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats["mean_query_seconds"] = stats["query_seconds_total"] / stats["queries"] if stats["queries"] else None
+        stats["cache"] = self.cache.get_stats()
+        return stats
+
+
+policy_retriever = PolicyRetriever()
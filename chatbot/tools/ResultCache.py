@@ -0,0 +1,131 @@
+import copy
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Callable, Optional
+
+from langchain_core.runnables import ensure_config
+
+
+def _normalize(value, case_insensitive: bool):
+    if isinstance(value, str):
+        value = " ".join(value.split())
+        return value.casefold() if case_insensitive else value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return tuple(_normalize(v, case_insensitive) for v in value)
+    return value
+
+
+def _scope() -> str:
+    # sandboxed sessions (see Sandbox.py) see their own writes, so their results are cached apart
+    configurable = ensure_config().get("configurable", {})
+    if configurable.get("db_sandbox"):
+        return f"sandbox:{configurable.get('thread_id')}"
+    return "shared"
+
+
+class ResultCache:
+    """Shared cache for the read-only search tools, invalidated per table by the write tools.
+
+    `@result_cache.cached("hotels")` keys a search on its name and normalized arguments (defaults
+    applied, whitespace collapsed, dates as ISO strings, `case_insensitive` arguments casefolded, since
+    they are only used in LIKE filters). `@result_cache.invalidates("hotels")` marks a booking/update/cancel
+    method; each call bumps the table's version, which makes every cached result that read it stale.
+    Writes inside a sandbox only invalidate that session's results. Entries are evicted LRU beyond
+    `max_entries` and expire after `ttl` seconds (for changes made outside the tools).
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._versions: dict[tuple, int] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0, "invalidations": 0, "by_tool": {}}
+
+    def _table_versions(self, scope: str, tables: tuple) -> tuple:
+        return tuple((self._versions.get(("shared", t), 0), self._versions.get((scope, t), 0)) for t in tables)
+
+    def _count(self, tool: str, key: str) -> None:
+        self.stats[key] += 1
+        by_tool = self.stats["by_tool"].setdefault(tool, {"hits": 0, "misses": 0})
+        by_tool["hits" if key == "hits" else "misses"] += 1
+
+    def invalidate(self, *tables: str, scope: Optional[str] = None) -> None:
+        scope = scope or _scope()
+        with self._lock:
+            for table in tables:
+                self._versions[(scope, table)] = self._versions.get((scope, table), 0) + 1
+            self.stats["invalidations"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def cached(self, *tables: str, case_insensitive: tuple = ()) -> Callable:
+        def decorator(func):
+            signature = inspect.signature(func)
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                arguments = tuple(
+                    (name, _normalize(value, name in case_insensitive))
+                    for name, value in bound.arguments.items() if name != "self"
+                )
+                scope = _scope()
+                key = (scope, func.__qualname__, arguments)
+                now = time.monotonic()
+                with self._lock:
+                    versions = self._table_versions(scope, tables)
+                    entry = self._entries.get(key)
+                    if entry is not None:
+                        value, entry_versions, expires = entry
+                        if entry_versions == versions and (expires is None or now < expires):
+                            self._entries.move_to_end(key)
+                            self._count(func.__name__, "hits")
+                            return copy.deepcopy(value)
+                        del self._entries[key]
+                        self.stats["stale"] += 1
+                    self._count(func.__name__, "misses")
+
+                # versions were read before the query: a write that lands meanwhile makes this entry stale
+                value = func(*args, **kwargs)
+                with self._lock:
+                    self._entries[key] = (copy.deepcopy(value), versions, now + self.ttl if self.ttl else None)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                        self.stats["evictions"] += 1
+                return value
+
+            return wrapper
+        return decorator
+
+    def invalidates(self, *tables: str) -> Callable:
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.invalidate(*tables)
+            return wrapper
+        return decorator
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats, by_tool={tool: dict(s) for tool, s in self.stats["by_tool"].items()})
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else None
+        return stats
+
+
+result_cache = ResultCache()
@@ -0,0 +1,199 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+logger = logging.getLogger("chatbot.sandbox")
+
+# Every table a session writes to gets a row-level copy-on-write overlay, so creating a sandbox costs the
+# same whatever the size of the database file: a temp view with the table's name reads the shared rows
+# through a LEFT JOIN on `temp._overlay_<table>`, and INSTEAD OF triggers record updates and deletes there.
+# table -> (row key, key columns). The row key identifies a shared row in the overlay: a unique column,
+# or the rowid (exposed by the view as `_rowid`). The key columns are read straight from the shared table
+# (so lookups and joins on them keep using its indexes) and cannot be changed inside a sandbox.
+OVERLAY_TABLES = {
+    "ticket_flights": ("rowid", ["ticket_no"]),
+    "hotels": ("id", ["id"]),
+    "car_rentals": ("id", ["id"]),
+    "trip_recommendations": ("id", ["id"]),
+}
+
+_WRITE_ACTIONS = {
+    sqlite3.SQLITE_INSERT, sqlite3.SQLITE_UPDATE, sqlite3.SQLITE_DELETE,
+    sqlite3.SQLITE_CREATE_TABLE, sqlite3.SQLITE_DROP_TABLE, sqlite3.SQLITE_ALTER_TABLE,
+    sqlite3.SQLITE_CREATE_INDEX, sqlite3.SQLITE_DROP_INDEX,
+}
+
+
+def _protect_shared_database(action, arg1, arg2, db_name, trigger):
+    # everything a session writes must land in its temp schema, never in the shared file
+    if action == sqlite3.SQLITE_UPDATE and arg1 == "sqlite_master":
+        # asked when a full-text index is first opened; SQLite itself refuses real schema-table writes
+        return sqlite3.SQLITE_OK
+    if action in _WRITE_ACTIONS and db_name == "main":
+        return sqlite3.SQLITE_DENY
+    return sqlite3.SQLITE_OK
+
+
+class SessionSandbox:
+    """One session's private, copy-on-write view of the shared travel database."""
+
+    def __init__(self, base_path: str, session_id: str, busy_timeout: float = 5.0):
+        self.session_id = session_id
+        self.conn = sqlite3.connect(base_path, timeout=busy_timeout, check_same_thread=False)
+        self.lock = threading.RLock()  # a session's tool calls may run on several threads
+        self.last_used = time.monotonic()
+        self.users = 0  # open `SandboxRegistry.connection` blocks; guarded by the registry's lock
+        self.closing = False  # reset while in use: closed by the last user
+        self._install()
+        self.conn.set_authorizer(_protect_shared_database)
+
+    def _columns(self, table: str) -> list[str]:
+        return [row[1] for row in self.conn.execute(f"PRAGMA main.table_info({table})")]
+
+    def _install(self) -> None:
+        statements = []
+        for table, (row_key, keys) in OVERLAY_TABLES.items():
+            columns = self._columns(table)
+            mutable = [column for column in columns if column not in keys]
+            overlay = f"_overlay_{table}"
+            old_key = "OLD._rowid" if row_key == "rowid" else f"OLD.{row_key}"
+            statements.append(
+                f"CREATE TEMP TABLE {overlay} (_key INTEGER PRIMARY KEY, _deleted INTEGER NOT NULL, "
+                f"{', '.join(mutable)})"
+            )
+            selected = [f"b.{column} AS {column}" if column in keys else
+                        f"CASE WHEN o._key IS NULL THEN b.{column} ELSE o.{column} END AS {column}"
+                        for column in columns]
+            if row_key == "rowid":
+                selected.append("b.rowid AS _rowid")
+            statements.append(
+                f"CREATE TEMP VIEW {table} AS SELECT {', '.join(selected)} "
+                f"FROM main.{table} b LEFT JOIN {overlay} o ON o._key = b.{row_key} WHERE o._deleted IS NOT 1"
+            )
+            statements.append(
+                f"CREATE TEMP TRIGGER {overlay}_update INSTEAD OF UPDATE ON {table} BEGIN "
+                f"INSERT OR REPLACE INTO {overlay} (_key, _deleted, {', '.join(mutable)}) "
+                f"VALUES ({old_key}, 0, {', '.join('NEW.' + column for column in mutable)}); END"
+            )
+            statements.append(
+                f"CREATE TEMP TRIGGER {overlay}_delete INSTEAD OF DELETE ON {table} BEGIN "
+                f"INSERT OR REPLACE INTO {overlay} (_key, _deleted, {', '.join(mutable)}) "
+                f"VALUES ({old_key}, 1, {', '.join('OLD.' + column for column in mutable)}); END"
+            )
+
+        with self.conn:
+            for statement in statements:
+                self.conn.execute(statement)
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+
+class SandboxRegistry:
+    """Per-`thread_id` sandboxes over one shared database file, created lazily and evicted LRU/idle.
+
+    A sandbox is only evicted while no call is using it, so `max_sessions` can be exceeded for as long
+    as that many sessions are busy at once.
+    """
+
+    def __init__(self, base_path: str, max_sessions: int = 256, idle_ttl: float = 3600.0):
+        self.base_path = base_path
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._sessions: OrderedDict[str, SessionSandbox] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"created": 0, "resets": 0, "evicted": 0, "create_seconds_total": 0.0}
+
+    def _evict(self) -> None:
+        # only sandboxes nobody is using: closing one mid-call would drop the changes it is making
+        now = time.monotonic()
+        for session_id, sandbox in list(self._sessions.items()):
+            if len(self._sessions) <= self.max_sessions and now - sandbox.last_used <= self.idle_ttl:
+                continue
+            if sandbox.users:
+                continue
+            self._sessions.pop(session_id).close()
+            self.stats["evicted"] += 1
+            logger.info("evicted sandbox of thread %s (idle %.0f s, %d sessions left)",
+                        session_id, now - sandbox.last_used, len(self._sessions))
+
+    def _acquire(self, session_id: str) -> SessionSandbox:
+        with self._lock:
+            sandbox = self._sessions.get(session_id)
+            if sandbox is None:
+                started = time.perf_counter()
+                sandbox = SessionSandbox(self.base_path, session_id)
+                self.stats["created"] += 1
+                self.stats["create_seconds_total"] += time.perf_counter() - started
+                self._sessions[session_id] = sandbox
+            self._sessions.move_to_end(session_id)
+            sandbox.last_used = time.monotonic()
+            sandbox.users += 1
+            self._evict()
+            return sandbox
+
+    def _release(self, sandbox: SessionSandbox) -> None:
+        with self._lock:
+            sandbox.users -= 1
+            sandbox.last_used = time.monotonic()
+            if sandbox.closing and not sandbox.users:
+                sandbox.close()
+
+    @contextmanager
+    def connection(self, session_id: str):
+        sandbox = self._acquire(session_id)
+        try:
+            with sandbox.lock:
+                try:
+                    yield sandbox.conn
+                finally:
+                    if sandbox.conn.in_transaction:
+                        sandbox.conn.rollback()
+        finally:
+            self._release(sandbox)
+
+    def reset(self, session_id: str) -> None:
+        """Throw away everything the session changed; the next call starts from the shared data again.
+
+        A call still running in the old sandbox finishes there, and the sandbox is closed after it.
+        """
+        with self._lock:
+            sandbox = self._sessions.pop(session_id, None)
+            if sandbox is not None:
+                self.stats["resets"] += 1
+                if sandbox.users:
+                    sandbox.closing = True
+                else:
+                    sandbox.close()
+
+    def close_all(self) -> None:
+        with self._lock:
+            for sandbox in self._sessions.values():
+                sandbox.close()
+            self._sessions.clear()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["sessions"] = len(self._sessions)
+        return stats
+
+
+_registries: dict[str, SandboxRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_sandboxes(db_path: str, **settings) -> SandboxRegistry:
+    """Return the process-wide sandbox registry for `db_path`, creating it with `settings` on first use."""
+    key = os.path.abspath(db_path)
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            registry = SandboxRegistry(db_path, **settings)
+            _registries[key] = registry
+        return registry
@@ -0,0 +1,212 @@
+import sqlite3
+
+# Covering indexes for the service queries. `update_timestamps` rewrites the tables with pandas,
+# which drops every index, so these are (re)created after each data preparation run.
+INDEXES = {
+    # fetch_user_flight_information: tickets -> ticket_flights -> flights -> boarding_passes
+    "idx_tickets_passenger": ("tickets", ["passenger_id", "ticket_no", "book_ref"]),
+    "idx_tickets_ticket_no": ("tickets", ["ticket_no", "passenger_id"]),
+    "idx_ticket_flights_ticket_no": ("ticket_flights", ["ticket_no", "flight_id", "fare_conditions"]),
+    "idx_ticket_flights_flight_id": ("ticket_flights", ["flight_id"]),
+    "idx_boarding_passes_ticket_flight": ("boarding_passes", ["ticket_no", "flight_id", "seat_no"]),
+    # search_flights / update_ticket_to_new_flight
+    "idx_flights_flight_id": ("flights", ["flight_id"]),
+    "idx_flights_departure": ("flights", ["departure_airport", "arrival_airport", "scheduled_departure"]),
+    "idx_flights_arrival": ("flights", ["arrival_airport", "scheduled_departure"]),
+    "idx_flights_scheduled_departure": ("flights", ["scheduled_departure"]),
+    # hotels / car rentals / excursions: id lookups for the booking updates, location for the searches
+    "idx_hotels_id": ("hotels", ["id"]),
+    "idx_hotels_location": ("hotels", ["location"]),
+    "idx_car_rentals_id": ("car_rentals", ["id"]),
+    "idx_car_rentals_location": ("car_rentals", ["location"]),
+    "idx_trip_recommendations_id": ("trip_recommendations", ["id"]),
+    "idx_trip_recommendations_location": ("trip_recommendations", ["location"]),
+}
+
+# FTS5 indexes for the inventory searches, as external-content tables: the text stays in the inventory
+# table and the index only holds its tokens, keyed on `id`. Triggers keep them in sync; the update trigger
+# only fires for the indexed columns, so bookings (`booked`, dates) never touch the index.
+FTS_TABLES = {
+    "hotels_fts": ("hotels", ["name", "location"]),
+    "car_rentals_fts": ("car_rentals", ["name", "location"]),
+    "trip_recommendations_fts": ("trip_recommendations", ["name", "location", "keywords"]),
+}
+FTS_TOKENIZER = "unicode61 remove_diacritics 2"  # "zurich" also finds "Zürich"
+
+
+def service_queries() -> list[tuple[str, str, list, bool]]:
+    """One entry per query the services run: (name, sql, sample params, full scan expected).
+
+    The SQL comes from the statements and query builders the services themselves use, so the check
+    cannot drift from what runs. `LIKE '%x%'` filters cannot use a b-tree index, so the infix and
+    no-index pages of the searches are expected to scan.
+    """
+    # imported here: the services and FullText import this module
+    from chatbot.tools import CarService, ExcursionService, FlightService, FullText, HotelService
+    from chatbot.tools.Pagination import page_query
+
+    passenger, ticket = "3442 587242", "0"
+    queries = [
+        ("fetch_user_flight_information", FlightService.USER_FLIGHTS_QUERY, [passenger], False),
+        ("search_flights(departure, arrival, window)",
+         *FlightService.search_flights_query("BSL", "ZRH", "2024-01-01", "2024-12-31"), False),
+        ("search_flights(departure)", *FlightService.search_flights_query("BSL"), False),
+        ("search_flights(arrival, window)",
+         *FlightService.search_flights_query(arrival_airport="ZRH", start_time="2024-01-01"), False),
+        ("search_flights(window)",
+         *FlightService.search_flights_query(start_time="2024-01-01", end_time="2024-12-31"), False),
+        ("update_ticket_to_new_flight: new flight", FlightService.NEW_FLIGHT_QUERY, [1], False),
+        ("ticket flights", FlightService.TICKET_FLIGHT_QUERY, [ticket], False),
+        ("ticket owner", FlightService.TICKET_OWNER_QUERY, [ticket, passenger], False),
+        ("update_ticket_to_new_flight: update", FlightService.UPDATE_TICKET_FLIGHT, [1, ticket], False),
+        ("cancel_ticket: delete", FlightService.DELETE_TICKET_FLIGHTS, [ticket], False),
+    ]
+
+    searches = [
+        ("search_hotels", "hotels", {"location": ["Zurich"], "name": ["Hilton"]}, False),
+        ("search_car_rentals", "car_rentals", {"location": ["Basel"], "name": ["Europcar"]}, False),
+        ("search_trip_recommendations", "trip_recommendations",
+         {"location": ["Basel"], "keywords": ["art", "history"]}, True),
+    ]
+    for name, table, terms, ranked in searches:
+        expression = FullText.match_expression(terms)
+        query, params, ordering = FullText.fts_query(table, expression, ranked)
+        queries.append((name, *page_query(query, params, **ordering)[:2], False))
+        queries.append((f"{name} (index matches counted)", *FullText.count_query(table, expression), False))
+        queries.append((f"{name} (infix matches)",
+                        *page_query(*FullText.infix_query(table, terms, expression))[:2], True))
+        queries.append((f"{name} (no index)", *page_query(*FullText.like_query(table, terms))[:2], True))
+
+    writes = [
+        ("book_hotel", HotelService.BOOK_HOTEL, [1]),
+        ("update_hotel: checkin", HotelService.UPDATE_HOTEL_CHECKIN, ["2024-01-01", 1]),
+        ("update_hotel: checkout", HotelService.UPDATE_HOTEL_CHECKOUT, ["2024-01-01", 1]),
+        ("cancel_hotel", HotelService.CANCEL_HOTEL, [1]),
+        ("book_car_rental", CarService.BOOK_CAR_RENTAL, [1]),
+        ("update_car_rental: start", CarService.UPDATE_CAR_RENTAL_START, ["2024-01-01", 1]),
+        ("update_car_rental: end", CarService.UPDATE_CAR_RENTAL_END, ["2024-01-01", 1]),
+        ("cancel_car_rental", CarService.CANCEL_CAR_RENTAL, [1]),
+        ("book_excursion", ExcursionService.BOOK_EXCURSION, [1]),
+        ("update_excursion", ExcursionService.UPDATE_EXCURSION, ["details", 1]),
+        ("cancel_excursion", ExcursionService.CANCEL_EXCURSION, [1]),
+    ]
+    queries += [(name, sql, params, False) for name, sql, params in writes]
+    return queries
+
+
+def create_indexes(conn: sqlite3.Connection) -> list[str]:
+    """Create any missing index in `INDEXES` and refresh the planner statistics; returns the names created."""
+    existing = existing_indexes(conn)
+    created = []
+    for name, (table, columns) in INDEXES.items():
+        if name in existing:
+            continue
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+        created.append(name)
+    if created:
+        conn.execute("ANALYZE")
+    conn.commit()
+    return created
+
+
+def existing_indexes(conn: sqlite3.Connection) -> set[str]:
+    rows = conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'").fetchall()
+    return {row[0] for row in rows}
+
+
+def missing_indexes(conn: sqlite3.Connection) -> list[str]:
+    existing = existing_indexes(conn)
+    return [name for name in INDEXES if name not in existing]
+
+
+def _fts_statements(name: str, table: str, columns: list[str]) -> dict[str, str]:
+    cols = ", ".join(columns)
+    new = ", ".join(f"new.{column}" for column in columns)
+    old = ", ".join(f"old.{column}" for column in columns)
+    delete = f"INSERT INTO {name} ({name}, rowid, {cols}) VALUES ('delete', old.id, {old});"
+    insert = f"INSERT INTO {name} (rowid, {cols}) VALUES (new.id, {new});"
+    return {
+        name: f"CREATE VIRTUAL TABLE {name} USING fts5({cols}, content='{table}', content_rowid='id', "
+              f"tokenize='{FTS_TOKENIZER}', prefix='2 3')",
+        f"{name}_ai": f"CREATE TRIGGER {name}_ai AFTER INSERT ON {table} BEGIN {insert} END",
+        f"{name}_ad": f"CREATE TRIGGER {name}_ad AFTER DELETE ON {table} BEGIN {delete} END",
+        f"{name}_au": f"CREATE TRIGGER {name}_au AFTER UPDATE OF id, {cols} ON {table} BEGIN {delete} {insert} END",
+    }
+
+
+def _existing_objects(conn: sqlite3.Connection) -> set[str]:
+    rows = conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')").fetchall()
+    return {row[0] for row in rows}
+
+
+def create_fts(conn: sqlite3.Connection) -> list[str]:
+    """Create any missing full-text index in `FTS_TABLES` and its triggers; returns the indexes rebuilt.
+
+    An index is rebuilt from its table whenever it or one of its triggers had to be created, e.g. after
+    the pandas timestamp path replaced the inventory tables (which drops their triggers).
+    """
+    existing = _existing_objects(conn)
+    rebuilt = []
+    for name, (table, columns) in FTS_TABLES.items():
+        missing = [sql for obj, sql in _fts_statements(name, table, columns).items() if obj not in existing]
+        if not missing:
+            continue
+        for sql in missing:
+            conn.execute(sql)
+        conn.execute(f"INSERT INTO {name} ({name}) VALUES ('rebuild')")
+        rebuilt.append(name)
+    conn.commit()
+    return rebuilt
+
+
+def missing_fts(conn: sqlite3.Connection) -> list[str]:
+    existing = _existing_objects(conn)
+    return [name for name, (table, columns) in FTS_TABLES.items()
+            if any(obj not in existing for obj in _fts_statements(name, table, columns))]
+
+
+def is_fts_table(name: str) -> bool:
+    """True for a full-text index and its shadow tables (`hotels_fts_data`, ...), which are not data."""
+    return any(name == fts or name.startswith(f"{fts}_") for fts in FTS_TABLES)
+
+
+def explain_queries(conn: sqlite3.Connection) -> list[dict]:
+    """Run EXPLAIN QUERY PLAN on every service query and flag the unexpected full table scans.
+
+    A query SQLite cannot even plan (e.g. a column the schema lacks) is flagged too, with its `error`.
+    """
+    report = []
+    for name, sql, params, scan_expected in service_queries():
+        try:
+            plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+        except sqlite3.Error as e:
+            report.append({"query": name, "plan": [], "full_scans": [], "error": str(e), "regression": True})
+            continue
+        full_scans = [step for step in plan
+                      if step.startswith("SCAN ") and " USING " not in step and " VIRTUAL TABLE " not in step]
+        report.append({
+            "query": name,
+            "plan": plan,
+            "full_scans": full_scans,
+            "error": None,
+            "regression": bool(full_scans) and not scan_expected,
+        })
+    return report
+
+
+if __name__ == "__main__":
+    import sys
+
+    _conn = sqlite3.connect(sys.argv[1] if len(sys.argv) > 1 else "./database/travel2.sqlite")
+    _missing = missing_indexes(_conn) + missing_fts(_conn)
+    if _missing:
+        print(f"Missing indexes: {', '.join(_missing)}")
+    _regressions = 0
+    for _entry in explain_queries(_conn):
+        _flag = "ERROR" if _entry["error"] else "FULL SCAN" if _entry["regression"] else "ok"
+        _regressions += _entry["regression"]
+        print(f"[{_flag}] {_entry['query']}" + (f": {_entry['error']}" if _entry["error"] else ""))
+        for _step in _entry["plan"]:
+            print(f"    {_step}")
+    _conn.close()
+    sys.exit(1 if _regressions or _missing else 0)
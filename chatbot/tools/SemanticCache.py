@@ -0,0 +1,123 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+import numpy as np
+
+
+def normalize_query(query: str) -> str:
+    """Lower-case, drop punctuation and collapse whitespace so trivial rewrites hit the exact-match path."""
+    return " ".join(re.sub(r"[^\w\s]", " ", query.lower()).split())
+
+
+class _Entry:
+    def __init__(self, value: Any, embedding: Optional[np.ndarray]):
+        self.value = value
+        self.embedding = embedding
+        self.created_at = time.monotonic()
+
+
+class SemanticCache:
+    """LRU/TTL cache keyed by query text, with an embedding-similarity fallback.
+
+    `get_exact` answers repeated questions without any embedding call; `get_similar` answers
+    near-duplicates whose query embedding has a cosine similarity of at least `threshold`
+    with a cached one.
+    """
+
+    def __init__(self, threshold: float = 0.92, max_entries: int = 256, ttl: Optional[float] = 3600.0):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._matrix = None
+        self._matrix_keys = []
+        self._lock = threading.Lock()
+        self.stats = {
+            "exact_hits": 0,
+            "semantic_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+        }
+
+    def _expired(self, entry: _Entry) -> bool:
+        return self.ttl is not None and time.monotonic() - entry.created_at > self.ttl
+
+    def _drop(self, key: str) -> None:
+        del self._entries[key]
+        self._matrix = None
+
+    def get_exact(self, query: str) -> Optional[Any]:
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry):
+                self._drop(key)
+                self.stats["expirations"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["exact_hits"] += 1
+            return entry.value
+
+    def get_similar(self, embedding: list[float]) -> Optional[Any]:
+        vector = self._unit(embedding)
+        with self._lock:
+            if self._matrix is None:
+                self._matrix_keys = [key for key, entry in self._entries.items() if entry.embedding is not None]
+                self._matrix = (
+                    np.vstack([self._entries[key].embedding for key in self._matrix_keys])
+                    if self._matrix_keys else np.empty((0, vector.shape[0]), dtype=np.float32)
+                )
+            if self._matrix.shape[0]:
+                scores = self._matrix @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    key = self._matrix_keys[best]
+                    entry = self._entries[key]
+                    if self._expired(entry):
+                        self._drop(key)
+                        self.stats["expirations"] += 1
+                    else:
+                        self._entries.move_to_end(key)
+                        self.stats["semantic_hits"] += 1
+                        return entry.value
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, query: str, value: Any, embedding: Optional[list[float]] = None) -> None:
+        key = normalize_query(query)
+        entry = _Entry(value, self._unit(embedding) if embedding is not None else None)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+            self._matrix = None
+
+    def invalidate(self) -> None:
+        """Drop every entry, e.g. when the FAQ collection has been rebuilt."""
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+            self.stats["invalidations"] += 1
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["exact_hits"] + stats["semantic_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["exact_hits"] + stats["semantic_hits"]) / lookups if lookups else None
+        return stats
+
+    @staticmethod
+    def _unit(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
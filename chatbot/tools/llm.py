@@ -1,6 +1,27 @@
-from langchain_openai import ChatOpenAI
+from chatbot.lazy import once
 
-LLM = ChatOpenAI(
-    model="gpt-4o-mini",
-    temperature=1
-)
+
+@once
+def get_llm():
+    """The chat model shared by every assistant, created on first use.
+
+    Importing langchain_openai (and the openai SDK behind it) takes most of a second, so it only
+    happens once a graph is built. Assigning `chatbot.tools.llm.LLM` beforehand replaces the model,
+    e.g. with the scripted one of the offline benchmarks.
+    """
+    llm = globals().get("LLM")
+    if llm is None:
+        from langchain_openai import ChatOpenAI
+
+        llm = globals()["LLM"] = ChatOpenAI(
+            model="gpt-4o-mini",
+            temperature=1
+        )
+    return llm
+
+
+def __getattr__(name):
+    # `from chatbot.tools.llm import LLM` keeps working, and builds the client
+    if name == "LLM":
+        return get_llm()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,11 @@
+from chatbot.tools.FlightService import FlightService
+from chatbot.tools.CarService import CarService
+from chatbot.tools.HotelService import HotelService
+from chatbot.tools.ExcursionService import ExcursionService
+
+# one instance of each service for the whole process: the graph's tool nodes, the assistants' bound
+# tool schemas and the primary assistant's flight search all use these
+flight_service = FlightService()
+car_service = CarService()
+hotel_service = HotelService()
+excursion_service = ExcursionService()